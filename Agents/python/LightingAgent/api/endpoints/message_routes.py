@@ -6,13 +6,14 @@ from models.assistant_message_content_output_model import AssistantMessageConten
 from models.assistant_message_content import AssistantMessageContent
 from models.assistant_message_content_input_model import AssistantMessageContentInputModel
 from database_manager import DatabaseManager, get_database_manager
+from services.chat_history_cache import ChatHistoryCache, get_chat_history_cache
 from semantic_kernel.contents import AuthorRole, TextContent
 from bson import ObjectId
 
 message_router = APIRouter()
 
 @message_router.post("/{thread_id}/messages/", response_model=AssistantMessageContentOutputModel, status_code=201)
-async def create_message(thread_id: str, message_input: AssistantMessageContentInputModel = Body(...), db_manager: DatabaseManager = Depends(get_database_manager)):
+async def create_message(thread_id: str, message_input: AssistantMessageContentInputModel = Body(...), db_manager: DatabaseManager = Depends(get_database_manager), chat_history_cache: ChatHistoryCache = Depends(get_chat_history_cache)):
     # Check if message_input is empty
     if not message_input:
         raise HTTPException(status_code=400, detail="Message input is required.")
@@ -41,7 +42,9 @@ async def create_message(thread_id: str, message_input: AssistantMessageContentI
         content='_' # Step 1
     )
     new_message.items = message_input.content # Step 2
-    await db_manager.messages_collection.insert_one(new_message.to_bson())
+    document = new_message.to_bson()
+    await db_manager.messages_collection.insert_one(document)
+    chat_history_cache.append(thread_id, document)
 
     # We must also create a new AssistantMessageContentOutputModel object to return to the client
     # because the content field is a list of KernelContent objects, not a string
@@ -70,26 +73,42 @@ async def list_messages(
         after: Optional[str] = None, 
         before: Optional[str] = None, 
         db_manager: DatabaseManager = Depends(get_database_manager)):
-    
-    # Set up the query filter and sort order
-    filters = {"thread_id": thread_id}
-
-    # Set the sort order based on the query parameter
-    sort = 1 if order == "asc" else -1
-    options = {"sort": [("created_at", sort)], "limit": min(limit, 100)}
 
-    # Set up the cursor filter based on the after and before query parameters
-    cursor_filter = {}
-    if after:
-        cursor_filter["created_at"] = {"$gt": datetime.datetime.fromtimestamp(int(after))}
-    elif before:
-        cursor_filter["created_at"] = {"$lt": datetime.datetime.fromtimestamp(int(before))}
+    limit = min(limit, 100)
 
-    # Combine the filters and cursor filter
-    query_filter = {"$and": [filters, cursor_filter]} if cursor_filter else filters
-
-    # Retrieve the messages from the database using filter, sort, and options
-    messages = await db_manager.messages_collection.find(query_filter, **options).to_list(limit)
+    # Messages are ordered by (created_at, _id) so messages created at the same time still have a stable order
+    sort = 1 if order == "asc" else -1
+    query_filter = {"thread_id": thread_id}
+
+    # The after and before cursors are message IDs; resolve them to their (created_at, _id) position in the thread
+    cursor_id = after or before
+    if cursor_id:
+        cursor_message = await db_manager.messages_collection.find_one(
+            {"_id": _parse_message_id(cursor_id), "thread_id": thread_id},
+            projection={"created_at": 1}
+        )
+        if not cursor_message:
+            raise HTTPException(status_code=404, detail=f"Message with ID '{cursor_id}' not found in thread '{thread_id}'.")
+
+        # "before" pages walk the list backwards from the cursor and are flipped back into list order below
+        if before and not after:
+            sort = -sort
+        comparison = "$gt" if sort == 1 else "$lt"
+        query_filter["$or"] = [
+            {"created_at": {comparison: cursor_message["created_at"]}},
+            {"created_at": cursor_message["created_at"], "_id": {comparison: cursor_message["_id"]}}
+        ]
+
+    # Fetch one extra message to know whether there are more after this page
+    messages = await db_manager.messages_collection.find(
+        query_filter,
+        sort=[("created_at", sort), ("_id", sort)],
+        limit=limit + 1
+    ).to_list(limit + 1)
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    if before and not after:
+        messages.reverse()
 
     # Convert BSON documents to Pydantic models
     messages = [AssistantMessageContent.from_bson(message) for message in messages]
@@ -99,14 +118,20 @@ async def list_messages(
         "data": messages,
         "first_id": messages[0].id if messages else None,
         "last_id": messages[-1].id if messages else None,
-        "has_more": len(messages) == limit
+        "has_more": has_more
     }
 
+def _parse_message_id(message_id: str) -> ObjectId:
+    if not ObjectId.is_valid(message_id):
+        raise HTTPException(status_code=400, detail=f"'{message_id}' is not a valid message ID.")
+    return ObjectId(message_id)
+
 @message_router.delete("/{thread_id}/messages/{message_id}/", status_code=status.HTTP_200_OK)
-async def delete_thread(thread_id: str, message_id: str, db_manager: DatabaseManager = Depends(get_database_manager)):
+async def delete_thread(thread_id: str, message_id: str, db_manager: DatabaseManager = Depends(get_database_manager), chat_history_cache: ChatHistoryCache = Depends(get_chat_history_cache)):
     # Delete the thread from the database
     result = await db_manager.messages_collection.delete_one({"_id": ObjectId(thread_id), "thread_id": thread_id})
     if result.deleted_count:
+        chat_history_cache.evict(thread_id)
         return {"id": message_id, "object": "message.deleted", "deleted": True}
     
     # If the message was not found, raise an exception
@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends
+from database_manager import DatabaseManager, get_database_manager
+from services.plugin_endpoint_registry import PluginEndpointRegistry, get_plugin_endpoint_registry
+from services.chat_history_cache import ChatHistoryCache, get_chat_history_cache
+from services.message_writer import MessageWriter, get_message_writer
+from services.run_manager import RunManager, get_run_manager
+from services.plugin_call_cache import PluginCallCache, get_plugin_call_cache
+from services.device_state_prefetcher import DeviceStatePrefetcher, get_device_state_prefetcher
+from services.tool_selector import ToolSelector, get_tool_selector
+from services.python_planner import PythonPlanner, get_python_planner
+
+metrics_router = APIRouter()
+
+@metrics_router.get("/database")
+async def get_database_metrics(db_manager: DatabaseManager = Depends(get_database_manager)):
+    return {
+        "max_pool_size": db_manager.max_pool_size,
+        "min_pool_size": db_manager.min_pool_size,
+        "pool": db_manager.pool_statistics.to_dict()
+    }
+
+@metrics_router.get("/plugin-endpoints")
+async def get_plugin_endpoint_metrics(plugin_endpoint_registry: PluginEndpointRegistry = Depends(get_plugin_endpoint_registry)):
+    return plugin_endpoint_registry.get_states()
+
+@metrics_router.get("/chat-history-cache")
+async def get_chat_history_cache_metrics(chat_history_cache: ChatHistoryCache = Depends(get_chat_history_cache)):
+    return chat_history_cache.get_statistics()
+
+@metrics_router.get("/message-writer")
+async def get_message_writer_metrics(message_writer: MessageWriter = Depends(get_message_writer)):
+    return message_writer.get_statistics()
+
+@metrics_router.get("/runs")
+async def get_run_metrics(run_manager: RunManager = Depends(get_run_manager)):
+    return run_manager.get_statistics()
+
+
+@metrics_router.get("/plugin-call-cache")
+async def get_plugin_call_cache_metrics(plugin_call_cache: PluginCallCache = Depends(get_plugin_call_cache)):
+    return plugin_call_cache.get_statistics()
+
+@metrics_router.get("/device-state-prefetch")
+async def get_device_state_prefetch_metrics(device_state_prefetcher: DeviceStatePrefetcher = Depends(get_device_state_prefetcher)):
+    return device_state_prefetcher.get_statistics()
+
+@metrics_router.get("/tool-selection")
+async def get_tool_selection_metrics(tool_selector: ToolSelector = Depends(get_tool_selector)):
+    return tool_selector.get_statistics()
+
+@metrics_router.get("/python-planner")
+async def get_python_planner_metrics(python_planner: PythonPlanner = Depends(get_python_planner)):
+    return python_planner.get_statistics()
@@ -1,15 +1,24 @@
 from datetime import datetime
-import os
-from fastapi import APIRouter, HTTPException, Depends, Response
+from typing import Optional
+from fastapi import APIRouter, Body, HTTPException, Depends, Header, Query, Response
 import httpx
 from http_manager import get_http_client
-from utilities.assistant_event_stream_utility import AssistantEventStreamService
+from utilities.assistant_event_stream_utility import AssistantEventStreamService, DeltaFlushPolicy
 from models.assistant_thread_run import AssistantThreadRun
+from models.assistant_thread_run_input_model import AssistantThreadRunInputModel
 from services.run_service import RunService
+from services.kernel_factory import KernelFactory, get_kernel_factory
+from services.plugin_endpoint_registry import PluginEndpointRegistry, get_plugin_endpoint_registry
+from services.chat_history_cache import ChatHistoryCache, get_chat_history_cache
+from services.message_writer import MessageWriter, get_message_writer
+from services.plugin_call_cache import PluginCallCache, get_plugin_call_cache
+from services.device_state_prefetcher import DeviceStatePrefetcher, get_device_state_prefetcher
+from services.tool_selector import ToolSelector, get_tool_selector
+from services.python_planner import PythonPlanner, get_python_planner
+from services.run_manager import RunManager, RunQueueFullError, get_run_manager
 from database_manager import DatabaseManager, get_database_manager
 from starlette.responses import StreamingResponse
 from bson import ObjectId
-from pymongo.errors import ConnectionFailure
 
 run_router = APIRouter()
 from fastapi import APIRouter, Depends, HTTPException, Response
@@ -21,35 +30,70 @@ run_router = APIRouter()
 async def create_run(
     thread_id: str, 
     response: Response, 
+    run_input: Optional[AssistantThreadRunInputModel] = Body(None),
+    delta_flush_interval_ms: int = Query(0, ge=0, description="Coalesce message deltas for up to this many milliseconds (0 sends every chunk)"),
+    delta_flush_bytes: int = Query(0, ge=0, description="Coalesce message deltas until this many bytes of text build up (0 sends every chunk)"),
     db_manager: DatabaseManager = Depends(get_database_manager),  # Dependency is injected here
-    http_client: httpx.AsyncClient = Depends(get_http_client)  # Dependency is injected here
+    http_client: httpx.AsyncClient = Depends(get_http_client),  # Dependency is injected here
+    kernel_factory: KernelFactory = Depends(get_kernel_factory),  # Dependency is injected here
+    plugin_endpoint_registry: PluginEndpointRegistry = Depends(get_plugin_endpoint_registry),  # Dependency is injected here
+    chat_history_cache: ChatHistoryCache = Depends(get_chat_history_cache),  # Dependency is injected here
+    message_writer: MessageWriter = Depends(get_message_writer),  # Dependency is injected here
+    plugin_call_cache: PluginCallCache = Depends(get_plugin_call_cache),  # Dependency is injected here
+    device_state_prefetcher: DeviceStatePrefetcher = Depends(get_device_state_prefetcher),  # Dependency is injected here
+    tool_selector: ToolSelector = Depends(get_tool_selector),  # Dependency is injected here
+    python_planner: PythonPlanner = Depends(get_python_planner),  # Dependency is injected here
+    run_manager: RunManager = Depends(get_run_manager)  # Dependency is injected here
 ):
+    try:
+        run_manager.check_admission()
+    except RunQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
     thread = await db_manager.threads_collection.find_one({"_id": ObjectId(thread_id)})
     if not thread:
         raise HTTPException(status_code=404, detail=f"Thread with ID '{thread_id}' not found.")
     
-    new_run = AssistantThreadRun(thread_id=thread_id, created_at=datetime.utcnow())
-    streamingUtility = AssistantEventStreamService()
+    run_input = run_input or AssistantThreadRunInputModel()
+    new_run = AssistantThreadRun(
+        thread_id=thread_id,
+        assistant_id=run_input.assistant_id,
+        model=run_input.model,
+        stream=run_input.stream,
+        created_at=datetime.utcnow()
+    )
+    streamingUtility = AssistantEventStreamService(DeltaFlushPolicy(max_delay_ms=delta_flush_interval_ms, max_bytes=delta_flush_bytes))
     run_service = RunService()  # No need to pass db_manager to constructor
 
-    async def create_event_stream(run: AssistantThreadRun):
-        db_manager = DatabaseManager(os.getenv('MONGODB_URL'))
-        await db_manager.connect()  # Explicitly managing connection
-        try:
-            yield streamingUtility.create_event("thread.run.created", run)
-            async for event in run_service.execute_run_async(run, streamingUtility, db_manager, http_client):
-                yield event  # Each event generated here
-            yield streamingUtility.create_done_event()
-
-        except HTTPException as e:
-            # Handle specific HTTP exceptions if necessary
-            yield f"Error: {str(e.detail)}"
-        
-        except ConnectionFailure as e:
-            # Handle MongoDB connection issues
-            yield "Database connection error occurred."
-
-        finally:
-            await db_manager.disconnect() 
-
-    return StreamingResponse(create_event_stream(new_run), headers={"Content-Type": "text/event-stream"})
+    # The run executes on a background worker; its events go to the run's event log rather than straight to this client
+    def create_event_stream():
+        return run_service.execute_run_async(new_run, streamingUtility, db_manager, http_client, kernel_factory, plugin_endpoint_registry, chat_history_cache, message_writer, plugin_call_cache, device_state_prefetcher, tool_selector, python_planner)
+
+    try:
+        run_state = await run_manager.submit(new_run, create_event_stream)
+    except RunQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+    if not new_run.stream:
+        return new_run
+    return StreamingResponse(run_state.event_log.follow(), headers={"Content-Type": "text/event-stream"})
+
+@run_router.get("/{thread_id}/runs/{run_id}", response_model=AssistantThreadRun)
+async def retrieve_run(thread_id: str, run_id: str, run_manager: RunManager = Depends(get_run_manager)):
+    run = await run_manager.get_run(thread_id, run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail=f"Run with ID '{run_id}' not found in thread '{thread_id}'.")
+    return run
+
+@run_router.get("/{thread_id}/runs/{run_id}/stream")
+async def stream_run(
+    thread_id: str,
+    run_id: str,
+    last_event_id: Optional[int] = Header(None, alias="Last-Event-ID"),
+    run_manager: RunManager = Depends(get_run_manager)
+):
+    # Re-attach to a run's events, replaying everything after Last-Event-ID (or from the start)
+    run_state = run_manager.get_state(run_id)
+    if not run_state or run_state.run.thread_id != thread_id:
+        raise HTTPException(status_code=404, detail=f"No event stream for run '{run_id}' in thread '{thread_id}'.")
+    return StreamingResponse(run_state.event_log.follow(last_event_id), headers={"Content-Type": "text/event-stream"})
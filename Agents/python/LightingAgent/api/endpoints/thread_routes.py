@@ -5,6 +5,7 @@ from models.assistant_thread import AssistantThread
 from models.assistant_thread_input_model import AssistantThreadInputModel
 from models.assistant_message_content import AssistantMessageContent
 from database_manager import DatabaseManager, get_database_manager
+from services.chat_history_cache import ChatHistoryCache, get_chat_history_cache
 from semantic_kernel.contents import AuthorRole, TextContent
 from semantic_kernel.contents.chat_message_content import ITEM_TYPES
 from bson import ObjectId
@@ -62,12 +63,13 @@ async def get_thread(thread_id: str, db_manager: DatabaseManager = Depends(get_d
     raise HTTPException(status_code=404, detail="Thread not found")
 
 @thread_router.delete("/{thread_id}", status_code=status.HTTP_200_OK)
-async def delete_thread(thread_id: str, db_manager: DatabaseManager = Depends(get_database_manager)):
+async def delete_thread(thread_id: str, db_manager: DatabaseManager = Depends(get_database_manager), chat_history_cache: ChatHistoryCache = Depends(get_chat_history_cache)):
     # Delete the thread from the database
     result = await db_manager.threads_collection.delete_one({"_id": ObjectId(thread_id)})
     if result.deleted_count:
         # Delete the messages associated with the thread
         await db_manager.messages_collection.delete_many({"thread_id": thread_id})
+        chat_history_cache.evict(thread_id)
         return {"id": thread_id, "object": "thread.deleted", "deleted": True}
     
     # If the thread was not found, raise an exception
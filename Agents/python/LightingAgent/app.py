@@ -1,12 +1,49 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from api.api_router import api_router
+from http_manager import HttpManager
+from database_manager import database_manager
+from services.kernel_factory import kernel_factory
+from services.plugin_endpoint_registry import plugin_endpoint_registry
+from services.message_writer import message_writer
+from services.chat_history_cache import chat_history_cache
+from services.run_manager import run_manager
+from services.python_planner import python_planner
+
+@asynccontextmanager
+async def lifespan(application: FastAPI):
+    # Build the chat service and OpenAPI plugins once for the lifetime of the application
+    kernel_factory.initialize(HttpManager.client, database_manager)
+
+    # Keep the health of the plugin service endpoints up to date in the background
+    await plugin_endpoint_registry.start(HttpManager.client)
+
+    # Open the MongoDB connection pool once and share it across every request and run
+    await database_manager.connect()
+    await database_manager.ensure_indexes()
+    # A thread whose messages fail to persist is dropped from the history cache, so it's reloaded from MongoDB
+    message_writer.start(database_manager.messages_collection, on_write_failed=chat_history_cache.evict)
+
+    # Execute runs on background workers so they outlive the client connection that started them
+    run_manager.start(database_manager.runs_collection)
+
+    # Start the Python planner's interpreters ahead of the first script (if enabled)
+    await python_planner.start()
+    yield
+    await run_manager.stop()
+    await python_planner.stop()
+    await plugin_endpoint_registry.stop()
+
+    # Flush the run messages that have not been written yet before closing the pool
+    await message_writer.stop()
+    await database_manager.disconnect()
 
 def create_application() -> FastAPI:
     application = FastAPI(
         title='Lighting Agent API',
         version='1.0.0',
         description='API for managing home automation devices and interactions.',
+        lifespan=lifespan,
     )
 
     @application.get("/health")
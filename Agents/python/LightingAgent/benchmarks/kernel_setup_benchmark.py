@@ -0,0 +1,90 @@
+"""Compares the per-run kernel setup cost before and after the KernelFactory.
+
+Run from Agents/python/LightingAgent with: python -m benchmarks.kernel_setup_benchmark
+No network access is needed; the chat service is created but never called.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import httpx
+from semantic_kernel.kernel import Kernel
+from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion
+from semantic_kernel.connectors.openapi_plugin.openapi_function_execution_parameters import (
+    OpenAPIFunctionExecutionParameters,
+)
+from models.config import Config
+from services.kernel_factory import KernelFactory, OPENAPI_PLUGINS, OPENAPI_PLUGINS_DIRECTORY
+
+BENCHMARK_CONFIG = {
+    "OpenAI": {
+        "DeploymentType": "AzureOpenAI",
+        "ApiKey": "benchmark-api-key",
+        "DeploymentName": "benchmark-deployment",
+        "Endpoint": "https://benchmark.openai.azure.com/",
+    },
+    "PluginServices": {
+        "LightService": {"Endpoints": ["http://localhost:5002"]},
+        "SceneService": {"Endpoints": ["http://localhost:5003"]},
+        "SpeakerService": {"Endpoints": ["http://localhost:5004"]},
+    },
+}
+
+def per_run_setup_before(config_path: str, http_client: httpx.AsyncClient) -> Kernel:
+    # Mirrors what RunService.execute_run_async did on every run before the KernelFactory
+    with open(config_path) as file:
+        config: Config = Config(**json.load(file))
+    deployment_type, api_key, ai_model_id, deployment_name, endpoint, org_id = config.openai.model_dump().values()
+
+    kernel = Kernel()
+    kernel.add_service(AzureChatCompletion(deployment_name=deployment_name, api_key=api_key, endpoint=endpoint))
+    for plugin_name, (service_name, document_name) in OPENAPI_PLUGINS.items():
+        kernel.add_plugin_from_openapi(
+            plugin_name=plugin_name,
+            openapi_document_path=os.path.join(OPENAPI_PLUGINS_DIRECTORY, document_name),
+            execution_settings=OpenAPIFunctionExecutionParameters(
+                http_client=http_client,
+                server_url_override=config.plugin_services[service_name].endpoints[0],
+                enable_payload_namespacing=True,
+            ),
+        )
+    return kernel
+
+def per_run_setup_after(kernel_factory: KernelFactory) -> Kernel:
+    kernel_factory.refresh_if_changed()
+    plugin_endpoints = {
+        service_name: kernel_factory.config.plugin_services[service_name].endpoints[0]
+        for service_name, _ in OPENAPI_PLUGINS.values()
+    }
+    return kernel_factory.create_kernel(plugin_endpoints)
+
+def measure(label: str, iterations: int, setup) -> float:
+    setup()  # Warm up imports and caches
+    start = time.perf_counter()
+    for _ in range(iterations):
+        setup()
+    per_run_ms = (time.perf_counter() - start) * 1000 / iterations
+    print(f"{label:<8} {per_run_ms:10.3f} ms/run")
+    return per_run_ms
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    http_client = httpx.AsyncClient()
+    with tempfile.TemporaryDirectory() as directory:
+        config_path = os.path.join(directory, "config.json")
+        with open(config_path, "w") as file:
+            json.dump(BENCHMARK_CONFIG, file)
+
+        kernel_factory = KernelFactory(config_path=config_path)
+        kernel_factory.initialize(http_client)
+
+        before = measure("before", args.iterations, lambda: per_run_setup_before(config_path, http_client))
+        after = measure("after", args.iterations, lambda: per_run_setup_after(kernel_factory))
+        print(f"speedup  {before / after:10.1f}x")
+
+if __name__ == "__main__":
+    main()
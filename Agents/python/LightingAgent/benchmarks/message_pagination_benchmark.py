@@ -0,0 +1,96 @@
+"""Measures message listing on a thread of 100k messages with and without the managed index.
+
+Requires a MongoDB server; run from Agents/python/LightingAgent with:
+    MONGODB_URL=mongodb://localhost:27017 python -m benchmarks.message_pagination_benchmark
+
+The messages are written to a throwaway database, which is dropped afterwards.
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from bson import ObjectId
+from database_manager import DatabaseManager
+
+THREAD_ID = "benchmark-thread"
+
+async def seed(manager: DatabaseManager, messages: int):
+    # Several messages share each second, like tool calls and results written by one run
+    start = datetime.utcnow() - timedelta(seconds=messages)
+    batch = []
+    for i in range(messages):
+        batch.append({
+            "_id": ObjectId(),
+            "thread_id": THREAD_ID,
+            "role": "user",
+            "created_at": start + timedelta(seconds=i // 4),
+            "content": [{"type": "text", "text": {"value": f"message {i}", "annotations": []}}]
+        })
+        if len(batch) == 5000:
+            await manager.messages_collection.insert_many(batch)
+            batch = []
+    if batch:
+        await manager.messages_collection.insert_many(batch)
+
+    # Add noise from other threads so the thread_id filter has to do some work
+    await manager.messages_collection.insert_many([
+        {"_id": ObjectId(), "thread_id": f"other-{i % 100}", "role": "user", "created_at": start, "content": []}
+        for i in range(messages)
+    ])
+
+async def walk_pages(manager: DatabaseManager, limit: int, pages: int) -> float:
+    """Walk the newest pages with keyset cursors, like GET /messages?order=desc&after=<last_id>."""
+    start = time.perf_counter()
+    cursor = None
+    for _ in range(pages):
+        query_filter = {"thread_id": THREAD_ID}
+        if cursor:
+            query_filter["$or"] = [
+                {"created_at": {"$lt": cursor["created_at"]}},
+                {"created_at": cursor["created_at"], "_id": {"$lt": cursor["_id"]}}
+            ]
+        page = await manager.messages_collection.find(
+            query_filter, sort=[("created_at", -1), ("_id", -1)], limit=limit + 1
+        ).to_list(limit + 1)
+        cursor = page[limit - 1]
+    return (time.perf_counter() - start) * 1000 / pages
+
+async def load_history(manager: DatabaseManager) -> float:
+    """Load the whole thread in order, like a run on a cold history cache."""
+    start = time.perf_counter()
+    await manager.messages_collection.find({"thread_id": THREAD_ID}).sort([("created_at", 1), ("_id", 1)]).to_list(None)
+    return (time.perf_counter() - start) * 1000
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=50)
+    args = parser.parse_args()
+
+    database_name = f"PartyPlanningBenchmark{ObjectId()}"
+    manager = DatabaseManager(os.getenv("MONGODB_URL", "mongodb://localhost:27017"))
+    await manager.connect()
+    manager.db = manager.client[database_name]
+    manager.messages_collection = manager.db["Messages"]
+    try:
+        print(f"Seeding {args.messages:,} messages...")
+        await seed(manager, args.messages)
+
+        page_without_index = await walk_pages(manager, args.limit, args.pages)
+        history_without_index = await load_history(manager)
+
+        await manager.ensure_indexes()
+        page_with_index = await walk_pages(manager, args.limit, args.pages)
+        history_with_index = await load_history(manager)
+
+        print(f"{'':<16}{'no index':>12}{'index':>12}")
+        print(f"{'page (ms)':<16}{page_without_index:12.2f}{page_with_index:12.2f}")
+        print(f"{'history (ms)':<16}{history_without_index:12.2f}{history_with_index:12.2f}")
+    finally:
+        await manager.client.drop_database(database_name)
+        await manager.disconnect()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,124 @@
+"""Compares light_plugin tool-call latency between the HTTP and in-process plugin modes.
+
+Requires a MongoDB server seeded by mongodb-init/init.js; run from Agents/python/LightingAgent with:
+    MONGODB_URL=mongodb://localhost:27017 python -m benchmarks.plugin_mode_benchmark
+
+By default the HTTP mode calls a local FastAPI app that serves the in-process implementation,
+so both modes share a backend and the difference is the HTTP hop alone. Pass --light-endpoint
+to call a running LightService instead.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from typing import Optional
+import httpx
+from fastapi import Body, FastAPI, HTTPException
+from fastapi.responses import Response
+from semantic_kernel.kernel import Kernel
+from semantic_kernel.functions.kernel_arguments import KernelArguments
+from semantic_kernel.functions.kernel_plugin import KernelPlugin
+from semantic_kernel.connectors.openapi_plugin.openapi_function_execution_parameters import (
+    OpenAPIFunctionExecutionParameters,
+)
+from database_manager import DatabaseManager
+from services.kernel_factory import OPENAPI_PLUGINS, OPENAPI_PLUGINS_DIRECTORY
+from services.native_plugins import LightPlugin, create_native_plugin
+
+LOCAL_PORT = 5102
+
+def create_light_app(light_plugin: LightPlugin) -> FastAPI:
+    # Serves the in-process implementation with LightService's routes
+    app = FastAPI()
+
+    async def respond(call):
+        try:
+            return Response(await call, media_type="application/json")
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+
+    @app.get("/Light")
+    async def get_all_lights():
+        return await respond(light_plugin.get_all_lights())
+
+    @app.get("/Light/{id}")
+    async def get_light(id: str):
+        return await respond(light_plugin.get_light(id))
+
+    @app.post("/Light/{id}")
+    async def change_light_state(id: str, request: dict = Body(...)):
+        return await respond(light_plugin.change_light_state(id, **request))
+
+    return app
+
+async def measure(kernel: Kernel, function_name: str, arguments: dict, calls: int) -> float:
+    """Return the median latency of the tool call in milliseconds."""
+    await kernel.invoke(plugin_name="light_plugin", function_name=function_name, arguments=KernelArguments(**arguments))
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        await kernel.invoke(plugin_name="light_plugin", function_name=function_name, arguments=KernelArguments(**arguments))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies)
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--light-endpoint", default=None)
+    args = parser.parse_args()
+
+    db_manager = DatabaseManager(os.getenv("MONGODB_URL", "mongodb://localhost:27017"))
+    await db_manager.connect()
+    http_client = httpx.AsyncClient()
+    server: Optional[object] = None
+    server_task = None
+    try:
+        light_endpoint = args.light_endpoint
+        if light_endpoint is None:
+            import uvicorn
+            server = uvicorn.Server(uvicorn.Config(create_light_app(LightPlugin(db_manager)), port=LOCAL_PORT, log_level="warning"))
+            server_task = asyncio.create_task(server.serve())
+            while not server.started:
+                await asyncio.sleep(0.05)
+            light_endpoint = f"http://localhost:{LOCAL_PORT}"
+
+        _, document_name = OPENAPI_PLUGINS["light_plugin"]
+        openapi_plugin = KernelPlugin.from_openapi(
+            plugin_name="light_plugin",
+            openapi_document_path=os.path.join(OPENAPI_PLUGINS_DIRECTORY, document_name),
+            execution_settings=OpenAPIFunctionExecutionParameters(
+                http_client=http_client,
+                server_url_override=light_endpoint,
+                enable_payload_namespacing=True,
+            ),
+        )
+        kernels = {
+            "http": Kernel(plugins={"light_plugin": openapi_plugin}),
+            "in-process": Kernel(plugins={"light_plugin": create_native_plugin("light_plugin", openapi_plugin, db_manager)}),
+        }
+
+        lights = json.loads(str(await kernels["http"].invoke(plugin_name="light_plugin", function_name="get_all_lights", arguments=KernelArguments())))
+        if not lights:
+            raise SystemExit("No lights found; seed the database with mongodb-init/init.js first.")
+        light_id = lights[0]["id"]
+        tool_calls = [
+            ("get_all_lights", {}),
+            ("get_light", {"id": light_id}),
+            ("change_light_state", {"id": light_id, "isOn": True, "hexColor": "#FFFFFF"}),
+        ]
+
+        print(f"{'median (ms)':<20}{'http':>12}{'in-process':>12}")
+        for function_name, arguments in tool_calls:
+            results = [await measure(kernels[mode], function_name, arguments, args.calls) for mode in ("http", "in-process")]
+            print(f"{function_name:<20}{results[0]:12.2f}{results[1]:12.2f}")
+    finally:
+        if server is not None:
+            server.should_exit = True
+            await server_task
+        await http_client.aclose()
+        await db_manager.disconnect()
+
+if __name__ == "__main__":
+    asyncio.run(main())
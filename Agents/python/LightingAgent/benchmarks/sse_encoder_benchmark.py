@@ -0,0 +1,50 @@
+"""Compares events per second of the pydantic and byte-template thread.message.delta encoders.
+
+Run from Agents/python/LightingAgent with: python -m benchmarks.sse_encoder_benchmark
+"""
+import argparse
+import time
+from models.streaming_assistant_message_content import StreamingAssistantMessageContent
+from utilities.message_delta_encoder import encode_message_delta_event, orjson
+
+TOKENS = ["Sure", "!", " I'll", " set", " the", " stage", " lights", " to", " a", " warm", " \"sunset\"", " red", ".\n", " 🎉"]
+
+def encode_with_pydantic(text: str, index: int = 0) -> bytes:
+    # Mirrors what AssistantEventStreamService did for every token, including Starlette's str -> bytes encode
+    delta = StreamingAssistantMessageContent(
+        content=[{
+            "index": index,
+            "type": "text",
+            "text": {
+                "value": text,
+                "annotations": []
+            }
+        }]
+    )
+    json_data = delta.model_dump_json()
+    return (f"event: thread.message.delta\n" + f"data: {json_data}\n\n").encode("utf-8")
+
+def measure(label: str, events: int, encode) -> float:
+    start = time.perf_counter()
+    for i in range(events):
+        encode(TOKENS[i % len(TOKENS)])
+    events_per_second = events / (time.perf_counter() - start)
+    print(f"{label:<10} {events_per_second:14,.0f} events/s")
+    return events_per_second
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=200000)
+    args = parser.parse_args()
+
+    # The fast path must stay byte-compatible with what the UI client already parses
+    for token in TOKENS:
+        assert encode_message_delta_event(token) == encode_with_pydantic(token), token
+
+    print(f"orjson fast path: {'enabled' if orjson is not None else 'unavailable'}")
+    old = measure("pydantic", args.events, encode_with_pydantic)
+    new = measure("template", args.events, encode_message_delta_event)
+    print(f"speedup    {new / old:14.1f}x")
+
+if __name__ == "__main__":
+    main()
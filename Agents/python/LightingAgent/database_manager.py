@@ -1,30 +1,153 @@
 import os
+import threading
+from typing import Optional
 from fastapi import Depends, HTTPException
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase, AsyncIOMotorCollection
+from pymongo import ASCENDING, monitoring
+
+class ConnectionPoolStatistics(monitoring.ConnectionPoolListener):
+    """Tracks connection pool usage so the pool can be sized from real traffic.
+
+    PyMongo publishes these events from Motor's worker threads, so the counters are guarded by a lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connections_open = 0
+        self.connections_checked_out = 0
+        self.checkouts_total = 0
+        self.checkout_failures_total = 0
+        self.checkout_wait_seconds_total = 0.0
+        self.checkout_wait_seconds_max = 0.0
+        self.pool_clears_total = 0
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "connections_open": self.connections_open,
+                "connections_checked_out": self.connections_checked_out,
+                "checkouts_total": self.checkouts_total,
+                "checkout_failures_total": self.checkout_failures_total,
+                "checkout_wait_seconds_total": self.checkout_wait_seconds_total,
+                "checkout_wait_seconds_avg": self.checkout_wait_seconds_total / self.checkouts_total if self.checkouts_total else 0.0,
+                "checkout_wait_seconds_max": self.checkout_wait_seconds_max,
+                "pool_clears_total": self.pool_clears_total,
+            }
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears_total += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_open -= 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures_total += 1
+
+    def connection_checked_out(self, event):
+        wait_seconds = event.duration or 0.0
+        with self._lock:
+            self.connections_checked_out += 1
+            self.checkouts_total += 1
+            self.checkout_wait_seconds_total += wait_seconds
+            self.checkout_wait_seconds_max = max(self.checkout_wait_seconds_max, wait_seconds)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.connections_checked_out -= 1
 
 class DatabaseManager:
     client: AsyncIOMotorClient = None
     db: AsyncIOMotorDatabase = None
     threads_collection: AsyncIOMotorCollection = None
     messages_collection: AsyncIOMotorCollection = None
+    runs_collection: AsyncIOMotorCollection = None
+    lights_collection: AsyncIOMotorCollection = None
+    speakers_collection: AsyncIOMotorCollection = None
 
-    def __init__(self, url: str):
+    def __init__(
+            self,
+            url: str,
+            max_pool_size: int = 100,
+            min_pool_size: int = 0,
+            max_idle_time_ms: Optional[int] = None,
+            server_selection_timeout_ms: int = 30000,
+            wait_queue_timeout_ms: Optional[int] = None
+        ):
         self.url = url
+        self.max_pool_size = max_pool_size
+        self.min_pool_size = min_pool_size
+        self.max_idle_time_ms = max_idle_time_ms
+        self.server_selection_timeout_ms = server_selection_timeout_ms
+        self.wait_queue_timeout_ms = wait_queue_timeout_ms
+        self.pool_statistics = ConnectionPoolStatistics()
 
     async def connect(self):
-        self.client = AsyncIOMotorClient(self.url)
+        self.client = AsyncIOMotorClient(
+            self.url,
+            maxPoolSize=self.max_pool_size,
+            minPoolSize=self.min_pool_size,
+            maxIdleTimeMS=self.max_idle_time_ms,
+            serverSelectionTimeoutMS=self.server_selection_timeout_ms,
+            waitQueueTimeoutMS=self.wait_queue_timeout_ms,
+            event_listeners=[self.pool_statistics]
+        )
         self.db = self.client['PartyPlanning']
         self.threads_collection = self.db['Threads']
         self.messages_collection = self.db['Messages']
+        self.runs_collection = self.db['Runs']
+        self.lights_collection = self.db['Lights']
+        self.speakers_collection = self.db['Speakers']
+
+    async def ensure_indexes(self):
+        # Serves every thread_id filter sorted by created_at (with _id as the tie-breaker) in either direction
+        await self.messages_collection.create_index(
+            [("thread_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)],
+            name="thread_id_created_at_id"
+        )
 
     async def disconnect(self):
         if self.client:
             self.client.close()
 
+def _get_optional_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+def create_database_manager() -> DatabaseManager:
+    """Create the application's database manager with pool settings taken from the environment."""
+    return DatabaseManager(
+        os.getenv('MONGODB_URL'),
+        max_pool_size=int(os.getenv('MONGODB_MAX_POOL_SIZE', 100)),
+        min_pool_size=int(os.getenv('MONGODB_MIN_POOL_SIZE', 0)),
+        max_idle_time_ms=_get_optional_int('MONGODB_MAX_IDLE_TIME_MS'),
+        server_selection_timeout_ms=int(os.getenv('MONGODB_SERVER_SELECTION_TIMEOUT_MS', 30000)),
+        wait_queue_timeout_ms=_get_optional_int('MONGODB_WAIT_QUEUE_TIMEOUT_MS')
+    )
+
+# A single client (and connection pool) shared by every route and run; connected in the app's lifespan
+database_manager = create_database_manager()
+
 async def get_database_manager():
-    db_manager = DatabaseManager(os.getenv('MONGODB_URL'))
-    await db_manager.connect()
-    try:
-        yield db_manager
-    finally:
-        await db_manager.disconnect()
+    return database_manager
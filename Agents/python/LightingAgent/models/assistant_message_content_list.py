@@ -1,9 +1,10 @@
+from typing import Optional
 from pydantic import BaseModel
 from models.assistant_message_content_output_model import AssistantMessageContentOutputModel
 
 class AssistantMessageContentList(BaseModel):
     object: str = "list"
     data: list[AssistantMessageContentOutputModel]
-    first_id: str
-    last_id: str
+    first_id: Optional[str] = None
+    last_id: Optional[str] = None
     has_more: bool
@@ -1,18 +1,41 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
 from uuid import uuid4
-from typing import Optional
+from typing import Any, Dict, Optional
+
+class AssistantThreadRunError(BaseModel):
+    code: str
+    message: str
 
 class AssistantThreadRun(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid4()))
+    object: str = "thread.run"
     thread_id: Optional[str] = None
     assistant_id: Optional[str] = None
     model: Optional[str] = None
     stream: bool = True
+    status: str = "queued"  # queued, in_progress, completed, failed or cancelled
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    failed_at: Optional[datetime] = None
+    cancelled_at: Optional[datetime] = None
+    last_error: Optional[AssistantThreadRunError] = None
+    trace: Optional[Dict[str, Any]] = None  # Timings and counters collected while the run executes
 
     class Config:
         json_encoders = {
             datetime: lambda v: int(v.timestamp())  # Converts datetime to Unix timestamp for JSON output
         }
 
+    def to_bson(self) -> dict:
+        """Convert to BSON document for MongoDB insertion."""
+        document = self.model_dump(exclude_none=True)
+        document["_id"] = document.pop("id")
+        return document
+
+    @classmethod
+    def from_bson(cls, document) -> 'AssistantThreadRun':
+        """Convert from BSON document to Pydantic model."""
+        document['id'] = document.pop('_id')
+        return cls(**document)
@@ -0,0 +1,7 @@
+from typing import Optional
+from pydantic import BaseModel
+
+class AssistantThreadRunInputModel(BaseModel):
+    assistant_id: Optional[str] = None
+    model: Optional[str] = None
+    stream: bool = True
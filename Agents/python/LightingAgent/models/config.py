@@ -10,7 +10,8 @@ class OpenAIConfig(BaseModel):
     org_id: Optional[str] = Field(None, alias="OrgId")
 
 class PluginService(BaseModel):
-    endpoints: List[str] = Field(..., alias="Endpoints")
+    endpoints: List[str] = Field(default_factory=list, alias="Endpoints")
+    mode: str = Field("Http", alias="Mode")  # Http, or InProcess to run the plugin's operations inside the agent
 
 class Config(BaseModel):
     openai: OpenAIConfig = Field(..., alias="OpenAI")
@@ -0,0 +1,127 @@
+import os
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import bson
+from motor.motor_asyncio import AsyncIOMotorCollection
+from models.assistant_message_content import AssistantMessageContent
+from services.message_writer import MessageWriter
+
+@dataclass
+class ChatHistoryCacheEntry:
+    messages: List[AssistantMessageContent] = field(default_factory=list)
+    size_bytes: int = 0
+
+class ChatHistoryCache:
+    """LRU cache of already-deserialized thread messages, bounded by thread count and by bytes.
+
+    Sizes are measured as the BSON size of the stored documents. Messages persisted after a
+    thread is cached are appended to its entry, so warm runs never reload the thread from MongoDB.
+    A thread whose messages fail to persist is evicted (see MessageWriter's on_write_failed), so
+    the cache never holds messages MongoDB doesn't have.
+    """
+
+    def __init__(self, max_threads: int = 1000, max_bytes: int = 64 * 1024 * 1024):
+        self.max_threads = max_threads
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, ChatHistoryCacheEntry] = OrderedDict()
+
+        # Threads currently being loaded from MongoDB, mapped to whether they were written to meanwhile
+        self._loads: Dict[str, bool] = {}
+
+    async def get_messages(self, thread_id: str, messages_collection: AsyncIOMotorCollection, message_writer: Optional[MessageWriter] = None) -> List[AssistantMessageContent]:
+        """Return the thread's messages in creation order, loading them from MongoDB on a miss.
+
+        On a miss, the thread's writes still in flight in message_writer are awaited first, so
+        the load includes the previous run's messages. The returned list is a copy, so callers
+        are free to add to it.
+        """
+        entry = self._entries.get(thread_id)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(thread_id)
+            return list(entry.messages)
+
+        self.misses += 1
+        self._loads[thread_id] = False
+        try:
+            if message_writer is not None:
+                await message_writer.wait_for_thread(thread_id)
+            documents = await messages_collection.find({"thread_id": thread_id}).sort([("created_at", 1), ("_id", 1)]).to_list(None)
+        except BaseException:
+            self._loads.pop(thread_id, None)
+            raise
+
+        entry = ChatHistoryCacheEntry()
+        for document in documents:
+            entry.size_bytes += len(bson.encode(document))
+            entry.messages.append(AssistantMessageContent.from_bson(document))
+
+        # Only cache the load if nothing was persisted to the thread while it was in flight
+        stale = self._loads.pop(thread_id, True)
+        if not stale:
+            self._store(thread_id, entry)
+        return list(entry.messages)
+
+    def append(self, thread_id: str, document: dict):
+        """Append a message document that has just been persisted to the thread's cached entry, if any."""
+        if thread_id in self._loads:
+            self._loads[thread_id] = True
+
+        entry = self._entries.get(thread_id)
+        if entry is None:
+            return
+
+        size_bytes = len(bson.encode(document))
+        entry.messages.append(AssistantMessageContent.from_bson(dict(document)))
+        entry.size_bytes += size_bytes
+        self.size_bytes += size_bytes
+        self._entries.move_to_end(thread_id)
+        self._evict_over_limit()
+
+    def evict(self, thread_id: str):
+        if thread_id in self._loads:
+            self._loads[thread_id] = True
+
+        entry = self._entries.pop(thread_id, None)
+        if entry is not None:
+            self.size_bytes -= entry.size_bytes
+
+    def get_statistics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "threads": len(self._entries),
+            "max_threads": self.max_threads,
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+    def _store(self, thread_id: str, entry: ChatHistoryCacheEntry):
+        if entry.size_bytes > self.max_bytes:
+            return
+        self.evict(thread_id)
+        self._entries[thread_id] = entry
+        self.size_bytes += entry.size_bytes
+        self._evict_over_limit()
+
+    def _evict_over_limit(self):
+        while self._entries and (len(self._entries) > self.max_threads or self.size_bytes > self.max_bytes):
+            _, entry = self._entries.popitem(last=False)
+            self.size_bytes -= entry.size_bytes
+            self.evictions += 1
+
+chat_history_cache = ChatHistoryCache(
+    max_threads=int(os.getenv('CHAT_HISTORY_CACHE_MAX_THREADS', 1000)),
+    max_bytes=int(os.getenv('CHAT_HISTORY_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+)
+
+def get_chat_history_cache() -> ChatHistoryCache:
+    return chat_history_cache
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Callable, Optional, Tuple
+from semantic_kernel.kernel import Kernel
+from semantic_kernel.functions.kernel_arguments import KernelArguments
+
+logger = logging.getLogger(__name__)
+
+# Read-only plugin operations whose results describe the devices, as (plugin name, operationId).
+# The speaker plugin has no read operation, so only the lights are prefetched.
+PREFETCH_OPERATIONS: Tuple[Tuple[str, str], ...] = (
+    ("light_plugin", "get_all_lights"),
+)
+
+class DeviceStatePrefetcher:
+    """Fetches the current device state at the start of a run so the model can act in its first turn.
+
+    The operations are invoked through the run's kernel, so their results also land in the
+    run's plugin call cache. Only the operations of plugins the run advertises to the model
+    are fetched, so a run that needs none of them doesn't pay for the snapshot. A prefetch
+    that takes longer than timeout_seconds is abandoned and the run continues without a
+    snapshot.
+    """
+
+    def __init__(self, enabled: bool = False, timeout_seconds: float = 0.5, operations: Tuple[Tuple[str, str], ...] = PREFETCH_OPERATIONS):
+        self.enabled = enabled
+        self.timeout_seconds = timeout_seconds
+        self.operations = operations
+        self.attempts = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.skipped = 0
+        self.prefetch_seconds_total = 0.0
+
+        # Model requests per run, split by whether the run had a snapshot, to see the round trips saved
+        self._model_requests = {True: [0, 0], False: [0, 0]}
+
+    async def prefetch(self, kernel: Kernel, advertises: Callable[[str], bool] = lambda plugin_name: True) -> Optional[str]:
+        """Return a compact description of the devices for the system message, or None if disabled, not needed or too slow.
+
+        advertises tells whether the run offers a plugin's functions to the model; operations of
+        other plugins are skipped.
+        """
+        if not self.enabled:
+            return None
+        operations = [(plugin_name, function_name) for plugin_name, function_name in self.operations if advertises(plugin_name)]
+        if not operations:
+            self.skipped += 1
+            return None
+
+        self.attempts += 1
+        start = time.perf_counter()
+        try:
+            results = await asyncio.wait_for(
+                asyncio.gather(*[
+                    kernel.invoke(plugin_name=plugin_name, function_name=function_name, arguments=KernelArguments())
+                    for plugin_name, function_name in operations
+                ]),
+                self.timeout_seconds
+            )
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            return None
+        except Exception:
+            logger.warning("Prefetching the device state failed", exc_info=True)
+            self.failures += 1
+            return None
+        finally:
+            self.prefetch_seconds_total += time.perf_counter() - start
+
+        lines = ["The current state of the devices, fetched when this run started (call the plugins again for anything newer):"]
+        for (plugin_name, function_name), result in zip(operations, results):
+            lines.append(f"{plugin_name}.{function_name}: {self._compact(result.value if result else None)}")
+        return "\n".join(lines)
+
+    def record_run(self, prefetched: bool, model_requests: int):
+        counts = self._model_requests[prefetched]
+        counts[0] += 1
+        counts[1] += model_requests
+
+    def get_statistics(self) -> dict:
+        with_snapshot, without_snapshot = self._model_requests[True], self._model_requests[False]
+        succeeded = self.attempts - self.timeouts - self.failures
+        return {
+            "enabled": self.enabled,
+            "timeout_seconds": self.timeout_seconds,
+            "attempts": self.attempts,
+            "succeeded": succeeded,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "prefetch_ms_avg": self.prefetch_seconds_total * 1000 / self.attempts if self.attempts else 0.0,
+            "runs_with_snapshot": with_snapshot[0],
+            "model_requests_avg_with_snapshot": with_snapshot[1] / with_snapshot[0] if with_snapshot[0] else None,
+            "runs_without_snapshot": without_snapshot[0],
+            "model_requests_avg_without_snapshot": without_snapshot[1] / without_snapshot[0] if without_snapshot[0] else None,
+        }
+
+    def _compact(self, value) -> str:
+        # Re-serialize JSON responses without whitespace to keep the system message small
+        if isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                return value
+        return json.dumps(value, separators=(",", ":"), default=str)
+
+device_state_prefetcher = DeviceStatePrefetcher(
+    enabled=os.getenv('RUN_PREFETCH_DEVICE_STATE', 'false').lower() in ('1', 'true', 'yes'),
+    timeout_seconds=float(os.getenv('RUN_PREFETCH_TIMEOUT_SECONDS', 0.5))
+)
+
+def get_device_state_prefetcher() -> DeviceStatePrefetcher:
+    return device_state_prefetcher
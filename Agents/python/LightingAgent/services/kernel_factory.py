@@ -0,0 +1,168 @@
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+import httpx
+from semantic_kernel.kernel import Kernel
+from semantic_kernel.functions.kernel_plugin import KernelPlugin
+from semantic_kernel.connectors.ai.chat_completion_client_base import ChatCompletionClientBase
+from semantic_kernel.connectors.ai.open_ai import (
+    AzureChatCompletion,
+    OpenAIChatCompletion,
+)
+from semantic_kernel.connectors.openapi_plugin.openapi_function_execution_parameters import (
+    OpenAPIFunctionExecutionParameters,
+)
+from models.config import Config
+from database_manager import DatabaseManager
+from services.native_plugins import NATIVE_PLUGINS, create_native_plugin
+
+logger = logging.getLogger(__name__)
+
+CONFIG_PATH = "../../../config.json"
+OPENAPI_PLUGINS_DIRECTORY = "../../../PluginResources/OpenApiPlugins"
+
+# The OpenAPI plugins the agent uses, keyed by plugin name: (plugin service name, swagger file)
+# Plugins whose service is configured with "Mode": "InProcess" run natively instead, with the same functions
+OPENAPI_PLUGINS: Dict[str, Tuple[str, str]] = {
+    "light_plugin": ("LightService", "LightPlugin.swagger.json"),
+    "scene_plugin": ("SceneService", "ScenePlugin.swagger.json"),
+    "speaker_plugin": ("SpeakerService", "SpeakerPlugin.swagger.json"),
+}
+
+class KernelFactory:
+    """Builds the chat service and OpenAPI plugins once and hands out cheap per-run kernels.
+
+    Everything expensive (reading config.json, creating the chat completion client and
+    parsing the swagger files) happens at startup and again only when config.json or a
+    file in PluginResources/OpenApiPlugins changes on disk. If a changed file can't be
+    built, the last good kernel keeps being served until the file changes again.
+    """
+    config: Optional[Config] = None
+    chat_completion: Optional[ChatCompletionClientBase] = None
+
+    def __init__(self, config_path: str = CONFIG_PATH, plugins_directory: str = OPENAPI_PLUGINS_DIRECTORY):
+        self.config_path = config_path
+        self.plugins_directory = plugins_directory
+        self.http_client: Optional[httpx.AsyncClient] = None
+        self.db_manager: Optional[DatabaseManager] = None
+        self._plugins: Dict[Tuple[str, Optional[str]], KernelPlugin] = {}
+        self._native_plugins: Dict[str, KernelPlugin] = {}
+        self._signature: Optional[Tuple] = None
+
+    def initialize(self, http_client: httpx.AsyncClient, db_manager: Optional[DatabaseManager] = None):
+        self.http_client = http_client
+        self.db_manager = db_manager
+        self._build()
+
+    def is_in_process(self, service_name: str) -> bool:
+        plugin_service = self.config.plugin_services.get(service_name)
+        return plugin_service is not None and plugin_service.mode == "InProcess"
+
+    def get_http_service_names(self) -> List[str]:
+        """The plugin services runs reach over HTTP, and so need an endpoint for."""
+        return [service_name for service_name, _ in OPENAPI_PLUGINS.values() if not self.is_in_process(service_name)]
+
+    def refresh_if_changed(self) -> bool:
+        """Rebuild the shared state if config.json or an OpenAPI document changed; returns True on rebuild."""
+        signature = self._get_signature()
+        if self._signature == signature:
+            return False
+
+        previous = (self.config, self.chat_completion, self._plugins, self._native_plugins)
+        try:
+            self._build()
+        except Exception:
+            # Remember the broken files so they aren't rebuilt on every run, and keep serving the last good kernel
+            self.config, self.chat_completion, self._plugins, self._native_plugins = previous
+            self._signature = signature
+            logger.exception("Failed to rebuild the kernel after %s or an OpenAPI plugin changed; keeping the previous one", self.config_path)
+            return False
+        return True
+
+    def create_kernel(self, plugin_endpoints: Dict[str, str]) -> Kernel:
+        """Create a per-run kernel that shares the chat service and plugin functions.
+
+        plugin_endpoints maps a plugin service name (e.g. "LightService") to the endpoint
+        the run should call; plugins are parsed once per endpoint and then reused. In-process
+        services need no endpoint.
+        """
+        plugins = {}
+        for plugin_name, (service_name, _) in OPENAPI_PLUGINS.items():
+            if plugin_name in self._native_plugins:
+                plugins[plugin_name] = self._native_plugins[plugin_name]
+            else:
+                plugins[plugin_name] = self._get_plugin(plugin_name, plugin_endpoints[service_name])
+
+        return Kernel(services=[self.chat_completion], plugins=plugins)
+
+    def _build(self):
+        # Take the signature before reading so a change during the rebuild triggers another one
+        signature = self._get_signature()
+
+        # Load variables from config.json at the root of the solution
+        with open(self.config_path) as file:
+            json_data = json.load(file)
+            config: Config = Config(**json_data)
+
+        self.chat_completion = self._create_chat_completion(config)
+        self.config = config
+        self._plugins = {}
+        self._native_plugins = {}
+        self._signature = signature
+
+        # Parse the plugins for every configured endpoint up front so runs never have to
+        for plugin_name, (service_name, _) in OPENAPI_PLUGINS.items():
+            if self.is_in_process(service_name):
+                if plugin_name not in NATIVE_PLUGINS:
+                    raise ValueError(f"{service_name} can't run in-process; set its Mode to Http.")
+                self._native_plugins[plugin_name] = create_native_plugin(plugin_name, self._get_plugin(plugin_name, None), self.db_manager)
+                continue
+            plugin_service = config.plugin_services.get(service_name)
+            for endpoint in (plugin_service.endpoints if plugin_service else []):
+                self._get_plugin(plugin_name, endpoint)
+
+    def _create_chat_completion(self, config: Config) -> ChatCompletionClientBase:
+        deployment_type, api_key, ai_model_id, deployment_name, endpoint, org_id = config.openai.model_dump().values()
+
+        if (deployment_type == "AzureOpenAI"):
+            return AzureChatCompletion(
+                deployment_name=deployment_name,
+                api_key=api_key,
+                endpoint=endpoint,
+            )
+        elif (deployment_type == "OpenAI"):
+            return OpenAIChatCompletion(
+                api_key=api_key,
+                ai_model_id=ai_model_id,
+                org_id=org_id, # org_id is optional
+            )
+        raise ValueError(f"Unknown OpenAI deployment type: {deployment_type}")
+
+    def _get_plugin(self, plugin_name: str, endpoint: Optional[str]) -> KernelPlugin:
+        plugin = self._plugins.get((plugin_name, endpoint))
+        if plugin is None:
+            _, document_name = OPENAPI_PLUGINS[plugin_name]
+            plugin = KernelPlugin.from_openapi(
+                plugin_name=plugin_name,
+                openapi_document_path=os.path.join(self.plugins_directory, document_name),
+                execution_settings=OpenAPIFunctionExecutionParameters(
+                    http_client=self.http_client,
+                    server_url_override=endpoint,
+                    enable_payload_namespacing=True,
+                ),
+            )
+            self._plugins[(plugin_name, endpoint)] = plugin
+        return plugin
+
+    def _get_signature(self) -> Tuple:
+        paths = [self.config_path] + sorted(
+            os.path.join(self.plugins_directory, name) for name in os.listdir(self.plugins_directory)
+        )
+        # A missing config.json counts as a change, which the rebuild then reports
+        return tuple((path, os.stat(path).st_mtime_ns if os.path.exists(path) else None) for path in paths)
+
+kernel_factory = KernelFactory()
+
+def get_kernel_factory() -> KernelFactory:
+    return kernel_factory
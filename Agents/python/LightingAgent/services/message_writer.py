@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Set
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+logger = logging.getLogger(__name__)
+
+DIRECT = "direct"
+WRITE_BEHIND = "write_behind"
+
+class MessageWriter:
+    """Persists the messages produced by runs, with one write per run or in batches across runs.
+
+    In "direct" mode each run's messages are written with one ordered insert_many that the run
+    awaits, so they are in MongoDB before the run completes and a failed write fails the run.
+    In "write_behind" mode the messages are put on a bounded in-process queue that a
+    background writer flushes in ordered batches; a full queue applies backpressure to the
+    runs, and a run completes before its messages are written. Either way, stop() flushes
+    everything still pending.
+
+    Writes still in flight are tracked per thread, so a thread can be loaded from MongoDB
+    only once its previous run's messages have landed (wait_for_thread). If a write fails,
+    on_write_failed is called with each of its threads, so caches holding the unwritten
+    messages can drop them.
+    """
+    collection: Optional[AsyncIOMotorCollection] = None
+
+    def __init__(self, mode: str = DIRECT, max_queue_size: int = 10000, batch_size: int = 500, flush_interval_seconds: float = 0.05):
+        if mode not in (DIRECT, WRITE_BEHIND):
+            raise ValueError(f"Unknown message write mode: {mode}")
+        self.mode = mode
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.messages_written = 0
+        self.messages_failed = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._pending_writes: Set[asyncio.Task] = set()
+        self._pending_by_thread: Dict[str, Set[asyncio.Future]] = {}
+        self._on_write_failed: Optional[Callable[[str], None]] = None
+
+    def start(self, collection: AsyncIOMotorCollection, on_write_failed: Optional[Callable[[str], None]] = None):
+        self.collection = collection
+        self._on_write_failed = on_write_failed
+        if self.mode == WRITE_BEHIND:
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._writer_task = asyncio.create_task(self._write_behind_loop())
+
+    async def stop(self):
+        """Flush every pending message and stop the background writer."""
+        if self._pending_writes:
+            await asyncio.gather(*self._pending_writes, return_exceptions=True)
+        if self._writer_task:
+            await self._queue.join()
+            self._writer_task.cancel()
+            try:
+                await self._writer_task
+            except asyncio.CancelledError:
+                pass
+            self._writer_task = None
+
+    async def write(self, documents: List[dict]):
+        """Persist message documents in order.
+
+        In direct mode this returns once they are written and raises if the write failed; in
+        write-behind mode it returns once they are queued.
+        """
+        if not documents:
+            return
+
+        thread_ids = {document["thread_id"] for document in documents}
+        if self.mode == WRITE_BEHIND:
+            # Batches are written in queue order, so the write is done once its last document is
+            written = asyncio.get_running_loop().create_future()
+            self._track(thread_ids, written)
+            for index, document in enumerate(documents):
+                await self._queue.put((document, written if index == len(documents) - 1 else None))
+            return
+
+        # The insert runs in a task so a cancelled run doesn't abandon it half way and stop() can still wait for it
+        task = asyncio.create_task(self._insert(documents))
+        self._pending_writes.add(task)
+        task.add_done_callback(self._pending_writes.discard)
+        self._track(thread_ids, task)
+        await asyncio.shield(task)
+
+    async def wait_for_thread(self, thread_id: str):
+        """Wait until the messages handed off for the thread so far are written (or have failed)."""
+        pending = self._pending_by_thread.get(thread_id)
+        if pending:
+            await asyncio.wait(list(pending))
+
+    def get_statistics(self) -> dict:
+        return {
+            "mode": self.mode,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "max_queue_size": self.max_queue_size,
+            "writes_in_flight": len(self._pending_writes),
+            "threads_with_pending_writes": len(self._pending_by_thread),
+            "messages_written": self.messages_written,
+            "messages_failed": self.messages_failed,
+        }
+
+    async def _write_behind_loop(self):
+        while True:
+            batch = [await self._queue.get()]
+
+            # Give other runs a moment to add to the batch before flushing it
+            deadline = asyncio.get_running_loop().time() + self.flush_interval_seconds
+            while len(batch) < self.batch_size:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._insert([document for document, _ in batch])
+            except Exception:
+                # Already logged and reported; the runs that queued the batch have completed
+                pass
+            finally:
+                for _, written in batch:
+                    if written is not None and not written.done():
+                        written.set_result(None)
+                    self._queue.task_done()
+
+    async def _insert(self, documents: List[dict]):
+        try:
+            await self.collection.insert_many(documents, ordered=True)
+            self.messages_written += len(documents)
+        except Exception:
+            self.messages_failed += len(documents)
+            logger.exception("Failed to persist %d run messages", len(documents))
+            if self._on_write_failed is not None:
+                for thread_id in {document["thread_id"] for document in documents}:
+                    self._on_write_failed(thread_id)
+            raise
+
+    def _track(self, thread_ids: Iterable[str], write: asyncio.Future):
+        for thread_id in thread_ids:
+            self._pending_by_thread.setdefault(thread_id, set()).add(write)
+        write.add_done_callback(lambda _: self._untrack(thread_ids, write))
+
+    def _untrack(self, thread_ids: Iterable[str], write: asyncio.Future):
+        for thread_id in thread_ids:
+            pending = self._pending_by_thread.get(thread_id)
+            if pending is not None:
+                pending.discard(write)
+                if not pending:
+                    del self._pending_by_thread[thread_id]
+
+message_writer = MessageWriter(
+    mode=os.getenv('MESSAGE_WRITE_MODE', DIRECT),
+    max_queue_size=int(os.getenv('MESSAGE_WRITE_QUEUE_SIZE', 10000)),
+    batch_size=int(os.getenv('MESSAGE_WRITE_BATCH_SIZE', 500)),
+    flush_interval_seconds=int(os.getenv('MESSAGE_WRITE_FLUSH_INTERVAL_MS', 50)) / 1000
+)
+
+def get_message_writer() -> MessageWriter:
+    return message_writer
@@ -0,0 +1,128 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+from typing import Dict, Optional, Type
+from semantic_kernel.functions import kernel_function
+from semantic_kernel.functions.kernel_function_from_method import KernelFunctionFromMethod
+from semantic_kernel.functions.kernel_plugin import KernelPlugin
+from database_manager import DatabaseManager
+
+# The seed data stores brightness as a level name; the swagger schema uses 0-255
+BRIGHTNESS_LEVELS = {"Low": 85, "Medium": 170, "High": 255}
+
+# Longest a scheduled change waits before it is applied, so a bad timestamp can't hold a tool call forever
+MAX_SCHEDULE_DELAY_SECONDS = 60
+
+async def _wait_until(scheduled_time: Optional[str]):
+    if not scheduled_time:
+        return
+    scheduled = datetime.fromisoformat(scheduled_time)
+    now = datetime.now(timezone.utc) if scheduled.tzinfo else datetime.now()
+    delay = (scheduled - now).total_seconds()
+    if delay > 0:
+        await asyncio.sleep(min(delay, MAX_SCHEDULE_DELAY_SECONDS))
+
+class LightPlugin:
+    """In-process implementation of the LightService operations, on the Lights and SmartDevices collections."""
+
+    def __init__(self, db_manager: DatabaseManager):
+        self.db_manager = db_manager
+
+    async def get_all_lights(self) -> str:
+        lights = await self.db_manager.lights_collection.aggregate(self._with_device_names()).to_list(None)
+        return json.dumps([self._to_light_state(light) for light in lights])
+
+    async def get_light(self, id: str) -> str:
+        return json.dumps(self._to_light_state(await self._find_light(id)))
+
+    async def change_light_state(
+            self,
+            id: str,
+            isOn: Optional[bool] = None,
+            hexColor: Optional[str] = None,
+            brightness: Optional[int] = None,
+            fadeDurationInMilliseconds: Optional[int] = None,
+            scheduledTime: Optional[str] = None
+        ) -> str:
+        await _wait_until(scheduledTime)
+
+        changes = {"IsOn": isOn, "HexColor": hexColor, "Brightness": brightness}
+        changes = {name: value for name, value in changes.items() if value is not None}
+        if changes:
+            result = await self.db_manager.lights_collection.update_one({"_id": id}, {"$set": changes})
+            if result.matched_count == 0:
+                raise ValueError(f"Light with ID '{id}' not found.")
+        return await self.get_light(id)
+
+    async def _find_light(self, id: str) -> dict:
+        lights = await self.db_manager.lights_collection.aggregate([{"$match": {"_id": id}}] + self._with_device_names()).to_list(1)
+        if not lights:
+            raise ValueError(f"Light with ID '{id}' not found.")
+        return lights[0]
+
+    def _with_device_names(self) -> list:
+        return [{"$lookup": {"from": "SmartDevices", "localField": "_id", "foreignField": "_id", "as": "device"}}]
+
+    def _to_light_state(self, light: dict) -> dict:
+        brightness = light.get("Brightness")
+        return {
+            "id": light["_id"],
+            "name": light["device"][0].get("Name") if light.get("device") else None,
+            "on": light.get("IsOn"),
+            "brightness": BRIGHTNESS_LEVELS.get(brightness, brightness) if isinstance(brightness, str) else brightness,
+            "hexColor": light.get("HexColor"),
+        }
+
+class SpeakerPlugin:
+    """In-process implementation of the SpeakerService operations, on the Speakers collection.
+
+    There is no audio device in the agent's process, so the speaker's state is only recorded.
+    """
+
+    def __init__(self, db_manager: DatabaseManager):
+        self.db_manager = db_manager
+
+    async def load_song(self, relativePath: Optional[str] = None) -> str:
+        if not relativePath:
+            raise ValueError("Error loading song: no song was given.")
+        if relativePath.startswith("/mnt/data/"):
+            relativePath = relativePath[len("/mnt/data/"):]
+
+        result = await self.db_manager.speakers_collection.update_one({}, {"$set": {"CurrentSong": relativePath, "IsPlaying": False}})
+        if result.matched_count == 0:
+            raise ValueError("Error loading song: there is no speaker.")
+        return "Song loaded successfully."
+
+    async def play_song(self, scheduledTime: Optional[str] = None) -> str:
+        await _wait_until(scheduledTime)
+
+        result = await self.db_manager.speakers_collection.update_one({"CurrentSong": {"$ne": None}}, {"$set": {"IsPlaying": True}})
+        if result.matched_count == 0:
+            raise ValueError("Error playing song: load a song before playing it.")
+        return "Song is playing."
+
+# Plugins that can run in the agent's process, keyed by plugin name
+NATIVE_PLUGINS: Dict[str, Type] = {
+    "light_plugin": LightPlugin,
+    "speaker_plugin": SpeakerPlugin,
+}
+
+def _create_method(name: str, description: Optional[str], implementation):
+    @kernel_function(name=name, description=description)
+    async def run_in_process(**kwargs) -> str:
+        return await implementation(**kwargs)
+    return run_in_process
+
+def create_native_plugin(plugin_name: str, openapi_plugin: KernelPlugin, db_manager: DatabaseManager) -> KernelPlugin:
+    """Create a plugin whose functions have the names and schemas of the OpenAPI plugin's operations but run in-process."""
+    implementation = NATIVE_PLUGINS[plugin_name](db_manager)
+    functions = []
+    for function in openapi_plugin.functions.values():
+        functions.append(KernelFunctionFromMethod(
+            method=_create_method(function.name, function.description, getattr(implementation, function.name)),
+            plugin_name=plugin_name,
+            parameters=function.parameters,
+            return_parameter=function.return_parameter,
+            additional_metadata={**(function.metadata.additional_properties or {}), "in_process": True},
+        ))
+    return KernelPlugin(name=plugin_name, description=openapi_plugin.description, functions=functions)
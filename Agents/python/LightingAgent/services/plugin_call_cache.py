@@ -0,0 +1,179 @@
+import json
+import os
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+from semantic_kernel.filters.functions.function_invocation_context import FunctionInvocationContext
+from semantic_kernel.functions.function_result import FunctionResult
+
+@dataclass(frozen=True)
+class PluginCallCachePolicy:
+    """How one OpenAPI operation interacts with the cache.
+
+    A read names the resource it returns and may be served from the cache; a write names
+    the resources it changes, whose cached reads are dropped. Resources are templates
+    filled in from the call's arguments, e.g. "Light/{id}".
+    """
+    reads: Optional[str] = None
+    invalidates: Tuple[str, ...] = ()
+
+# The cacheable and invalidating operations, keyed by plugin name and then operationId.
+# Operations that aren't listed (e.g. scene generation or playing a song) always run.
+PLUGIN_CALL_CACHE_POLICIES: Dict[str, Dict[str, PluginCallCachePolicy]] = {
+    "light_plugin": {
+        "get_all_lights": PluginCallCachePolicy(reads="Light"),
+        "get_light": PluginCallCachePolicy(reads="Light/{id}"),
+        "change_light_state": PluginCallCachePolicy(invalidates=("Light/{id}", "Light")),
+    },
+}
+
+def _format_resource(template: str, context: FunctionInvocationContext) -> Optional[str]:
+    try:
+        return template.format(**context.arguments)
+    except (KeyError, IndexError):
+        return None
+
+class PluginCallCache:
+    """Cross-run cache of read-only plugin call results with a short TTL.
+
+    The cache is off when ttl_seconds is 0. Writes made through the agent invalidate the
+    resources they touch right away, but changes made elsewhere (e.g. by another agent)
+    only show up once the entry expires, so keep the TTL short.
+
+    The cache also versions every resource; a read only fills a cache, shared or
+    run-scoped, if no write to its resource started while the read was in flight.
+    """
+
+    def __init__(self, ttl_seconds: float = 0.0, max_entries: int = 1000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: OrderedDict[str, Tuple[float, str, FunctionResult]] = OrderedDict()
+        self._generations: Dict[str, int] = defaultdict(int)
+
+    def get(self, key: str) -> Optional[FunctionResult]:
+        if self.ttl_seconds <= 0:
+            return None
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[2]
+
+    def put(self, key: str, resource: str, result: FunctionResult, generation: int):
+        if self.ttl_seconds <= 0 or self._generations[resource] != generation:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, resource, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_generation(self, resource: str) -> int:
+        return self._generations[resource]
+
+    def invalidate(self, resources: Iterable[str]):
+        resources = set(resources)
+        for resource in resources:
+            self._generations[resource] += 1
+        self.invalidations += 1
+        for key in [key for key, (_, resource, _) in self._entries.items() if resource in resources]:
+            del self._entries[key]
+
+    def get_statistics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "ttl_seconds": self.ttl_seconds,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+class RunPluginCallCache:
+    """Function invocation filter that caches a run's read-only plugin calls.
+
+    Reads are answered from the run's own cache first, then from the shared TTL cache.
+    Create one per run; its hit counts go into the run's trace.
+    """
+
+    def __init__(self, shared_cache: PluginCallCache, policies: Dict[str, Dict[str, PluginCallCachePolicy]] = PLUGIN_CALL_CACHE_POLICIES):
+        self.shared_cache = shared_cache
+        self.policies = policies
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: Dict[str, Tuple[str, int, FunctionResult]] = {}
+
+    async def __call__(self, context: FunctionInvocationContext, next: Callable[[FunctionInvocationContext], Awaitable[None]]):
+        function = context.function
+        policy = self.policies.get(function.plugin_name, {}).get(function.name)
+        if policy is None:
+            await next(context)
+        elif policy.invalidates:
+            await self._write(context, next, policy)
+        elif policy.reads:
+            await self._read(context, next, policy)
+        else:
+            await next(context)
+
+    def get_trace(self) -> dict:
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.shared_hits) / lookups, 3) if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+    async def _read(self, context: FunctionInvocationContext, next, policy: PluginCallCachePolicy):
+        resource = _format_resource(policy.reads, context)
+        if resource is None:
+            await next(context)
+            return
+
+        key = json.dumps([context.function.fully_qualified_name, dict(context.arguments)], sort_keys=True, default=str)
+        generation = self.shared_cache.get_generation(resource)
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] == generation:
+            self.hits += 1
+            context.result = entry[2]
+            return
+        result = self.shared_cache.get(key)
+        if result is not None:
+            self.shared_hits += 1
+            self._entries[key] = (resource, generation, result)
+            context.result = result
+            return
+
+        self.misses += 1
+        await next(context)
+        if context.result is None or self.shared_cache.get_generation(resource) != generation:
+            return
+        self._entries[key] = (resource, generation, context.result)
+        self.shared_cache.put(key, resource, context.result, generation)
+
+    async def _write(self, context: FunctionInvocationContext, next, policy: PluginCallCachePolicy):
+        resources = [resource for resource in (_format_resource(template, context) for template in policy.invalidates) if resource]
+        # Invalidate before the write so concurrent reads don't get cached, and after so reads made meanwhile are dropped
+        self.invalidations += 1
+        self.shared_cache.invalidate(resources)
+        try:
+            await next(context)
+        finally:
+            self.shared_cache.invalidate(resources)
+
+plugin_call_cache = PluginCallCache(
+    ttl_seconds=float(os.getenv('PLUGIN_CALL_CACHE_TTL_SECONDS', 0)),
+    max_entries=int(os.getenv('PLUGIN_CALL_CACHE_MAX_ENTRIES', 1000))
+)
+
+def get_plugin_call_cache() -> PluginCallCache:
+    return plugin_call_cache
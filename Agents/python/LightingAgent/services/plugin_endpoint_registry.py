@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+from httpx import AsyncClient
+from models.config import PluginService
+from services.health_check_service import HealthCheckService
+from services.kernel_factory import kernel_factory
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class EndpointState:
+    endpoint: str
+    healthy: bool = False
+    latency_ms: Optional[float] = None
+    consecutive_failures: int = 0
+    circuit_open_until: float = 0.0
+    last_checked_at: Optional[float] = None
+
+    def is_circuit_open(self, now: float) -> bool:
+        return now < self.circuit_open_until
+
+class PluginEndpointRegistry:
+    """Keeps the health of every plugin service endpoint up to date in the background.
+
+    All endpoints are probed concurrently on an interval. Each service's preferred endpoint
+    (the healthy one with the lowest smoothed latency) is precomputed after every round so
+    runs can look it up without waiting on the network. Endpoints that fail
+    failure_threshold probes in a row have their circuit opened and are neither selected
+    nor probed again until circuit_open_seconds have passed.
+    """
+
+    def __init__(
+            self,
+            plugin_services_provider: Callable[[], Dict[str, PluginService]],
+            interval_seconds: float = 10.0,
+            probe_timeout_seconds: float = 2.0,
+            failure_threshold: int = 3,
+            circuit_open_seconds: float = 30.0,
+            latency_smoothing: float = 0.3,
+            health_check_path: str = "/health"
+        ):
+        self.plugin_services_provider = plugin_services_provider
+        self.interval_seconds = interval_seconds
+        self.probe_timeout_seconds = probe_timeout_seconds
+        self.failure_threshold = failure_threshold
+        self.circuit_open_seconds = circuit_open_seconds
+        self.latency_smoothing = latency_smoothing
+        self.health_check_path = health_check_path
+        self._health_check_service: Optional[HealthCheckService] = None
+        self._states: Dict[str, EndpointState] = {}
+        self._selected: Dict[str, Optional[str]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, client: AsyncClient):
+        """Run a first probe round so runs have endpoints right away, then keep probing in the background."""
+        self._health_check_service = HealthCheckService(client)
+        await self.probe_all()
+        self._task = asyncio.create_task(self._probe_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_endpoint(self, service_name: str) -> str:
+        """Return the preferred endpoint for a plugin service from the cached health state."""
+        endpoint = self._selected.get(service_name)
+        if endpoint is None:
+            plugin_service = self.plugin_services_provider().get(service_name)
+            raise Exception("All endpoints are down: " + str(plugin_service.endpoints if plugin_service else []))
+        return endpoint
+
+    def get_states(self) -> Dict[str, List[dict]]:
+        now = time.monotonic()
+        return {
+            service_name: [
+                {
+                    "endpoint": state.endpoint,
+                    "healthy": state.healthy,
+                    "latency_ms": state.latency_ms,
+                    "consecutive_failures": state.consecutive_failures,
+                    "circuit_open": state.is_circuit_open(now),
+                    "selected": state.endpoint == self._selected.get(service_name)
+                }
+                for state in self._get_service_states(plugin_service.endpoints)
+            ]
+            for service_name, plugin_service in self.plugin_services_provider().items()
+        }
+
+    async def probe_all(self):
+        plugin_services = self.plugin_services_provider()
+        now = time.monotonic()
+
+        # Probe every endpoint of every service at once, skipping those whose circuit is open
+        endpoints = {endpoint for plugin_service in plugin_services.values() for endpoint in plugin_service.endpoints}
+        states = [self._states.setdefault(endpoint, EndpointState(endpoint)) for endpoint in endpoints]
+        await asyncio.gather(*(self._probe(state) for state in states if not state.is_circuit_open(now)))
+
+        # Forget endpoints that are no longer configured
+        for endpoint in list(self._states):
+            if endpoint not in endpoints:
+                del self._states[endpoint]
+
+        self._selected = {
+            service_name: self._select(self._get_service_states(plugin_service.endpoints))
+            for service_name, plugin_service in plugin_services.items()
+        }
+
+    async def _probe_loop(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.probe_all()
+            except Exception:
+                logger.exception("Failed to probe plugin service endpoints")
+
+    async def _probe(self, state: EndpointState):
+        start = time.perf_counter()
+        try:
+            healthy = await asyncio.wait_for(
+                self._health_check_service.is_endpoint_healthy(state.endpoint, self.health_check_path),
+                timeout=self.probe_timeout_seconds
+            )
+        except asyncio.TimeoutError:
+            healthy = False
+        latency_ms = (time.perf_counter() - start) * 1000
+        state.last_checked_at = time.time()
+
+        if healthy:
+            state.healthy = True
+            state.consecutive_failures = 0
+            state.circuit_open_until = 0.0
+            if state.latency_ms is None:
+                state.latency_ms = latency_ms
+            else:
+                state.latency_ms += self.latency_smoothing * (latency_ms - state.latency_ms)
+        else:
+            state.healthy = False
+            state.consecutive_failures += 1
+            if state.consecutive_failures >= self.failure_threshold:
+                state.circuit_open_until = time.monotonic() + self.circuit_open_seconds
+
+    def _get_service_states(self, endpoints: List[str]) -> List[EndpointState]:
+        return [self._states[endpoint] for endpoint in endpoints if endpoint in self._states]
+
+    def _select(self, states: List[EndpointState]) -> Optional[str]:
+        now = time.monotonic()
+        candidates = [state for state in states if state.healthy and not state.is_circuit_open(now)]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda state: state.latency_ms).endpoint
+
+plugin_endpoint_registry = PluginEndpointRegistry(lambda: kernel_factory.config.plugin_services)
+
+def get_plugin_endpoint_registry() -> PluginEndpointRegistry:
+    return plugin_endpoint_registry
@@ -0,0 +1,308 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import shutil
+import signal
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Annotated, Any, Awaitable, Callable, List, Optional
+from semantic_kernel.kernel import Kernel
+from semantic_kernel.functions import kernel_function
+from semantic_kernel.functions.kernel_arguments import KernelArguments
+from semantic_kernel.functions.kernel_function_metadata import KernelFunctionMetadata
+
+logger = logging.getLogger(__name__)
+
+PYTHON_PLANNER_PLUGIN_NAME = "python_planner"
+WORKER_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "utilities", "python_sandbox_worker.py")
+
+JSON_SCHEMA_PYTHON_TYPES = {
+    "string": "str",
+    "integer": "int",
+    "number": "float",
+    "boolean": "bool",
+    "array": "list",
+    "object": "dict",
+}
+
+def _python_type(schema: Optional[dict]) -> str:
+    if not schema:
+        return "Any"
+    if schema.get("type") == "array":
+        return f"List[{_python_type(schema.get('items'))}]"
+    return JSON_SCHEMA_PYTHON_TYPES.get(schema.get("type"), "Any")
+
+def generate_function_manual(functions: List[KernelFunctionMetadata]) -> str:
+    """Describe the functions a script can call as Python stubs, like the .NET planner's GenerateManual template."""
+    lines = ["class functions:"]
+    for function in functions:
+        name = f"{function.plugin_name}__{function.name}"
+        signature = "arguments: Optional[dict] = None" if function.parameters else ""
+        return_schema = function.return_parameter.schema_data if function.return_parameter else None
+        lines.append(f"    async def {name}({signature}) -> {_python_type(return_schema)}:")
+        lines.append('        """')
+        if function.description:
+            lines.append(f"        {function.description}")
+        if function.parameters:
+            lines.append("        Arguments:")
+            for parameter in function.parameters:
+                parameter_type = _python_type(parameter.schema_data)
+                if not parameter.is_required:
+                    parameter_type = f"Optional[{parameter_type}]"
+                description = (parameter.schema_data or {}).get("description") or parameter.description
+                lines.append(f"        - {parameter.name} ({parameter_type})" + (f": {description}" if description and description != parameter.name else ""))
+        if return_schema:
+            lines.append("        Returns:")
+            item_schema = return_schema.get("items", return_schema)
+            lines.append(f"        - {_python_type(return_schema)}" + (f": {function.return_parameter.description}" if function.return_parameter.description else ""))
+            for property_name, property_schema in (item_schema.get("properties") or {}).items():
+                lines.append(f"          - {property_name} (Optional[{_python_type(property_schema)}])")
+        lines.append('        """')
+    return "\n".join(lines)
+
+def sanitize_code(code: str, functions: List[KernelFunctionMetadata]) -> str:
+    """Strip markdown fences and rewrite the other spellings of function names models use to plugin__function."""
+    code = re.sub(r"^\s*```(?:python)?\s*\n|\n?\s*```\s*$", "", code.strip())
+    for function in functions:
+        for separator in ("-", ".", "_"):
+            code = code.replace(f"{function.plugin_name}{separator}{function.name}", f"{function.plugin_name}__{function.name}")
+    return "\n".join(line for line in code.splitlines() if not re.match(r"\s*(import functions|from functions import)", line))
+
+@dataclass
+class PythonInterpreter:
+    process: asyncio.subprocess.Process
+    directory: str
+
+class PythonPlanner:
+    """Runs model-written Python scripts that call the kernel's functions, on a pool of warm interpreters.
+
+    Every script gets a freshly started interpreter (a subprocess running
+    utilities/python_sandbox_worker.py in isolated mode, with an empty environment and its own
+    temporary directory) that is thrown away afterwards, and pool_size interpreters are kept
+    started ahead of time so scripts don't wait for one. Before an interpreter is used it
+    isolates itself: a seccomp filter stops it from opening files, creating sockets or starting
+    processes, and when the agent runs as root it is also chrooted into its empty directory as
+    sandbox_uid/sandbox_gid (and put in a network namespace of its own where the kernel allows
+    it). Scripts are limited to cpu_seconds of CPU time, wall_clock_seconds overall and
+    memory_bytes of address space. An interpreter that can't isolate itself is never used, and
+    if none can be started the planner disables itself. Function calls are relayed back to the
+    agent asynchronously, so a script can run several at once with asyncio.gather.
+    """
+
+    def __init__(self, enabled: bool = False, pool_size: int = 2, cpu_seconds: float = 5.0, wall_clock_seconds: float = 120.0, memory_bytes: int = 512 * 1024 * 1024, sandbox_uid: int = 65534, sandbox_gid: int = 65534):
+        self.enabled = enabled
+        self.pool_size = pool_size
+        self.cpu_seconds = cpu_seconds
+        self.wall_clock_seconds = wall_clock_seconds
+        self.memory_bytes = memory_bytes
+        self.sandbox_uid = sandbox_uid
+        self.sandbox_gid = sandbox_gid
+        self.isolation: Optional[dict] = None
+        self._idle: Optional[asyncio.Queue] = None
+        self._spawning: set = set()
+        self.scripts = 0
+        self.function_calls = 0
+        self.rejected_calls = 0
+        self.timeouts = 0
+        self.cpu_limit_exceeded = 0
+        self.cold_starts = 0
+        self.script_seconds_total = 0.0
+
+    async def start(self):
+        if not self.enabled:
+            return
+        self._idle = asyncio.Queue()
+        await asyncio.gather(*[self._replenish() for _ in range(self.pool_size)])
+        if self._idle.empty():
+            logger.error("No sandboxed Python planner interpreter could be started; the Python planner is disabled")
+            self.enabled = False
+
+    async def stop(self):
+        for task in list(self._spawning):
+            task.cancel()
+        while self._idle is not None and not self._idle.empty():
+            self._retire(self._idle.get_nowait())
+
+    async def execute(self, code: str, invoke: Callable[[str, str, dict], Awaitable[Any]], functions: List[KernelFunctionMetadata]) -> dict:
+        """Run a script and return its last expression's value with its stdout and stderr."""
+        if self._idle is None or not self.enabled:
+            raise RuntimeError("The Python planner is not running.")
+
+        # Start an interpreter right away if none is warm, so a failing start surfaces instead of waiting forever
+        if self._idle.empty():
+            self.cold_starts += 1
+            interpreter = await self._spawn()
+        else:
+            interpreter = self._idle.get_nowait()
+        self._spawning.add(asyncio.create_task(self._replenish()))
+
+        self.scripts += 1
+        start = time.perf_counter()
+        try:
+            return await asyncio.wait_for(self._run(interpreter, code, invoke, functions), self.wall_clock_seconds)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            return {"result": None, "stdout": "", "stderr": f"The script was stopped after {self.wall_clock_seconds:g} seconds."}
+        finally:
+            self.script_seconds_total += time.perf_counter() - start
+            self._retire(interpreter)
+
+    def get_statistics(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "isolation": self.isolation,
+            "pool_size": self.pool_size,
+            "idle": self._idle.qsize() if self._idle else 0,
+            "scripts": self.scripts,
+            "function_calls": self.function_calls,
+            "rejected_calls": self.rejected_calls,
+            "timeouts": self.timeouts,
+            "cpu_limit_exceeded": self.cpu_limit_exceeded,
+            "cold_starts": self.cold_starts,
+            "script_ms_avg": self.script_seconds_total * 1000 / self.scripts if self.scripts else 0.0,
+        }
+
+    async def _run(self, interpreter: PythonInterpreter, code: str, invoke, functions: List[KernelFunctionMetadata]) -> dict:
+        process = interpreter.process
+        self._write(process, {
+            "type": "script",
+            "code": sanitize_code(code, functions),
+            "functions": [[function.plugin_name, function.name] for function in functions],
+            "cpu_seconds": self.cpu_seconds,
+        })
+
+        # Only relay calls to the functions the script was given; the script can forge call messages,
+        # and the planner itself is never callable from a script so it can't start interpreters recursively
+        allowed = {(function.plugin_name, function.name) for function in functions if function.plugin_name != PYTHON_PLANNER_PLUGIN_NAME}
+        calls = set()
+        try:
+            while True:
+                line = await process.stdout.readline()
+                if not line:
+                    await process.wait()
+                    if process.returncode == -signal.SIGXCPU or process.returncode == -signal.SIGKILL:
+                        self.cpu_limit_exceeded += 1
+                        return {"result": None, "stdout": "", "stderr": f"The script used more than {self.cpu_seconds:g} seconds of CPU time."}
+                    return {"result": None, "stdout": "", "stderr": f"The interpreter exited unexpectedly ({process.returncode})."}
+
+                message = json.loads(line)
+                if message["type"] == "done":
+                    return {"result": message["result"], "stdout": message["stdout"], "stderr": message["stderr"]}
+                if message["type"] == "call":
+                    if (message.get("plugin"), message.get("function")) not in allowed:
+                        self.rejected_calls += 1
+                        self._write(process, {"type": "result", "id": message.get("id"), "error": f"{message.get('plugin')}__{message.get('function')} is not available to this script."})
+                        continue
+                    self.function_calls += 1
+                    call = asyncio.create_task(self._relay(process, message, invoke))
+                    calls.add(call)
+                    call.add_done_callback(calls.discard)
+        finally:
+            for call in calls:
+                call.cancel()
+
+    async def _relay(self, process: asyncio.subprocess.Process, message: dict, invoke):
+        try:
+            result = await invoke(message["plugin"], message["function"], message["arguments"])
+            self._write(process, {"type": "result", "id": message["id"], "result": result})
+        except Exception as e:
+            self._write(process, {"type": "result", "id": message["id"], "error": f"{message['plugin']}__{message['function']} failed: {e}"})
+
+    def _write(self, process: asyncio.subprocess.Process, message: dict):
+        if process.returncode is None:
+            process.stdin.write((json.dumps(message, default=str) + "\n").encode("utf-8"))
+
+    async def _replenish(self):
+        try:
+            self._idle.put_nowait(await self._spawn())
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Failed to start a Python planner interpreter")
+        finally:
+            self._spawning.discard(asyncio.current_task())
+
+    async def _spawn(self) -> PythonInterpreter:
+        directory = tempfile.mkdtemp(prefix="python-planner-")
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-I", WORKER_PATH, str(self.memory_bytes), str(self.sandbox_uid), str(self.sandbox_gid),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            cwd=directory,
+            env={},
+            limit=16 * 1024 * 1024,
+        )
+        interpreter = PythonInterpreter(process=process, directory=directory)
+        ready = await process.stdout.readline()
+        message = json.loads(ready) if ready else {"type": "error", "message": "The interpreter exited before it was ready."}
+        if message["type"] != "ready":
+            self._retire(interpreter)
+            raise RuntimeError(message["message"])
+        self.isolation = message["isolation"]
+        return interpreter
+
+    def _retire(self, interpreter: PythonInterpreter):
+        if interpreter.process.returncode is None:
+            interpreter.process.kill()
+        shutil.rmtree(interpreter.directory, ignore_errors=True)
+
+class PythonPlannerPlugin:
+    """The python_planner plugin the model calls to run a script; create one per run's kernel."""
+
+    def __init__(self, planner: PythonPlanner, kernel: Kernel):
+        self.planner = planner
+        self.kernel = kernel
+
+    def get_functions(self) -> List[KernelFunctionMetadata]:
+        return [function for function in self.kernel.get_full_list_of_function_metadata() if function.plugin_name != PYTHON_PLANNER_PLUGIN_NAME]
+
+    @kernel_function(
+        name="run",
+        description="Runs a Python script that can await the functions listed in the system message, e.g. "
+                    "`await functions.light_plugin__change_light_state({\"id\": \"...\", \"isOn\": True})`. "
+                    "Use it to sequence and time many calls (asyncio.sleep, asyncio.gather) in one step. "
+                    "Returns the value of the last expression with the script's stdout and stderr."
+    )
+    async def run(self, code: Annotated[str, "The Python script; top-level await is allowed."]) -> str:
+        result = await self.planner.execute(code, self._invoke, self.get_functions())
+        return json.dumps(result, default=str)
+
+    async def _invoke(self, plugin_name: str, function_name: str, arguments: dict) -> Any:
+        result = await self.kernel.invoke(plugin_name=plugin_name, function_name=function_name, arguments=KernelArguments(**arguments))
+        value = result.value if result else None
+        if isinstance(value, str):
+            try:
+                return json.loads(value)
+            except ValueError:
+                return value
+        return value
+
+    def get_system_message(self, functions: Optional[List[KernelFunctionMetadata]] = None) -> str:
+        """Describe the Python tool, with a manual of the given functions (by default, all of them)."""
+        return (
+            "# Python tool\n"
+            "Use python_planner-run whenever several device calls have to happen in order or at particular times, "
+            "instead of calling the functions one at a time.\n\n"
+            "## Functions available in the Python interpreter\n"
+            "```python\n" + generate_function_manual(self.get_functions() if functions is None else functions) + "\n```"
+        )
+
+# Off by default. Interpreters need libseccomp; where the agent doesn't run as root there is no chroot or uid switch,
+# so the seccomp filter alone keeps scripts away from files, sockets and processes
+python_planner = PythonPlanner(
+    enabled=os.getenv('PYTHON_PLANNER', 'false').lower() in ('1', 'true', 'yes'),
+    pool_size=int(os.getenv('PYTHON_PLANNER_POOL_SIZE', 2)),
+    cpu_seconds=float(os.getenv('PYTHON_PLANNER_CPU_SECONDS', 5)),
+    wall_clock_seconds=float(os.getenv('PYTHON_PLANNER_TIMEOUT_SECONDS', 120)),
+    memory_bytes=int(os.getenv('PYTHON_PLANNER_MEMORY_MB', 512)) * 1024 * 1024,
+    sandbox_uid=int(os.getenv('PYTHON_PLANNER_SANDBOX_UID', 65534)),
+    sandbox_gid=int(os.getenv('PYTHON_PLANNER_SANDBOX_GID', 65534))
+)
+
+def get_python_planner() -> PythonPlanner:
+    return python_planner
@@ -0,0 +1,228 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterator, Callable, Deque, Dict, List, Optional
+from motor.motor_asyncio import AsyncIOMotorCollection
+from models.assistant_thread_run import AssistantThreadRun, AssistantThreadRunError
+from utilities.assistant_event_stream_utility import AssistantEventStreamService
+from utilities.run_event_log import RunEventLog
+
+logger = logging.getLogger(__name__)
+
+class RunQueueFullError(Exception):
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+@dataclass
+class RunState:
+    run: AssistantThreadRun
+    event_log: RunEventLog
+    execute: Callable[[], AsyncIterator[str | bytes]]
+    queued_at: float = 0.0
+
+class RunManager:
+    """Executes runs on a bounded pool of background workers, independent of any client connection.
+
+    Each run's status is persisted to the Runs collection as it changes, and all of its SSE
+    events (including the thread.run.* lifecycle events) go to a RunEventLog that clients
+    attach to, detach from and re-attach to. Finished runs keep their event log in memory
+    for retention_seconds so late re-attaches can still replay them.
+
+    At most max_workers runs are active at once and at most max_queued_runs wait for a
+    worker; further runs are rejected with a Retry-After estimate. Runs on the same thread
+    execute one at a time in submission order: only the oldest waiting run of a thread is
+    ready for a worker, the rest wait in the thread's backlog.
+    """
+    runs_collection: Optional[AsyncIOMotorCollection] = None
+
+    def __init__(self, max_workers: int = 8, max_queued_runs: int = 100, max_events_per_run: int = 10000, retention_seconds: float = 300.0):
+        self.max_workers = max_workers
+        self.max_queued_runs = max_queued_runs
+        self.max_events_per_run = max_events_per_run
+        self.retention_seconds = retention_seconds
+        self._runs: Dict[str, RunState] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._event_stream_utility = AssistantEventStreamService()
+
+        # Threads with a run that is ready or active, mapped to the runs waiting behind it
+        self._thread_backlogs: Dict[str, Deque[RunState]] = {}
+        self._waiting = 0
+        self._active = 0
+        self.runs_started = 0
+        self.runs_rejected = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.run_seconds_average: Optional[float] = None
+
+    def start(self, runs_collection: AsyncIOMotorCollection):
+        self.runs_collection = runs_collection
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.max_workers)]
+
+    async def stop(self):
+        """Cancel the active runs and the runs still waiting for a worker."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        # Waiting runs will never start, so finish them rather than leave them queued in the Runs collection
+        queued = [state for state in self._runs.values() if state.run.status == "queued"]
+        await asyncio.gather(*(self._cancel_queued(state) for state in queued), return_exceptions=True)
+        self._thread_backlogs.clear()
+        self._waiting = 0
+
+    def check_admission(self):
+        """Reject right away, before any other work, when no more runs can wait for a worker."""
+        if self._waiting >= self.max_queued_runs:
+            self.runs_rejected += 1
+            raise RunQueueFullError(f"The run queue is full ({self.max_queued_runs} runs).", self._estimate_retry_after())
+
+    async def submit(self, run: AssistantThreadRun, execute: Callable[[], AsyncIterator[str | bytes]]) -> RunState:
+        """Queue a run for execution; execute is called by a worker and yields the run's message events."""
+        self.check_admission()
+
+        # Hold the queue slot while the run is saved so concurrent submits can't overshoot the bound
+        self._waiting += 1
+        state = RunState(run=run, event_log=RunEventLog(self.max_events_per_run), execute=execute)
+        try:
+            await self.runs_collection.insert_one(run.to_bson())
+            await state.event_log.append(self._event_stream_utility.create_event("thread.run.created", run))
+        except BaseException:
+            self._waiting -= 1
+            raise
+
+        state.queued_at = time.monotonic()
+        self._runs[run.id] = state
+        backlog = self._thread_backlogs.get(run.thread_id)
+        if backlog is None:
+            self._thread_backlogs[run.thread_id] = deque()
+            self._queue.put_nowait(state)
+        else:
+            backlog.append(state)
+        return state
+
+    def get_state(self, run_id: str) -> Optional[RunState]:
+        return self._runs.get(run_id)
+
+    async def get_run(self, thread_id: str, run_id: str) -> Optional[AssistantThreadRun]:
+        state = self._runs.get(run_id)
+        if state is not None:
+            return state.run if state.run.thread_id == thread_id else None
+
+        # Runs whose event log has been dropped are still available from MongoDB
+        document = await self.runs_collection.find_one({"_id": run_id, "thread_id": thread_id})
+        return AssistantThreadRun.from_bson(document) if document else None
+
+    def get_statistics(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "active": self._active,
+            "queued": self._waiting,
+            "max_queued_runs": self.max_queued_runs,
+            "threads_with_backlog": sum(1 for backlog in self._thread_backlogs.values() if backlog),
+            "runs_started": self.runs_started,
+            "runs_rejected": self.runs_rejected,
+            "wait_seconds_total": self.wait_seconds_total,
+            "wait_seconds_avg": self.wait_seconds_total / self.runs_started if self.runs_started else 0.0,
+            "wait_seconds_max": self.wait_seconds_max,
+            "run_seconds_avg": self.run_seconds_average,
+            "retained": len(self._runs),
+        }
+
+    async def _worker(self):
+        while True:
+            state = await self._queue.get()
+            self._waiting -= 1
+            self._active += 1
+            started_at = time.monotonic()
+            wait_seconds = started_at - state.queued_at
+            self.runs_started += 1
+            self.wait_seconds_total += wait_seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+            try:
+                await self._execute(state)
+            finally:
+                self._active -= 1
+                self._record_run_seconds(time.monotonic() - started_at)
+                self._release_thread(state.run.thread_id)
+
+    def _release_thread(self, thread_id: str):
+        # Hand the thread over to its next waiting run, if any
+        backlog = self._thread_backlogs.get(thread_id)
+        if backlog:
+            self._queue.put_nowait(backlog.popleft())
+        else:
+            self._thread_backlogs.pop(thread_id, None)
+
+    def _record_run_seconds(self, run_seconds: float):
+        if self.run_seconds_average is None:
+            self.run_seconds_average = run_seconds
+        else:
+            self.run_seconds_average += 0.2 * (run_seconds - self.run_seconds_average)
+
+    def _estimate_retry_after(self) -> int:
+        # Roughly how long until the queue has drained enough to admit another run
+        run_seconds = self.run_seconds_average or 1.0
+        return max(1, math.ceil(run_seconds * (self._waiting + 1) / self.max_workers))
+
+    async def _execute(self, state: RunState):
+        run = state.run
+        try:
+            await self._update_status(state, "in_progress", started_at=datetime.utcnow())
+            async for event in state.execute():
+                await state.event_log.append(event)
+            await self._update_status(state, "completed", completed_at=datetime.utcnow())
+        except asyncio.CancelledError:
+            await self._update_status(state, "cancelled", cancelled_at=datetime.utcnow())
+            raise
+        except Exception as e:
+            logger.exception("Run %s failed", run.id)
+            await self._update_status(
+                state,
+                "failed",
+                failed_at=datetime.utcnow(),
+                last_error=AssistantThreadRunError(code="server_error", message=str(e))
+            )
+        finally:
+            await state.event_log.append(self._event_stream_utility.create_done_event())
+            await state.event_log.close()
+            asyncio.get_running_loop().call_later(self.retention_seconds, self._runs.pop, run.id, None)
+
+    async def _cancel_queued(self, state: RunState):
+        try:
+            await self._update_status(state, "cancelled", cancelled_at=datetime.utcnow())
+        finally:
+            await state.event_log.append(self._event_stream_utility.create_done_event())
+            await state.event_log.close()
+
+    async def _update_status(self, state: RunState, status: str, **fields):
+        run = state.run
+        run.status = status
+        for name, value in fields.items():
+            setattr(run, name, value)
+        await state.event_log.append(self._event_stream_utility.create_event(f"thread.run.{status}", run))
+
+        update = run.to_bson()
+        update.pop("_id")
+        try:
+            await self.runs_collection.update_one({"_id": run.id}, {"$set": update})
+        except Exception:
+            logger.exception("Failed to persist the status of run %s", run.id)
+
+run_manager = RunManager(
+    max_workers=int(os.getenv('RUN_WORKERS', 8)),
+    max_queued_runs=int(os.getenv('RUN_QUEUE_SIZE', 100)),
+    max_events_per_run=int(os.getenv('RUN_EVENT_LOG_SIZE', 10000)),
+    retention_seconds=float(os.getenv('RUN_RETENTION_SECONDS', 300))
+)
+
+def get_run_manager() -> RunManager:
+    return run_manager
@@ -6,26 +6,26 @@ from semantic_kernel.kernel import Kernel
 from semantic_kernel.contents import TextContent
 from semantic_kernel.contents.chat_message_content import ITEM_TYPES, AuthorRole, ChatMessageContent
 from semantic_kernel.contents.chat_history import ChatHistory
-from semantic_kernel.connectors.ai.function_call_behavior import FunctionCallBehavior
 from semantic_kernel.contents.streaming_chat_message_content import StreamingChatMessageContent
-from semantic_kernel.connectors.ai.open_ai import (
-    AzureChatCompletion,
-    OpenAIChatCompletion,
-    OpenAIChatPromptExecutionSettings
-)
-from semantic_kernel.connectors.openapi_plugin.openapi_function_execution_parameters import (
-    OpenAPIFunctionExecutionParameters,
-)
+from semantic_kernel.connectors.ai.open_ai import OpenAIChatPromptExecutionSettings
 from semantic_kernel.connectors.ai.chat_completion_client_base import ChatCompletionClientBase
 from fastapi import Depends
-from services.health_check_service import HealthCheckService
+from services.plugin_endpoint_registry import PluginEndpointRegistry
+from services.chat_history_cache import ChatHistoryCache
+from services.message_writer import MessageWriter
+from services.kernel_factory import KernelFactory
+from services.tool_call_fan_out import ToolCallFanOut, ToolCallOrderedChatHistory
+from services.plugin_call_cache import PluginCallCache, RunPluginCallCache
+from services.device_state_prefetcher import DeviceStatePrefetcher
+from services.tool_selector import ToolSelector
+from services.python_planner import PYTHON_PLANNER_PLUGIN_NAME, PythonPlanner, PythonPlannerPlugin
 from models.assistant_message_content import AssistantMessageContent
-from models.config import Config
 from database_manager import DatabaseManager, get_database_manager
 from models.assistant_thread_run import AssistantThreadRun
 from utilities.assistant_event_stream_utility import AssistantEventStreamService
 from utilities.chat_message_conversion_utility import process_messages
 from semantic_kernel.functions.kernel_arguments import KernelArguments
+from semantic_kernel.filters.filter_types import FilterTypes
 
 class RunService:
     async def execute_run_async(
@@ -33,84 +33,58 @@ class RunService:
             run: AssistantThreadRun,
             event_stream_utility: AssistantEventStreamService,
             db_manager: DatabaseManager,
-            http_client: httpx.AsyncClient
+            http_client: httpx.AsyncClient,
+            kernel_factory: KernelFactory,
+            plugin_endpoint_registry: PluginEndpointRegistry,
+            chat_history_cache: ChatHistoryCache,
+            message_writer: MessageWriter,
+            plugin_call_cache: PluginCallCache,
+            device_state_prefetcher: DeviceStatePrefetcher,
+            tool_selector: ToolSelector,
+            python_planner: PythonPlanner
         ):
 
-        # Load variables from config.json at the root of the solution
-        with open('../../../config.json') as file:
-            json_data = json.load(file)
-            config: Config = Config(**json_data)
-        deployment_type, api_key, ai_model_id, deployment_name, endpoint, org_id = config.openai.model_dump().values()
-        plugin_services = config.plugin_services
-        health_check_service = HealthCheckService(http_client)
-
-        # Create kernel
-        kernel: Kernel = Kernel()
-
-        # Add AI services
-        if (deployment_type == "AzureOpenAI"):
-            kernel.add_service(
-                AzureChatCompletion(
-                    deployment_name=deployment_name,
-                    api_key=api_key,
-                    endpoint=endpoint,
-                ),
-            )
-        elif (deployment_type == "OpenAI"):
-            kernel.add_service(
-                OpenAIChatCompletion(
-                    api_key=api_key,
-                    ai_model_id=ai_model_id,
-                    org_id=org_id, # org_id is optional
-                ),
-            )
-
-        # Add plugin services
-
-        # Load the Light plugin
-        light_service_endpoint = await health_check_service.get_healthy_endpoint(plugin_services['LightService'].endpoints)
-        kernel.add_plugin_from_openapi(
-            plugin_name="light_plugin",
-            openapi_document_path="../../../PluginResources/OpenApiPlugins/LightPlugin.swagger.json",
-            execution_settings=OpenAPIFunctionExecutionParameters(
-                http_client=http_client,
-                server_url_override=light_service_endpoint,
-                enable_payload_namespacing=True,
-            ),
-        )
-
-
-        # Load the Scene plugin
-        scene_service_endpoint = await health_check_service.get_healthy_endpoint(plugin_services['SceneService'].endpoints)
-        kernel.add_plugin_from_openapi(
-            plugin_name="scene_plugin",
-            openapi_document_path="../../../PluginResources/OpenApiPlugins/ScenePlugin.swagger.json",
-            execution_settings=OpenAPIFunctionExecutionParameters(
-                http_client=http_client,
-                server_url_override=scene_service_endpoint,
-                enable_payload_namespacing=True,
-            ),
-        )
-
-        # Load the Speaker plugin
-        speaker_service_endpoint = await health_check_service.get_healthy_endpoint(plugin_services['SpeakerService'].endpoints)
-        kernel.add_plugin_from_openapi(
-            plugin_name="speaker_plugin",
-            openapi_document_path="../../../PluginResources/OpenApiPlugins/SpeakerPlugin.swagger.json",
-            execution_settings=OpenAPIFunctionExecutionParameters(
-                http_client=http_client,
-                server_url_override=speaker_service_endpoint,
-                enable_payload_namespacing=True,
-            ),
-        )
-
-        # Load all the messages (chat history) from MongoDB using the thread ID and sort them by creation date
-        messages: List[AssistantMessageContent] = await db_manager.messages_collection.find(
-            {"thread_id": run.thread_id}
-        ).sort("created_at").to_list(None)
-        history = ChatHistory(
-            system_message="If the user asks what language you've been written, reply to the user that you've been built with Python; otherwise have a nice chat! As an fyi, the current user is a developing you, so be forthcoming with any of the underlying tool calls your making in case they ask so they can debug.",
-            messages=[AssistantMessageContent.from_bson(message) for message in messages]
+        # Get a per-run kernel that shares the chat service and plugins built at startup
+        kernel_factory.refresh_if_changed()
+        plugin_endpoints = {}
+        for service_name in kernel_factory.get_http_service_names():
+            plugin_endpoints[service_name] = plugin_endpoint_registry.get_endpoint(service_name)
+        kernel: Kernel = kernel_factory.create_kernel(plugin_endpoints)
+
+        # Let the model write one script that sequences many plugin calls instead of a model turn per call
+        python_planner_plugin = None
+        if python_planner.enabled:
+            python_planner_plugin = PythonPlannerPlugin(python_planner, kernel)
+            kernel.add_plugin(python_planner_plugin, PYTHON_PLANNER_PLUGIN_NAME)
+
+        # Run the tool calls of each model turn concurrently, within per-plugin limits
+        # (a planner script is bounded by its own wall-clock limit instead)
+        tool_call_fan_out = ToolCallFanOut(timeout_overrides={PYTHON_PLANNER_PLUGIN_NAME: python_planner.wall_clock_seconds + 5})
+        kernel.add_filter(FilterTypes.AUTO_FUNCTION_INVOCATION, tool_call_fan_out)
+
+        # Answer repeated read-only plugin calls from the run's cache (and the shared one, if enabled)
+        run_plugin_call_cache = RunPluginCallCache(plugin_call_cache)
+        kernel.add_filter(FilterTypes.FUNCTION_INVOCATION, run_plugin_call_cache)
+
+        # Load all the messages (chat history) of the thread, from the cache or else from MongoDB sorted by creation date
+        # (after waiting for the thread's previous messages to be written)
+        messages = await chat_history_cache.get_messages(run.thread_id, db_manager.messages_collection, message_writer)
+        # Only advertise the functions of the plugins that look relevant to the conversation
+        function_call_behavior = tool_selector.create_function_call_behavior(messages)
+        kernel.add_filter(FilterTypes.AUTO_FUNCTION_INVOCATION, function_call_behavior.on_auto_function_invocation)
+
+        # If enabled, fetch the state of the devices the run advertises so the model doesn't need a round trip to discover them
+        device_state = await device_state_prefetcher.prefetch(kernel, function_call_behavior.advertises)
+
+        system_message = "If the user asks what language you've been written, reply to the user that you've been built with Python; otherwise have a nice chat! As an fyi, the current user is a developing you, so be forthcoming with any of the underlying tool calls your making in case they ask so they can debug."
+        if device_state:
+            system_message += "\n\n" + device_state
+        if python_planner_plugin is not None and function_call_behavior.advertises(PYTHON_PLANNER_PLUGIN_NAME):
+            # The manual lists the same functions as the tools, so it doesn't undo the selection's savings
+            system_message += "\n\n" + python_planner_plugin.get_system_message(function_call_behavior.select_functions(python_planner_plugin.get_functions()))
+        history = ToolCallOrderedChatHistory(
+            system_message=system_message,
+            messages=messages
         )
         messageCount = len(messages);
 
@@ -119,33 +93,52 @@ class RunService:
         results = chatCompletion.get_streaming_chat_message_contents(
             chat_history=history,
             settings=OpenAIChatPromptExecutionSettings(
-                function_call_behavior=FunctionCallBehavior.AutoInvokeKernelFunctions()
+                function_call_behavior=function_call_behavior
             ),
             kernel=kernel,
             arguments=KernelArguments()
         )
 
-        # Return the results as a stream 
-        completeMessage = ""
-        async for result in results:
-            completeMessage += result[0].content
+        # Return the results as a stream, sending buffered text when the flush interval passes without a new chunk
+        completeMessageChunks: List[str] = []
+        async for result in event_stream_utility.with_flush_deadline(results):
+            if result is None:
+                for event in event_stream_utility.flush_message_delta():
+                    yield event
+                continue
+            completeMessageChunks.append(result[0].content)
 
             # Send the message events to the client
             events = event_stream_utility.create_message_event(run, result[0])
             for event in events:
                 yield event
-        history.add_assistant_message(completeMessage)
+        for event in event_stream_utility.flush_message_delta():
+            yield event
+        history.add_assistant_message("".join(completeMessageChunks))
+        # Count the model requests in one place: the function call behavior, configured before each of them
+        model_requests = function_call_behavior.requests
+        device_state_prefetcher.record_run(device_state is not None, model_requests)
+        run.trace = {
+            **(run.trace or {}),
+            "model_requests": model_requests,
+            "device_state_prefetched": device_state is not None,
+            "tool_calls": tool_call_fan_out.get_trace(),
+            "plugin_call_cache": run_plugin_call_cache.get_trace(),
+            "tool_selection": tool_selector.record_run(run.id, function_call_behavior)
+        }
 
         newMessages:List[ChatMessageContent] = history[(messageCount + 1):]
 
-        # Save the new messages to MongoDB
+        # Add the new messages to the cached history and save them to MongoDB in one ordered write (queued in write-behind mode)
+        documents = []
         for message in newMessages:
-            await db_manager.messages_collection.insert_one(
-                AssistantMessageContent(
-                    thread_id=run.thread_id,
-                    role=message.role,
-                    items=message.items
-                ).to_bson()
-            )
+            document = AssistantMessageContent(
+                thread_id=run.thread_id,
+                role=message.role,
+                items=message.items
+            ).to_bson()
+            chat_history_cache.append(run.thread_id, document)
+            documents.append(document)
+        await message_writer.write(documents)
 
 run_service = RunService()
@@ -0,0 +1,127 @@
+import asyncio
+import os
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from semantic_kernel.contents.chat_history import ChatHistory
+from semantic_kernel.contents.chat_message_content import ChatMessageContent
+from semantic_kernel.contents.function_call_content import FunctionCallContent
+from semantic_kernel.contents.function_result_content import FunctionResultContent
+from semantic_kernel.filters.auto_function_invocation.auto_function_invocation_context import AutoFunctionInvocationContext
+from semantic_kernel.functions.function_result import FunctionResult
+
+def parse_concurrency_limits(value: str) -> Dict[str, int]:
+    """Parse "light_plugin=4,scene_plugin=1" into {"light_plugin": 4, "scene_plugin": 1}."""
+    limits = {}
+    for entry in filter(None, (entry.strip() for entry in value.split(","))):
+        plugin_name, limit = entry.split("=")
+        limits[plugin_name.strip()] = int(limit)
+    return limits
+
+# Scene generation calls an image model, so only one runs at a time by default
+TOOL_CALL_CONCURRENCY = int(os.getenv('TOOL_CALL_CONCURRENCY', 4))
+TOOL_CALL_CONCURRENCY_LIMITS = parse_concurrency_limits(os.getenv('TOOL_CALL_CONCURRENCY_LIMITS', 'scene_plugin=1'))
+TOOL_CALL_TIMEOUT_SECONDS = float(os.getenv('TOOL_CALL_TIMEOUT_SECONDS', 30))
+
+class ToolCallFanOut:
+    """Auto function invocation filter that runs the tool calls of a model turn side by side.
+
+    The chat service starts every tool call of a turn at once; this filter caps how many
+    calls run against each plugin at a time, gives up on a call after timeout_seconds and
+    records how long each turn's fan-out took, for the run's trace. Create one per run.
+    """
+
+    def __init__(
+            self,
+            default_concurrency: int = TOOL_CALL_CONCURRENCY,
+            concurrency_limits: Optional[Dict[str, int]] = None,
+            timeout_seconds: float = TOOL_CALL_TIMEOUT_SECONDS,
+            timeout_overrides: Optional[Dict[str, float]] = None
+        ):
+        self.default_concurrency = default_concurrency
+        self.concurrency_limits = TOOL_CALL_CONCURRENCY_LIMITS if concurrency_limits is None else concurrency_limits
+        self.timeout_seconds = timeout_seconds
+        self.timeout_overrides = timeout_overrides or {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._turns: Dict[int, Dict[str, Any]] = defaultdict(lambda: {"calls": 0, "started": None, "finished": None, "call_ms": 0.0})
+        self.timeouts = 0
+
+    async def __call__(self, context: AutoFunctionInvocationContext, next: Callable[[AutoFunctionInvocationContext], Awaitable[None]]):
+        turn = self._turns[context.request_sequence_index]
+        timeout_seconds = self.timeout_overrides.get(context.function.plugin_name, self.timeout_seconds)
+        async with self._get_semaphore(context.function.plugin_name):
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(next(context), timeout_seconds)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                context.function_result = FunctionResult(
+                    function=context.function.metadata,
+                    value=f"The function {context.function.fully_qualified_name} did not respond within {timeout_seconds:g} seconds."
+                )
+            finally:
+                finished = time.perf_counter()
+                turn["calls"] += 1
+                turn["started"] = started if turn["started"] is None else min(turn["started"], started)
+                turn["finished"] = finished if turn["finished"] is None else max(turn["finished"], finished)
+                turn["call_ms"] += (finished - started) * 1000
+
+    def get_trace(self) -> dict:
+        turns: List[dict] = [
+            {
+                "calls": turn["calls"],
+                "fan_out_ms": round((turn["finished"] - turn["started"]) * 1000, 1),
+                "sequential_ms": round(turn["call_ms"], 1)
+            }
+            for _, turn in sorted(self._turns.items())
+        ]
+        return {
+            "calls": sum(turn["calls"] for turn in turns),
+            "timeouts": self.timeouts,
+            "fan_out_ms": round(sum(turn["fan_out_ms"] for turn in turns), 1),
+            "sequential_ms": round(sum(turn["sequential_ms"] for turn in turns), 1),
+            "turns": turns
+        }
+
+    def _get_semaphore(self, plugin_name: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(plugin_name)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.concurrency_limits.get(plugin_name, self.default_concurrency))
+            self._semaphores[plugin_name] = semaphore
+        return semaphore
+
+def _get_function_result_id(message: ChatMessageContent) -> Optional[str]:
+    for item in message.items:
+        if isinstance(item, FunctionResultContent):
+            return item.id
+    return None
+
+class ToolCallOrderedChatHistory(ChatHistory):
+    """A chat history that keeps a turn's tool results in the order the model made the calls.
+
+    Concurrent tool calls add their results as they finish, so each result is inserted
+    after the results of the calls that came before it in the assistant message.
+    """
+
+    def add_message(self, message: ChatMessageContent | Dict[str, Any], encoding: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None) -> None:
+        result_id = _get_function_result_id(message) if isinstance(message, ChatMessageContent) else None
+        if result_id is None:
+            super().add_message(message, encoding, metadata)
+            return
+
+        # Find the assistant message with the calls of the current turn
+        for call_index in range(len(self.messages) - 1, -1, -1):
+            call_ids = [item.id for item in self.messages[call_index].items if isinstance(item, FunctionCallContent)]
+            if call_ids:
+                break
+        else:
+            call_ids = []
+        order = {call_id: position for position, call_id in enumerate(call_ids)}
+        if result_id not in order:
+            super().add_message(message, encoding, metadata)
+            return
+
+        position = call_index + 1
+        while position < len(self.messages) and order.get(_get_function_result_id(self.messages[position]), len(order)) < order[result_id]:
+            position += 1
+        self.messages.insert(position, message)
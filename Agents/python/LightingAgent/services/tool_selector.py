@@ -0,0 +1,182 @@
+import json
+import logging
+import os
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+from semantic_kernel.kernel import Kernel
+from semantic_kernel.connectors.ai.function_call_behavior import FunctionCallBehavior, FunctionCallConfiguration
+from semantic_kernel.connectors.ai.open_ai.services.utils import kernel_function_metadata_to_openai_tool_format
+from semantic_kernel.contents.chat_message_content import AuthorRole, ChatMessageContent
+from semantic_kernel.contents.function_call_content import FunctionCallContent
+from semantic_kernel.filters.auto_function_invocation.auto_function_invocation_context import AutoFunctionInvocationContext
+
+logger = logging.getLogger(__name__)
+
+# Words in the user's latest message that make a plugin relevant, matched as whole words
+TOOL_SELECTION_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "light_plugin": (
+        "light", "lights", "lamp", "lamps", "bulb", "bulbs", "bright", "brighter", "brightness", "dim", "dimmer",
+        "dark", "darker", "turn on", "turn off", "switch", "color", "colors", "colour", "colours", "red", "orange",
+        "yellow", "green", "blue", "purple", "pink", "white", "warm", "cool", "stage", "room",
+    ),
+    "scene_plugin": (
+        "scene", "scenes", "mood", "theme", "palette", "vibe", "atmosphere", "ambiance", "ambience", "party", "setting",
+    ),
+    "speaker_plugin": (
+        "speaker", "speakers", "song", "songs", "music", "play", "playing", "track", "tune", "volume", "louder",
+        "quieter", "party",
+    ),
+}
+
+# Plugins that are only useful together with another one, e.g. a scene's palette is applied with the lights
+TOOL_SELECTION_DEPENDENCIES: Dict[str, Tuple[str, ...]] = {
+    "scene_plugin": ("light_plugin", "python_planner"),
+    "light_plugin": ("python_planner",),
+    "speaker_plugin": ("python_planner",),
+}
+
+# Plugins advertised when nothing in the conversation points at a plugin; None advertises every function
+TOOL_SELECTION_FALLBACK: Optional[Tuple[str, ...]] = None
+
+def estimate_tool_tokens(functions) -> int:
+    """Roughly estimate the prompt tokens of advertising the functions (about four characters per token)."""
+    return sum(len(json.dumps(kernel_function_metadata_to_openai_tool_format(function))) for function in functions) // 4
+
+class SelectedFunctions(FunctionCallBehavior):
+    """Function call behavior that advertises the functions of the selected plugins only.
+
+    If the model calls a function of a plugin that wasn't advertised (which it can learn
+    about from earlier turns in the thread), every function is advertised from the next
+    request on. Plugins are never hidden from the kernel itself, so such a call still runs.
+    """
+    included_plugins: List[str] = []
+    expanded: bool = False
+    # Whether nothing was selected, so the fallback plugins (or every function) are advertised
+    fallback: bool = False
+    requests: int = 0
+    advertised_tokens: int = 0
+    full_tokens: int = 0
+
+    def configure(self, kernel: Kernel, update_settings_callback: Callable[..., None], settings) -> None:
+        # Called before every model request of the run, which makes this the run's count of model requests
+        self.requests += 1
+        if not self.enable_kernel_functions:
+            return
+        all_functions = kernel.get_full_list_of_function_metadata()
+        functions = self.select_functions(all_functions)
+
+        self.full_tokens += estimate_tool_tokens(all_functions)
+        self.advertised_tokens += estimate_tool_tokens(functions)
+        update_settings_callback(FunctionCallConfiguration(available_functions=functions), settings)
+
+    def select_functions(self, functions: list) -> list:
+        """Keep the functions that are advertised to the model."""
+        return functions if self.expanded else [function for function in functions if function.plugin_name in self.included_plugins]
+
+    def advertises(self, plugin_name: str) -> bool:
+        return self.expanded or plugin_name in self.included_plugins
+
+    async def on_auto_function_invocation(self, context: AutoFunctionInvocationContext, next):
+        if not self.expanded and context.function.plugin_name not in self.included_plugins:
+            logger.info("The model called hidden function %s; advertising all functions", context.function.fully_qualified_name)
+            self.expanded = True
+        await next(context)
+
+    def get_trace(self) -> dict:
+        return {
+            "plugins": self.included_plugins,
+            "expanded": self.expanded,
+            "fallback": self.fallback,
+            "model_requests": self.requests,
+            "estimated_tool_tokens": self.advertised_tokens,
+            "estimated_tool_tokens_saved": self.full_tokens - self.advertised_tokens,
+        }
+
+class ToolSelector:
+    """Picks the plugins whose functions are advertised to the model for a run.
+
+    A plugin is selected when the user's latest message mentions one of its keywords or
+    when one of its functions was called in the thread's recent messages, so follow-ups
+    like "make it brighter" keep the plugins they rely on. When nothing is selected, the
+    request may still be about the devices in words the keywords miss, so the fallback
+    plugins are advertised instead (every function if fallback_plugins is None).
+    """
+
+    def __init__(
+            self,
+            enabled: bool = True,
+            recent_messages: int = 10,
+            keywords: Dict[str, Tuple[str, ...]] = TOOL_SELECTION_KEYWORDS,
+            dependencies: Dict[str, Tuple[str, ...]] = TOOL_SELECTION_DEPENDENCIES,
+            fallback_plugins: Optional[Tuple[str, ...]] = TOOL_SELECTION_FALLBACK
+        ):
+        self.enabled = enabled
+        self.recent_messages = recent_messages
+        self.dependencies = dependencies
+        self.fallback_plugins = fallback_plugins
+        self._patterns = {
+            plugin_name: re.compile(r"\b(" + "|".join(re.escape(keyword) for keyword in plugin_keywords) + r")\b", re.IGNORECASE)
+            for plugin_name, plugin_keywords in keywords.items()
+        }
+        self.runs = 0
+        self.runs_expanded = 0
+        self.runs_fallback = 0
+        self.estimated_tool_tokens_saved = 0
+
+    def create_function_call_behavior(self, messages: List[ChatMessageContent]) -> SelectedFunctions:
+        plugins = self.select_plugins(messages)
+        fallback = not plugins
+        if fallback and self.fallback_plugins is not None:
+            plugins = self._with_dependencies(set(self.fallback_plugins))
+        behavior = SelectedFunctions(included_plugins=sorted(plugins), fallback=fallback)
+        behavior.expanded = not self.enabled or (fallback and self.fallback_plugins is None)
+        return behavior
+
+    def select_plugins(self, messages: List[ChatMessageContent]) -> set:
+        plugins = set()
+        latest_user_message = next((message for message in reversed(messages) if message.role == AuthorRole.USER), None)
+        if latest_user_message is not None and latest_user_message.content:
+            plugins.update(plugin_name for plugin_name, pattern in self._patterns.items() if pattern.search(latest_user_message.content))
+
+        for message in messages[-self.recent_messages:]:
+            plugins.update(item.plugin_name for item in message.items if isinstance(item, FunctionCallContent) and item.plugin_name)
+
+        return self._with_dependencies(plugins)
+
+    def _with_dependencies(self, plugins: set) -> set:
+        for plugin_name in list(plugins):
+            plugins.update(self.dependencies.get(plugin_name, ()))
+        return plugins
+
+    def record_run(self, run_id: str, behavior: SelectedFunctions) -> dict:
+        trace = behavior.get_trace()
+        self.runs += 1
+        if behavior.fallback and self.enabled:
+            self.runs_fallback += 1
+        elif behavior.expanded and self.enabled:
+            self.runs_expanded += 1
+        self.estimated_tool_tokens_saved += trace["estimated_tool_tokens_saved"]
+        logger.info(
+            "Run %s advertised %s over %d model requests, saving about %d prompt tokens",
+            run_id, "all functions" if behavior.expanded else behavior.included_plugins or "no functions",
+            trace["model_requests"], trace["estimated_tool_tokens_saved"]
+        )
+        return trace
+
+    def get_statistics(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "runs": self.runs,
+            "runs_expanded": self.runs_expanded,
+            "runs_fallback": self.runs_fallback,
+            "estimated_tool_tokens_saved": self.estimated_tool_tokens_saved,
+        }
+
+tool_selector = ToolSelector(
+    enabled=os.getenv('TOOL_SELECTION', 'relevant').lower() != 'all',
+    recent_messages=int(os.getenv('TOOL_SELECTION_RECENT_MESSAGES', 10)),
+    fallback_plugins=tuple(name.strip() for name in os.environ['TOOL_SELECTION_FALLBACK'].split(',') if name.strip()) if os.getenv('TOOL_SELECTION_FALLBACK') else TOOL_SELECTION_FALLBACK
+)
+
+def get_tool_selector() -> ToolSelector:
+    return tool_selector
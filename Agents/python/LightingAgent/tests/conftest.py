@@ -0,0 +1,9 @@
+"""Unit tests for the agent's self-contained services and utilities.
+
+Run from Agents/python/LightingAgent with: python -m pytest tests
+"""
+import os
+import sys
+
+# The agent's packages are imported from its directory, as app.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
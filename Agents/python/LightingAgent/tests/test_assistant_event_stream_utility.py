@@ -0,0 +1,57 @@
+import asyncio
+from openai.types.chat.chat_completion_chunk import ChatCompletionChunk, Choice, ChoiceDelta
+from semantic_kernel.contents import AuthorRole
+from semantic_kernel.contents.streaming_chat_message_content import StreamingChatMessageContent
+from models.assistant_thread_run import AssistantThreadRun
+from utilities.assistant_event_stream_utility import AssistantEventStreamService, DeltaFlushPolicy
+from utilities.message_delta_encoder import encode_message_delta_event
+
+def chunk(text, finish_reason=None) -> list:
+    inner_content = ChatCompletionChunk(
+        id="message-1",
+        choices=[Choice(index=0, delta=ChoiceDelta(content=text), finish_reason=finish_reason)],
+        created=0,
+        model="gpt-4o",
+        object="chat.completion.chunk"
+    )
+    return [StreamingChatMessageContent(choice_index=0, role=AuthorRole.ASSISTANT, content=text, inner_content=inner_content)]
+
+def stream(stream_utility: AssistantEventStreamService, results, log: list):
+    # What RunService does with the model's chunks
+    async def run():
+        run = AssistantThreadRun(thread_id="t1")
+        async for result in stream_utility.with_flush_deadline(results):
+            if result is None:
+                log.extend(stream_utility.flush_message_delta())
+                continue
+            log.extend(stream_utility.create_message_event(run, result[0]))
+        log.extend(stream_utility.flush_message_delta())
+    asyncio.run(run())
+
+def test_buffered_text_is_sent_when_the_next_chunk_is_late():
+    log = []
+
+    async def results():
+        yield chunk("Hello")
+        await asyncio.sleep(0.2)
+        log.append("second chunk")
+        yield chunk(" there")
+        yield chunk(None, finish_reason="stop")
+
+    stream(AssistantEventStreamService(DeltaFlushPolicy(max_delay_ms=20, max_bytes=1000)), results(), log)
+
+    deltas = [entry for entry in log if isinstance(entry, bytes) or entry == "second chunk"]
+    assert deltas == [encode_message_delta_event("Hello", 0), "second chunk", encode_message_delta_event(" there", 0)]
+    assert log[-1].startswith("event: thread.message.completed")
+
+def test_chunks_arriving_within_the_interval_are_coalesced():
+    log = []
+
+    async def results():
+        for text in ("Hel", "lo", " there"):
+            yield chunk(text)
+        yield chunk(None, finish_reason="stop")
+
+    stream(AssistantEventStreamService(DeltaFlushPolicy(max_delay_ms=1000)), results(), log)
+
+    assert [entry for entry in log if isinstance(entry, bytes)] == [encode_message_delta_event("Hello there", 0)]
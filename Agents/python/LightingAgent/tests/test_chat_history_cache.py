@@ -0,0 +1,209 @@
+import asyncio
+import bson
+from semantic_kernel.contents import TextContent
+from semantic_kernel.contents.author_role import AuthorRole
+from models.assistant_message_content import AssistantMessageContent
+from services.chat_history_cache import ChatHistoryCache
+from services.message_writer import DIRECT, WRITE_BEHIND, MessageWriter
+
+def create_document(thread_id: str, text: str) -> dict:
+    return AssistantMessageContent(thread_id=thread_id, role=AuthorRole.USER, items=[TextContent(text=text)]).to_bson()
+
+class FakeCursor:
+    def __init__(self, documents, delay):
+        self.documents = documents
+        self.delay = delay
+
+    def sort(self, *args):
+        return self
+
+    async def to_list(self, length):
+        await asyncio.sleep(self.delay)
+        # MongoDB returns fresh documents on every query
+        return [dict(document) for document in self.documents]
+
+class FakeMessagesCollection:
+    def __init__(self, find_delay: float = 0.0, insert_delay: float = 0.0):
+        self.documents = []
+        self.find_delay = find_delay
+        self.insert_delay = insert_delay
+        self.finds = 0
+        self.fail_inserts = False
+
+    def find(self, query):
+        self.finds += 1
+        return FakeCursor([document for document in self.documents if document["thread_id"] == query["thread_id"]], self.find_delay)
+
+    async def insert_many(self, documents, ordered=True):
+        await asyncio.sleep(self.insert_delay)
+        if self.fail_inserts:
+            raise RuntimeError("insert failed")
+        self.documents.extend(dict(document) for document in documents)
+
+def texts(messages) -> list:
+    return [message.items[0].text for message in messages]
+
+def test_a_cached_thread_is_not_reloaded():
+    collection = FakeMessagesCollection()
+    collection.documents.append(create_document("t1", "hello"))
+    cache = ChatHistoryCache()
+
+    async def scenario():
+        first = await cache.get_messages("t1", collection)
+        first.append("changed by the caller")
+        return first, await cache.get_messages("t1", collection)
+
+    first, second = asyncio.run(scenario())
+
+    assert texts(second) == ["hello"]
+    assert collection.finds == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_appended_messages_are_added_to_a_cached_thread():
+    collection = FakeMessagesCollection()
+    cache = ChatHistoryCache()
+
+    async def scenario():
+        await cache.get_messages("t1", collection)
+        cache.append("t1", create_document("t1", "new"))
+        cache.append("t2", create_document("t2", "not cached"))
+        return await cache.get_messages("t1", collection)
+
+    assert texts(asyncio.run(scenario())) == ["new"]
+    assert cache.get_statistics()["threads"] == 1
+
+def test_threads_over_the_count_limit_are_evicted_least_recently_used_first():
+    collection = FakeMessagesCollection()
+    cache = ChatHistoryCache(max_threads=2)
+
+    async def scenario():
+        for thread_id in ("t1", "t2", "t1", "t3"):
+            await cache.get_messages(thread_id, collection)
+        await cache.get_messages("t2", collection)
+
+    asyncio.run(scenario())
+
+    # t2 was the least recently used when t3 arrived, so it had to be loaded again
+    assert collection.finds == 4
+    assert cache.evictions == 2
+
+def test_threads_over_the_byte_limit_are_evicted():
+    collection = FakeMessagesCollection()
+    for thread_id in ("t1", "t2", "t3"):
+        collection.documents.append(create_document(thread_id, "x" * 100))
+    thread_bytes = len(bson.encode(collection.documents[0]))
+    cache = ChatHistoryCache(max_bytes=2 * thread_bytes)
+
+    async def scenario():
+        for thread_id in ("t1", "t2", "t3"):
+            await cache.get_messages(thread_id, collection)
+
+    asyncio.run(scenario())
+
+    statistics = cache.get_statistics()
+    assert statistics["threads"] == 2
+    assert statistics["size_bytes"] == 2 * thread_bytes
+    assert cache.evictions == 1
+
+def test_a_thread_larger_than_the_byte_limit_is_not_cached():
+    collection = FakeMessagesCollection()
+    collection.documents.append(create_document("t1", "x" * 1000))
+    cache = ChatHistoryCache(max_bytes=100)
+
+    async def scenario():
+        await cache.get_messages("t1", collection)
+        return await cache.get_messages("t1", collection)
+
+    assert texts(asyncio.run(scenario())) == ["x" * 1000]
+    assert collection.finds == 2
+    assert cache.size_bytes == 0
+
+def test_a_load_that_raced_a_write_is_not_cached():
+    collection = FakeMessagesCollection(find_delay=0.05)
+    collection.documents.append(create_document("t1", "old"))
+    cache = ChatHistoryCache()
+
+    async def scenario():
+        load = asyncio.create_task(cache.get_messages("t1", collection))
+        await asyncio.sleep(0.01)
+        # Persisted while the load is in flight, so the load may or may not include it
+        document = create_document("t1", "new")
+        collection.documents.append(document)
+        cache.append("t1", document)
+        await load
+        return await cache.get_messages("t1", collection)
+
+    assert texts(asyncio.run(scenario())) == ["old", "new"]
+    assert collection.finds == 2
+
+def test_an_evicted_thread_is_reloaded():
+    collection = FakeMessagesCollection()
+    cache = ChatHistoryCache()
+
+    async def scenario():
+        await cache.get_messages("t1", collection)
+        cache.evict("t1")
+        await cache.get_messages("t1", collection)
+
+    asyncio.run(scenario())
+
+    assert collection.finds == 2
+    assert cache.size_bytes == 0
+
+def test_a_load_waits_for_the_threads_pending_writes():
+    for mode in (DIRECT, WRITE_BEHIND):
+        collection = FakeMessagesCollection(insert_delay=0.05)
+        cache = ChatHistoryCache()
+        writer = MessageWriter(mode=mode, flush_interval_seconds=0.01)
+
+        async def scenario():
+            writer.start(collection, on_write_failed=cache.evict)
+            await writer.write([create_document("t1", "a"), create_document("t1", "b")])
+            messages = await cache.get_messages("t1", collection, writer)
+            await writer.stop()
+            return messages
+
+        assert texts(asyncio.run(scenario())) == ["a", "b"], mode
+
+def test_a_direct_write_has_landed_when_it_returns_and_raises_if_it_failed():
+    collection = FakeMessagesCollection(insert_delay=0.05)
+    writer = MessageWriter(mode=DIRECT)
+
+    async def scenario():
+        writer.start(collection)
+        await writer.write([create_document("t1", "a")])
+        written = texts([AssistantMessageContent.from_bson(document) for document in collection.documents])
+        collection.fail_inserts = True
+        try:
+            await writer.write([create_document("t1", "b")])
+        except RuntimeError as e:
+            return written, e
+        return written, None
+
+    written, error = asyncio.run(scenario())
+
+    assert written == ["a"]
+    assert str(error) == "insert failed"
+    assert (writer.messages_written, writer.messages_failed) == (1, 1)
+
+def test_a_failed_write_evicts_the_thread():
+    for mode in (DIRECT, WRITE_BEHIND):
+        collection = FakeMessagesCollection()
+        cache = ChatHistoryCache()
+        writer = MessageWriter(mode=mode, flush_interval_seconds=0.01)
+
+        async def scenario():
+            writer.start(collection, on_write_failed=cache.evict)
+            await cache.get_messages("t1", collection, writer)
+            collection.fail_inserts = True
+            document = create_document("t1", "lost")
+            cache.append("t1", document)
+            try:
+                await writer.write([document])
+            except RuntimeError:
+                assert mode == DIRECT
+            await writer.stop()
+            return await cache.get_messages("t1", collection, writer)
+
+        assert texts(asyncio.run(scenario())) == [], mode
+        assert writer.messages_failed == 1
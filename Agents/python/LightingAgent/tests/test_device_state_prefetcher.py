@@ -0,0 +1,31 @@
+import asyncio
+from types import SimpleNamespace
+from services.device_state_prefetcher import DeviceStatePrefetcher
+
+class FakeKernel:
+    def __init__(self):
+        self.invoked = []
+
+    async def invoke(self, plugin_name: str, function_name: str, arguments):
+        self.invoked.append((plugin_name, function_name))
+        return SimpleNamespace(value='[{"id": "1", "isOn": true}]')
+
+def test_the_device_state_is_fetched_when_the_light_plugin_is_advertised():
+    kernel = FakeKernel()
+    prefetcher = DeviceStatePrefetcher(enabled=True)
+
+    device_state = asyncio.run(prefetcher.prefetch(kernel, lambda plugin_name: plugin_name == "light_plugin"))
+
+    assert kernel.invoked == [("light_plugin", "get_all_lights")]
+    assert 'light_plugin.get_all_lights: [{"id":"1","isOn":true}]' in device_state
+
+def test_nothing_is_fetched_when_the_light_plugin_is_not_advertised():
+    kernel = FakeKernel()
+    prefetcher = DeviceStatePrefetcher(enabled=True)
+
+    device_state = asyncio.run(prefetcher.prefetch(kernel, lambda plugin_name: plugin_name == "speaker_plugin"))
+
+    assert device_state is None
+    assert kernel.invoked == []
+    assert prefetcher.get_statistics()["skipped"] == 1
+    assert prefetcher.get_statistics()["attempts"] == 0
@@ -0,0 +1,74 @@
+import json
+import os
+import shutil
+from typing import Optional
+import httpx
+from services.kernel_factory import KernelFactory
+
+OPENAPI_PLUGINS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "..", "PluginResources", "OpenApiPlugins")
+ENDPOINTS = {"LightService": "http://light", "SceneService": "http://scene", "SpeakerService": "http://speaker"}
+
+def write_config(path, model_id: str, modes: Optional[dict] = None):
+    with open(path, "w") as file:
+        json.dump({
+            "OpenAI": {"DeploymentType": "OpenAI", "ApiKey": "sk-test", "ModelId": model_id},
+            "PluginServices": {service_name: {"Endpoints": [endpoint], "Mode": (modes or {}).get(service_name, "Http")} for service_name, endpoint in ENDPOINTS.items()},
+        }, file)
+
+def touch(path):
+    # Move the modification time forward so the change is seen even within the file system's timestamp resolution
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+def create_factory(tmp_path) -> KernelFactory:
+    plugins_directory = tmp_path / "OpenApiPlugins"
+    shutil.copytree(OPENAPI_PLUGINS_DIRECTORY, plugins_directory)
+    write_config(tmp_path / "config.json", "gpt-4o")
+    factory = KernelFactory(str(tmp_path / "config.json"), str(plugins_directory))
+    factory.initialize(httpx.AsyncClient())
+    return factory
+
+def test_runs_keep_the_previous_kernel_when_the_config_is_broken(tmp_path):
+    factory = create_factory(tmp_path)
+    chat_completion = factory.chat_completion
+
+    (tmp_path / "config.json").write_text("{ not json")
+    touch(tmp_path / "config.json")
+
+    assert factory.refresh_if_changed() is False
+    kernel = factory.create_kernel(ENDPOINTS)
+    assert factory.chat_completion is chat_completion
+    assert kernel.get_service().ai_model_id == "gpt-4o"
+    assert {"light_plugin", "scene_plugin", "speaker_plugin"} <= set(kernel.plugins)
+
+    # The broken file isn't rebuilt on every run, only once it changes again
+    builds = []
+    factory._build = lambda: builds.append(1)
+    assert factory.refresh_if_changed() is False
+    assert builds == []
+
+def test_a_plugin_that_fails_to_build_keeps_the_previous_config_and_plugins(tmp_path):
+    factory = create_factory(tmp_path)
+    scene_plugin = factory.create_kernel(ENDPOINTS).plugins["scene_plugin"]
+
+    # The scene plugin has no native implementation, so building it in-process fails after the config was read
+    write_config(tmp_path / "config.json", "gpt-4o-mini", {"SceneService": "InProcess"})
+    touch(tmp_path / "config.json")
+
+    assert factory.refresh_if_changed() is False
+    kernel = factory.create_kernel(ENDPOINTS)
+    assert kernel.get_service().ai_model_id == "gpt-4o"
+    assert kernel.plugins["scene_plugin"] is scene_plugin
+    assert not factory.is_in_process("SceneService")
+
+def test_a_fixed_config_is_picked_up(tmp_path):
+    factory = create_factory(tmp_path)
+    (tmp_path / "config.json").write_text("{ not json")
+    touch(tmp_path / "config.json")
+    factory.refresh_if_changed()
+
+    write_config(tmp_path / "config.json", "gpt-4o-mini")
+    touch(tmp_path / "config.json")
+
+    assert factory.refresh_if_changed() is True
+    assert factory.create_kernel(ENDPOINTS).get_service().ai_model_id == "gpt-4o-mini"
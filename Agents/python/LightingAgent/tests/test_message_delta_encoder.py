@@ -0,0 +1,22 @@
+import pytest
+from models.streaming_assistant_message_content import StreamingAssistantMessageContent
+from utilities import message_delta_encoder
+from utilities.message_delta_encoder import encode_message_delta_event
+
+TOKENS = ["Sure", "!", " I'll", " set", " the", " \"stage\"", " lights\\", ".\n", "\t", "\x00\x1f", " 🎉", "é", "日本", " ", "</script>", ""]
+
+def encode_with_pydantic(text: str, index: int = 0) -> bytes:
+    # What AssistantEventStreamService produced for every token before the byte template
+    delta = StreamingAssistantMessageContent(content=[{"index": index, "type": "text", "text": {"value": text, "annotations": []}}])
+    return f"event: thread.message.delta\ndata: {delta.model_dump_json()}\n\n".encode("utf-8")
+
+@pytest.mark.parametrize("text", TOKENS)
+@pytest.mark.parametrize("index", [0, 3])
+def test_encoder_matches_pydantic_byte_for_byte(text, index):
+    assert encode_message_delta_event(text, index) == encode_with_pydantic(text, index)
+
+@pytest.mark.parametrize("text", TOKENS)
+def test_standard_library_fallback_matches_pydantic(text, monkeypatch):
+    monkeypatch.setattr(message_delta_encoder, "orjson", None)
+
+    assert encode_message_delta_event(text) == encode_with_pydantic(text)
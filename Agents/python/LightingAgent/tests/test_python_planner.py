@@ -0,0 +1,58 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from services.python_planner import PythonInterpreter, PythonPlanner
+
+class FakeStdin:
+    def __init__(self):
+        self.messages = []
+
+    def write(self, data: bytes):
+        self.messages.append(json.loads(data))
+
+class FakeProcess:
+    """Stands in for a worker: the test writes its protocol lines and reads what the planner sends back."""
+
+    def __init__(self):
+        self.stdout = asyncio.StreamReader()
+        self.stdin = FakeStdin()
+        self.returncode = None
+
+    def send(self, message: dict):
+        self.stdout.feed_data((json.dumps(message) + "\n").encode("utf-8"))
+
+def function(plugin_name: str, name: str):
+    return SimpleNamespace(plugin_name=plugin_name, name=name)
+
+def results(process: FakeProcess) -> dict:
+    return {message["id"]: message for message in process.stdin.messages if message["type"] == "result"}
+
+def test_forged_calls_are_rejected_and_allowed_calls_relayed():
+    async def scenario():
+        planner = PythonPlanner()
+        process = FakeProcess()
+        invoked = []
+
+        async def invoke(plugin_name, function_name, arguments):
+            invoked.append((plugin_name, function_name))
+            return "ok"
+
+        functions = [function("light_plugin", "get_all_lights"), function("python_planner", "run")]
+        run = asyncio.create_task(planner._run(PythonInterpreter(process=process, directory=""), "1", invoke, functions))
+        process.send({"type": "call", "id": 1, "plugin": "python_planner", "function": "run", "arguments": {"code": "1"}})
+        process.send({"type": "call", "id": 2, "plugin": "speaker_plugin", "function": "play_sound", "arguments": {}})
+        process.send({"type": "call", "id": 3, "plugin": "light_plugin", "function": "get_all_lights", "arguments": {}})
+        for _ in range(10):
+            await asyncio.sleep(0)
+        process.send({"type": "done", "result": None, "stdout": "", "stderr": ""})
+        await run
+        return planner, process, invoked
+
+    planner, process, invoked = asyncio.run(scenario())
+
+    assert invoked == [("light_plugin", "get_all_lights")]
+    assert "not available" in results(process)[1]["error"]
+    assert "not available" in results(process)[2]["error"]
+    assert results(process)[3]["result"] == "ok"
+    assert planner.rejected_calls == 2
+    assert planner.function_calls == 1
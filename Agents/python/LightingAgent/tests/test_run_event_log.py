@@ -0,0 +1,57 @@
+import asyncio
+from utilities.run_event_log import RunEventLog
+
+async def collect(log: RunEventLog, last_event_id=None) -> list:
+    return [event async for event in log.follow(last_event_id)]
+
+async def fill(log: RunEventLog, count: int):
+    for index in range(count):
+        await log.append(f"event: e{index}\n\n")
+    await log.close()
+
+def test_events_are_numbered_with_id_lines():
+    async def scenario():
+        log = RunEventLog()
+        await fill(log, 2)
+        return await collect(log)
+
+    assert asyncio.run(scenario()) == [b"id: 0\nevent: e0\n\n", b"id: 1\nevent: e1\n\n"]
+
+def test_following_from_a_last_event_id_replays_the_events_after_it():
+    async def scenario():
+        log = RunEventLog()
+        await fill(log, 5)
+        return await collect(log, last_event_id=2)
+
+    assert asyncio.run(scenario()) == [b"id: 3\nevent: e3\n\n", b"id: 4\nevent: e4\n\n"]
+
+def test_resuming_from_a_dropped_event_continues_from_the_oldest_kept():
+    async def scenario():
+        log = RunEventLog(max_events=3)
+        await fill(log, 6)
+        return await collect(log, last_event_id=0)
+
+    assert asyncio.run(scenario()) == [b"id: 3\nevent: e3\n\n", b"id: 4\nevent: e4\n\n", b"id: 5\nevent: e5\n\n"]
+
+def test_followers_receive_new_events_until_the_log_closes():
+    async def scenario():
+        log = RunEventLog()
+        await log.append("event: e0\n\n")
+        followers = [asyncio.create_task(collect(log)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        await log.append("event: e1\n\n")
+        await asyncio.sleep(0.01)
+        await log.append(b"event: e2\n\n")
+        await log.close()
+        return await asyncio.gather(*followers)
+
+    for events in asyncio.run(scenario()):
+        assert [event.split(b"\n")[1] for event in events] == [b"event: e0", b"event: e1", b"event: e2"]
+
+def test_resuming_at_the_end_of_a_closed_log_returns_nothing():
+    async def scenario():
+        log = RunEventLog()
+        await fill(log, 2)
+        return await collect(log, last_event_id=1)
+
+    assert asyncio.run(scenario()) == []
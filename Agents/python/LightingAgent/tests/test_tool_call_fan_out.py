@@ -0,0 +1,59 @@
+from semantic_kernel.contents.author_role import AuthorRole
+from semantic_kernel.contents.chat_message_content import ChatMessageContent
+from semantic_kernel.contents.function_call_content import FunctionCallContent
+from semantic_kernel.contents.function_result_content import FunctionResultContent
+from services.tool_call_fan_out import ToolCallOrderedChatHistory, parse_concurrency_limits
+
+def call_message(*call_ids) -> ChatMessageContent:
+    return ChatMessageContent(role=AuthorRole.ASSISTANT, items=[FunctionCallContent(id=call_id, name="light_plugin-change_light_state", arguments="{}") for call_id in call_ids])
+
+def result_message(call_id: str) -> ChatMessageContent:
+    return ChatMessageContent(role=AuthorRole.TOOL, items=[FunctionResultContent(id=call_id, name="light_plugin-change_light_state", result=call_id)])
+
+def result_ids(history: ToolCallOrderedChatHistory) -> list:
+    return [message.items[0].id for message in history.messages if message.role == AuthorRole.TOOL]
+
+def test_results_are_kept_in_the_order_of_the_calls():
+    history = ToolCallOrderedChatHistory(system_message="system")
+    history.add_user_message("turn the lights on")
+    history.add_message(call_message("a", "b", "c"))
+
+    for call_id in ("c", "a", "b"):
+        history.add_message(result_message(call_id))
+
+    assert result_ids(history) == ["a", "b", "c"]
+    assert [message.role for message in history.messages] == [AuthorRole.SYSTEM, AuthorRole.USER, AuthorRole.ASSISTANT] + [AuthorRole.TOOL] * 3
+
+def test_only_the_current_turns_calls_are_ordered():
+    history = ToolCallOrderedChatHistory()
+    history.add_message(call_message("a", "b"))
+    history.add_message(result_message("b"))
+    history.add_message(result_message("a"))
+    history.add_message(call_message("c", "d"))
+
+    history.add_message(result_message("d"))
+    history.add_message(result_message("c"))
+
+    assert result_ids(history) == ["a", "b", "c", "d"]
+
+def test_a_result_for_an_unknown_call_is_appended():
+    history = ToolCallOrderedChatHistory()
+    history.add_message(call_message("a", "b"))
+    history.add_message(result_message("b"))
+
+    history.add_message(result_message("z"))
+
+    assert result_ids(history) == ["b", "z"]
+
+def test_other_messages_are_appended():
+    history = ToolCallOrderedChatHistory()
+    history.add_message(call_message("a"))
+    history.add_message(result_message("a"))
+
+    history.add_assistant_message("done")
+
+    assert history.messages[-1].content == "done"
+
+def test_parse_concurrency_limits():
+    assert parse_concurrency_limits("light_plugin=2, speaker_plugin = 1,") == {"light_plugin": 2, "speaker_plugin": 1}
+    assert parse_concurrency_limits("") == {}
@@ -1,10 +1,13 @@
 
+import asyncio
 import json
-from typing import Optional
+import time
+from typing import AsyncGenerator, AsyncIterable, List, Optional, TypeVar
 from pydantic import BaseModel
 from models.streaming_assistant_message_content import StreamingAssistantMessageContent
 from models.assistant_thread_run import AssistantThreadRun
 from models.assistant_message_content import AssistantMessageContent
+from utilities.message_delta_encoder import encode_message_delta_event
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Any, Generator, Optional
@@ -12,16 +15,45 @@ from openai.types.chat.chat_completion_chunk import ChatCompletionChunk
 from semantic_kernel.contents.streaming_chat_message_content import StreamingChatMessageContent
 from semantic_kernel.contents import TextContent, AuthorRole
 
+T = TypeVar("T")
 
 @dataclass
 class StreamingChatCompletionsUpdate:
     Id: str
     FinishReason: Optional[str]
 
+@dataclass
+class DeltaFlushPolicy:
+    """When to send the text deltas buffered for a message; zeros send every chunk as its own event.
+
+    Deltas are coalesced until max_delay_ms have passed since the first buffered one or
+    max_bytes of text have built up; whatever is left is always sent when the message finishes.
+    The policy is checked as chunks arrive, and the stream also waits for the next chunk only
+    until max_delay_ms is up (see AssistantEventStreamService.with_flush_deadline), so text
+    isn't held back while the model pauses.
+    """
+    max_delay_ms: int = 0
+    max_bytes: int = 0
+
+    def should_flush(self, pending_since: float, pending_bytes: int, now: float) -> bool:
+        if self.max_delay_ms <= 0 and self.max_bytes <= 0:
+            return True
+        if self.max_delay_ms > 0 and (now - pending_since) * 1000 >= self.max_delay_ms:
+            return True
+        return self.max_bytes > 0 and pending_bytes >= self.max_bytes
+
 class AssistantEventStreamService:
     _current_message: Optional[AssistantMessageContent] = None
 
-    def create_message_event(self, run: AssistantThreadRun, data: StreamingChatMessageContent) -> Generator[str, None, None]:
+    def __init__(self, flush_policy: Optional[DeltaFlushPolicy] = None):
+        self.flush_policy = flush_policy or DeltaFlushPolicy()
+        self._text_chunks: List[str] = []
+        self._pending_chunks: List[str] = []
+        self._pending_bytes = 0
+        self._pending_since = 0.0
+        self._pending_index = 0
+
+    def create_message_event(self, run: AssistantThreadRun, data: StreamingChatMessageContent) -> Generator[str | bytes, None, None]:
         streaming_chat_completions_update: ChatCompletionChunk = data.inner_content
 
         if (self._current_message is not None and streaming_chat_completions_update.id != self._current_message.id):
@@ -29,11 +61,15 @@ class AssistantEventStreamService:
             return
 
         if (streaming_chat_completions_update.choices[0].delta.content == None and streaming_chat_completions_update.choices[0].delta.tool_calls == None):
-            if (streaming_chat_completions_update.choices[0].finish_reason != None and self._current_message != None and len(self._current_message.items[0].text) > 0):
+            if (streaming_chat_completions_update.choices[0].finish_reason != None and self._current_message != None and self._text_chunks):
+                yield from self.flush_message_delta()
 
+                # Join the text once now that the message is complete
+                self._current_message.items[0].text = "".join(self._text_chunks)
                 yield self.create_event("thread.message.completed", self._current_message)
-            
+
                 self._current_message = None
+                self._text_chunks = []
 
             return
 
@@ -51,20 +87,64 @@ class AssistantEventStreamService:
                 yield self.create_event("thread.message.created", self._current_message)
                 yield self.create_event("thread.message.in_progress", self._current_message)
 
-            self._current_message.items[0].text += data.content
-
-            delta: StreamingAssistantMessageContent = StreamingAssistantMessageContent(
-                content=[{
-                    "index": streaming_chat_completions_update.choices[0].index,
-                    "type": "text",
-                    "text": {
-                        "value": data.content,
-                        "annotations": []
-                    }
-                }]
-            )
-
-            yield self.create_event("thread.message.delta", delta)
+            self._text_chunks.append(data.content)
+
+            # Buffer the delta and send the buffer once the flush policy says so
+            now = time.monotonic()
+            if not self._pending_chunks:
+                self._pending_since = now
+                self._pending_index = streaming_chat_completions_update.choices[0].index
+            self._pending_chunks.append(data.content)
+            if self.flush_policy.max_bytes > 0:
+                self._pending_bytes += len(data.content.encode())
+            if self.flush_policy.should_flush(self._pending_since, self._pending_bytes, now):
+                yield from self.flush_message_delta()
+        else:
+            # Don't hold text back while the model streams a tool call
+            yield from self.flush_message_delta()
+
+    async def with_flush_deadline(self, results: AsyncIterable[T]) -> AsyncGenerator[Optional[T], None]:
+        """Yield the results, and None whenever buffered deltas reach max_delay_ms before the next result arrives.
+
+        The caller flushes the buffer (flush_message_delta) on None; the pending result is kept
+        and yielded once it arrives.
+        """
+        iterator = results.__aiter__()
+        next_result: Optional[asyncio.Future] = None
+        try:
+            while True:
+                deadline = self._get_flush_deadline()
+                if deadline is not None:
+                    # Only wait in a separate task while text is buffered, which is never during a tool call
+                    if next_result is None:
+                        next_result = asyncio.ensure_future(iterator.__anext__())
+                    done, _ = await asyncio.wait({next_result}, timeout=max(0.0, deadline - time.monotonic()))
+                    if not done:
+                        yield None
+                        continue
+                try:
+                    result = await (next_result if next_result is not None else iterator.__anext__())
+                except StopAsyncIteration:
+                    return
+                next_result = None
+                yield result
+        finally:
+            if next_result is not None and not next_result.done():
+                next_result.cancel()
+
+    def _get_flush_deadline(self) -> Optional[float]:
+        if not self._pending_chunks or self.flush_policy.max_delay_ms <= 0:
+            return None
+        return self._pending_since + self.flush_policy.max_delay_ms / 1000
+
+    def flush_message_delta(self) -> Generator[bytes, None, None]:
+        """Send the buffered text deltas, if any, as a single thread.message.delta event."""
+        if not self._pending_chunks:
+            return
+        text = self._pending_chunks[0] if len(self._pending_chunks) == 1 else "".join(self._pending_chunks)
+        self._pending_chunks = []
+        self._pending_bytes = 0
+        yield encode_message_delta_event(text, self._pending_index)
 
     def create_event(self, event_type: str, data: BaseModel) -> str:
         json_data = data.model_dump_json()
@@ -0,0 +1,30 @@
+import json
+from typing import Dict
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the standard library produces the same bytes, only slower
+    orjson = None
+
+# The thread.message.delta event is always the same envelope around the token text, so only the text is
+# serialized per token. The bytes match StreamingAssistantMessageContent(...).model_dump_json() exactly.
+_EVENT_PREFIX = b'event: thread.message.delta\ndata: {"content":[{"index":'
+_TEXT_PREFIX = b',"type":"text","text":{"value":'
+_EVENT_SUFFIX = b',"annotations":[]}}]}\n\n'
+
+_prefixes: Dict[int, bytes] = {}
+
+def encode_json_string(text: str) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(text)
+        except TypeError:
+            pass  # e.g. lone surrogates, which the standard library escapes instead of rejecting
+    return json.dumps(text, ensure_ascii=False).encode("utf-8", "surrogatepass")
+
+def encode_message_delta_event(text: str, index: int = 0) -> bytes:
+    """Encode a thread.message.delta SSE event carrying a single text delta."""
+    prefix = _prefixes.get(index)
+    if prefix is None:
+        prefix = _prefixes[index] = _EVENT_PREFIX + str(index).encode() + _TEXT_PREFIX
+    return prefix + encode_json_string(text) + _EVENT_SUFFIX
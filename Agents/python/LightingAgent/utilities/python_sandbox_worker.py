@@ -0,0 +1,208 @@
+"""Interpreter worker for the Python planner; runs one script and exits.
+
+The worker is started ahead of time with `python -I python_sandbox_worker.py` and talks to
+the agent with JSON lines: it sends {"type": "ready"}, receives one
+{"type": "script", "code", "functions", "cpu_seconds"} message and then sends a
+{"type": "call"} message for every function the script awaits, resolving it when the matching
+{"type": "result"} arrives, until it sends {"type": "done"} with the script's result and output.
+
+Only the standard library is imported so the worker starts quickly, and the script's own
+stdout and stderr are captured so they can't corrupt the protocol.
+
+Before it reports ready, the worker isolates itself (see _isolate): it moves into a network
+namespace with no interfaces when the kernel allows it, chroots into its empty directory and
+switches to an unprivileged uid when started as root, and installs a seccomp filter that
+makes opening files, creating sockets and starting processes fail with EPERM. Modules the
+script may want are imported before that, since nothing can be read from disk afterwards. If
+a required step fails, the worker sends {"type": "error"} instead of ready and exits.
+"""
+import ast
+import asyncio
+import contextlib
+import ctypes
+import ctypes.util
+import io
+import itertools
+import json
+import os
+import resource
+import sys
+import traceback
+
+# Imported up front so scripts can use them once the filesystem is out of reach
+import collections, datetime, functools, math, random, re, statistics, time  # noqa: E401,F401
+
+MEMORY_BYTES = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+SANDBOX_UID = int(sys.argv[2]) if len(sys.argv) > 2 else 65534
+SANDBOX_GID = int(sys.argv[3]) if len(sys.argv) > 3 else 65534
+
+CLONE_NEWNET = 0x40000000
+SCMP_ACT_ALLOW = 0x7fff0000
+SCMP_ACT_ERRNO_EPERM = 0x00050000 | 1
+
+# Syscalls a script has no use for; names the kernel or libseccomp doesn't know are skipped
+DENIED_SYSCALLS = (
+    # Network
+    "socket", "socketpair", "connect", "bind", "listen", "accept", "accept4",
+    # Processes and threads
+    "fork", "vfork", "clone", "clone3", "execve", "execveat", "ptrace", "process_vm_readv", "process_vm_writev",
+    "kill", "tkill", "tgkill", "pidfd_open", "pidfd_getfd", "pidfd_send_signal",
+    # Files
+    "open", "openat", "openat2", "creat", "open_by_handle_at", "name_to_handle_at", "mkdir", "mkdirat", "rmdir",
+    "unlink", "unlinkat", "rename", "renameat", "renameat2", "link", "linkat", "symlink", "symlinkat", "chmod",
+    "fchmod", "fchmodat", "chown", "fchown", "lchown", "fchownat", "truncate", "mknod", "mknodat",
+    # Privileges, namespaces and mounts
+    "setuid", "setgid", "setreuid", "setregid", "setresuid", "setresgid", "setgroups", "capset", "unshare",
+    "setns", "chroot", "pivot_root", "mount", "umount2", "mount_setattr", "move_mount", "open_tree", "fsopen",
+    "fsmount", "fspick", "personality",
+    # Kernel interfaces
+    "bpf", "perf_event_open", "io_uring_setup", "io_uring_enter", "io_uring_register", "userfaultfd", "keyctl",
+    "add_key", "request_key", "init_module", "finit_module", "delete_module", "kexec_load", "kexec_file_load",
+    "reboot", "swapon", "swapoff", "syslog", "acct", "quotactl", "ioperm", "iopl",
+)
+
+# Keep a private handle on the real stdout for the protocol, then point fd 1 at /dev/null
+_protocol = os.fdopen(os.dup(1), "w", buffering=1)
+_devnull = os.open(os.devnull, os.O_WRONLY)
+os.dup2(_devnull, 1)
+os.dup2(_devnull, 2)
+
+_pending = {}
+_call_ids = itertools.count(1)
+
+class functions:
+    pass
+
+def _send(message: dict):
+    _protocol.write(json.dumps(message, default=str) + "\n")
+
+def _create_function(plugin_name: str, function_name: str):
+    async def call(arguments: dict = None):
+        call_id = next(_call_ids)
+        future = asyncio.get_running_loop().create_future()
+        _pending[call_id] = future
+        _send({"type": "call", "id": call_id, "plugin": plugin_name, "function": function_name, "arguments": arguments or {}})
+        return await future
+    call.__name__ = f"{plugin_name}__{function_name}"
+    return call
+
+async def _read_results(reader: asyncio.StreamReader):
+    while True:
+        line = await reader.readline()
+        if not line:
+            return
+        message = json.loads(line)
+        future = _pending.pop(message.get("id"), None)
+        if future is None or future.done():
+            continue
+        if message.get("error"):
+            future.set_exception(RuntimeError(message["error"]))
+        else:
+            future.set_result(message.get("result"))
+
+def _limit_resources(cpu_seconds: float):
+    # The CPU limit counts from now, not from interpreter start-up
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    cpu_limit = int(usage.ru_utime + usage.ru_stime + cpu_seconds) + 1
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit, cpu_limit + 1))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+    with contextlib.suppress(ValueError, OSError):
+        resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+
+def _isolate(directory: str) -> dict:
+    """Cut the worker off from the network, the filesystem and other processes; raises if it can't."""
+    # Load libseccomp while the filesystem is still reachable
+    libc = ctypes.CDLL(None, use_errno=True)
+    library = ctypes.util.find_library("seccomp")
+    if library is None:
+        raise RuntimeError("libseccomp is not installed.")
+    seccomp = ctypes.CDLL(library, use_errno=True)
+    isolation = {"network_namespace": False, "chroot": False, "uid": os.getuid(), "seccomp": False}
+
+    # A network namespace needs CAP_SYS_ADMIN, which containers usually lack; the seccomp filter blocks sockets either way
+    isolation["network_namespace"] = libc.unshare(CLONE_NEWNET) == 0
+
+    if os.getuid() == 0:
+        os.chroot(directory)
+        os.chdir("/")
+        isolation["chroot"] = True
+        os.setgroups([])
+        os.setgid(SANDBOX_GID)
+        os.setuid(SANDBOX_UID)
+        isolation["uid"] = os.getuid()
+
+    seccomp.seccomp_init.restype = ctypes.c_void_p
+    seccomp.seccomp_init.argtypes = [ctypes.c_uint32]
+    seccomp.seccomp_syscall_resolve_name.argtypes = [ctypes.c_char_p]
+    seccomp.seccomp_rule_add.argtypes = [ctypes.c_void_p, ctypes.c_uint32, ctypes.c_int, ctypes.c_uint]
+    seccomp.seccomp_load.argtypes = [ctypes.c_void_p]
+    seccomp.seccomp_release.argtypes = [ctypes.c_void_p]
+
+    # Allow by default, deny the listed syscalls with EPERM; calls from another ABI (e.g. x32) kill the worker
+    context = seccomp.seccomp_init(SCMP_ACT_ALLOW)
+    if not context:
+        raise RuntimeError("seccomp_init failed.")
+    try:
+        for name in DENIED_SYSCALLS:
+            number = seccomp.seccomp_syscall_resolve_name(name.encode())
+            if number >= 0 and seccomp.seccomp_rule_add(context, SCMP_ACT_ERRNO_EPERM, number, 0) < 0:
+                raise RuntimeError(f"Failed to add a seccomp rule for {name}.")
+        if seccomp.seccomp_load(context) < 0:
+            raise RuntimeError("seccomp_load failed.")
+    finally:
+        seccomp.seccomp_release(context)
+    isolation["seccomp"] = True
+    return isolation
+
+def _compile(code: str):
+    # Assign the last expression to _ so its value can be returned, like a notebook cell
+    tree = ast.parse(code)
+    if tree.body and isinstance(tree.body[-1], ast.Expr):
+        tree.body[-1] = ast.Assign(targets=[ast.Name(id="_", ctx=ast.Store())], value=tree.body[-1].value)
+        ast.fix_missing_locations(tree)
+    return compile(tree, "<script>", "exec", flags=ast.PyCF_ALLOW_TOP_LEVEL_AWAIT)
+
+async def _run_script(message: dict) -> dict:
+    for plugin_name, function_name in message["functions"]:
+        setattr(functions, f"{plugin_name}__{function_name}", _create_function(plugin_name, function_name))
+
+    scope = {"__name__": "__main__", "functions": functions, "asyncio": asyncio}
+    stdout, stderr = io.StringIO(), io.StringIO()
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            _limit_resources(message["cpu_seconds"])
+            result = eval(_compile(message["code"]), scope)
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception:
+            traceback.print_exc()
+
+    result = scope.get("_")
+    try:
+        json.dumps(result)
+    except (TypeError, ValueError):
+        result = repr(result)
+    return {"type": "done", "result": result, "stdout": stdout.getvalue(), "stderr": stderr.getvalue()}
+
+async def main():
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=16 * 1024 * 1024)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    if MEMORY_BYTES:
+        resource.setrlimit(resource.RLIMIT_AS, (MEMORY_BYTES, MEMORY_BYTES))
+    try:
+        isolation = _isolate(os.getcwd())
+    except Exception as e:
+        _send({"type": "error", "message": f"The interpreter could not be isolated: {e}"})
+        return
+    _send({"type": "ready", "isolation": isolation})
+
+    line = await reader.readline()
+    if not line:
+        return
+    results = asyncio.create_task(_read_results(reader))
+    _send(await _run_script(json.loads(line)))
+    results.cancel()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,53 @@
+import asyncio
+from collections import deque
+from typing import AsyncGenerator, Deque, Optional, Tuple
+
+class RunEventLog:
+    """A bounded, append-only log of a run's SSE events that any number of clients can follow.
+
+    Every event is stored with an "id:" line so a client that drops can re-attach with the
+    Last-Event-ID header and continue from the next event. Only the newest max_events are
+    kept; a client resuming from an event that has been dropped continues from the oldest
+    one still in the log.
+    """
+
+    def __init__(self, max_events: int = 10000):
+        self._events: Deque[Tuple[int, bytes]] = deque(maxlen=max_events)
+        self._next_event_id = 0
+        self._condition = asyncio.Condition()
+        self.closed = False
+
+    async def append(self, event: str | bytes):
+        if isinstance(event, str):
+            event = event.encode("utf-8")
+        async with self._condition:
+            self._events.append((self._next_event_id, b"id: %d\n" % self._next_event_id + event))
+            self._next_event_id += 1
+            self._condition.notify_all()
+
+    async def close(self):
+        async with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+    async def follow(self, last_event_id: Optional[int] = None) -> AsyncGenerator[bytes, None]:
+        """Yield the events after last_event_id (or from the start), then new ones until the log is closed."""
+        position = last_event_id + 1 if last_event_id is not None else 0
+        while True:
+            async with self._condition:
+                await self._condition.wait_for(lambda: self._next_event_id > position or self.closed)
+                # Walk back from the newest event so following the tail stays cheap on long logs
+                events = []
+                for event_id, event in reversed(self._events):
+                    if event_id < position:
+                        break
+                    events.append(event)
+                events.reverse()
+                position = self._next_event_id
+                closed = self.closed
+
+            for event in events:
+                yield event
+
+            if closed and position >= self._next_event_id:
+                return
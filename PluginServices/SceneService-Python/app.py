@@ -1,29 +1,64 @@
+import asyncio
 import json
-from fastapi import FastAPI, HTTPException
+import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, PlainTextResponse, Response
+from functools import partial
 from pydantic import BaseModel, Field
 from typing import List, Optional, Sequence
 import httpx
+import numpy as np
 import os
-from weaviate import Client as WeaviateClient, AuthClientPassword
-from semantic_kernel.connectors.memory.weaviate import weaviate_memory_store
 from semantic_kernel.connectors.ai.open_ai import OpenAITextEmbedding
+from openai import AsyncOpenAI
 
 from config import Config
+from palette import get_top_colors
+from single_flight import SceneSingleFlight, normalize_prompt
+from scene_cache import EmbeddingCache, PromptCache
+from scene_store import MemoryMappedSceneStore, SceneRecord, SceneStore, WeaviateSceneStore, create_weaviate_client
+from scene_writer import SceneWriter
+from metrics import Counter, Gauge, Histogram, render
+from http_manager import create_http_client
+from thumbnail_store import ThumbnailStore, create_thumbnail
+
+logger = logging.getLogger(__name__)
+
+IMAGE_PATH = "/Scene/image/"
+
+@asynccontextmanager
+async def lifespan(application: FastAPI):
+    # The pools and the HTTP client are started here rather than at import, so the lifespan owns them end to end.
+    # Bounded pools for the blocking work of a request: threads for the scene store, processes for the CPU-bound palette extraction
+    application.state.io_executor = ThreadPoolExecutor(max_workers=config.scene_service.io_workers, thread_name_prefix="scene-io")
+    application.state.palette_executor = ProcessPoolExecutor(max_workers=config.scene_service.palette_workers)
+    # One pooled HTTP client for every outbound call, including the embedding service's
+    application.state.http_client = create_http_client(config.scene_service)
+    application.state.embedding_service = OpenAITextEmbedding(
+        ai_model_id="text-embedding-ada-002",
+        async_client=AsyncOpenAI(http_client=application.state.http_client, timeout=httpx.Timeout(config.scene_service.embedding_timeout_seconds, connect=5.0))
+    )
+    application.state.scene_store = create_scene_store(application.state.io_executor)
+    prompt_cache.load()
+    scene_writer.start(application.state.scene_store)
+    yield
+    # Add the scenes that have not been written yet before the pools go away
+    await scene_writer.stop()
+    prompt_cache.save()
+    await application.state.http_client.aclose()
+    application.state.io_executor.shutdown(wait=True)
+    application.state.palette_executor.shutdown(wait=True)
 
 app = FastAPI(
     title="Scene API",
     version="v1",
-    description="Generates a light color palette for a scene based on a description; must use when setting the color of lights."
+    description="Generates a light color palette for a scene based on a description; must use when setting the color of lights.",
+    lifespan=lifespan
 )
 
 
-embeddingService = OpenAITextEmbedding(ai_model_id="text-embedding-ada-002")
-
-# Try to connect to Weaviate with the provided endpoints until one works
-weaviate_client = WeaviateClient(
-    url="http://localhost:8080",
-)
-
 class SceneRequest(BaseModel):
     threeWordDescription: str = Field(..., min_length=1, description="The palette to generate in 1-3 sentence (feel free to be creative!)")
     recommendedColors: str = Field(..., min_length=1, description="The name of 3 recommended colors for the scene based on your expertise (no need to ask the user; just do it!)")
@@ -42,28 +77,37 @@ async def generate_image(prompt: str) -> str:
         "n": 1,
         "size": "256x256"
     }
-    timeout = httpx.Timeout(120.0)  
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        response = await client.post("https://api.openai.com/v1/images/generations", headers=headers, json=data)
-        response.raise_for_status()
-        image_url = response.json()["data"][0]["url"]
+    timeout = httpx.Timeout(config.scene_service.image_generation_timeout_seconds, connect=5.0)
+    response = await app.state.http_client.post("https://api.openai.com/v1/images/generations", headers=headers, json=data, timeout=timeout)
+    response.raise_for_status()
+    image_url = response.json()["data"][0]["url"]
     return image_url
 
-async def download_image(url: str) -> str:
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url)
+async def download_image(url: str) -> bytes:
+    # Keep the image in memory so concurrent requests don't share a file, and stop reading at the size cap
+    max_bytes = config.scene_service.image_download_max_bytes
+    timeout = httpx.Timeout(config.scene_service.image_download_timeout_seconds, connect=5.0)
+    async with app.state.http_client.stream("GET", url, timeout=timeout) as response:
         response.raise_for_status()
-        image_bytes = response.content
-        output_path = os.path.join("/tmp", "image.png")
-        with open(output_path, "wb") as image_file:
-            image_file.write(image_bytes)
-    return output_path
+        if int(response.headers.get("Content-Length") or 0) > max_bytes:
+            raise HTTPException(status_code=502, detail=f"The generated image is larger than {max_bytes} bytes.")
+        image_bytes = bytearray()
+        async for chunk in response.aiter_bytes():
+            image_bytes += chunk
+            if len(image_bytes) > max_bytes:
+                raise HTTPException(status_code=502, detail=f"The generated image is larger than {max_bytes} bytes.")
+    return bytes(image_bytes)
+
+def create_scene_store(executor) -> SceneStore:
+    if config.scene_service.scene_cache_backend == "embedded":
+        return MemoryMappedSceneStore(config.scene_service.scene_cache_path, executor)
+    if config.scene_service.scene_cache_backend == "weaviate":
+        return WeaviateSceneStore(create_weaviate_client(config.weaviate.endpoints), executor)
+    raise ValueError(f"Unknown scene cache backend '{config.scene_service.scene_cache_backend}'.")
 
-def get_top_colors(image_path: str, color_count: int) -> List[str]:
-    from colorthief import ColorThief
-    color_thief = ColorThief(image_path)
-    palette = color_thief.get_palette(color_count=color_count)
-    return [f'#{r:02x}{g:02x}{b:02x}' for r, g, b in palette]
+async def run_blocking(executor, function, *args, **kwargs):
+    # Run CPU-bound or synchronous work off the event loop
+    return await asyncio.get_running_loop().run_in_executor(executor, partial(function, *args, **kwargs))
 
 
 # OpenAI and Weaviate configurations
@@ -73,36 +117,163 @@ with open('../../config.json') as file:
 deployment_type, api_key, ai_model_id, deployment_name, endpoint, org_id = config.openai.model_dump().values()
 endpoints = config.weaviate.model_dump().values()
 
+scene_writer = SceneWriter(
+    max_queue_size=config.scene_service.scene_write_queue_size,
+    batch_size=config.scene_service.scene_write_batch_size,
+    flush_interval_seconds=config.scene_service.scene_write_flush_interval_seconds,
+    max_retries=config.scene_service.scene_write_max_retries,
+    retry_backoff_seconds=config.scene_service.scene_write_retry_backoff_seconds
+)
+thumbnail_store = ThumbnailStore(config.scene_service.thumbnail_path, config.scene_service.thumbnail_max_bytes)
+
+# Concurrent requests for the same (or a nearly identical) scene share one search and generation
+single_flight = SceneSingleFlight(config.scene_service.cache_distance_threshold)
+
+# Exact repeats of a prompt are answered from memory, and repeat embeddings are skipped on the vector search path
+prompt_cache = PromptCache(config.scene_service.prompt_cache_max_entries, config.scene_service.prompt_cache_ttl_seconds, config.scene_service.prompt_cache_path)
+embedding_cache = EmbeddingCache(config.scene_service.embedding_cache_max_entries, config.scene_service.embedding_cache_ttl_seconds)
+
+# Prometheus-style metrics, to tune the distance threshold against the cost of generating scenes
+scene_cache_lookups = Counter("scene_cache_lookups_total", "Scene cache lookups by result: hit, miss (nothing cached), below_threshold, image_evicted (close scenes whose image is gone) or error.", ["result"])
+scene_cache_match_distance = Histogram("scene_cache_match_distance", "Cosine distance of the nearest cached scene.", (0.01, 0.02, 0.03, 0.05, 0.075, 0.1, 0.15, 0.2, 0.3, 0.5))
+embedding_seconds = Histogram("scene_embedding_seconds", "Time to embed a prompt (cache misses only).")
+search_seconds = Histogram("scene_search_seconds", "Time to search the scene cache.")
+generation_seconds = Histogram("scene_generation_seconds", "Time to generate a scene: the image, its download and the palette.")
+# The single-flight and cache statistics are kept by their own counters and copied over on each scrape
+requests_coalesced = Counter("scene_requests_coalesced_total", "Requests that waited for an identical (exact) or similar (near) request in flight.", ["kind"])
+memory_cache_lookups = Counter("scene_memory_cache_lookups_total", "In-process prompt and embedding cache lookups by result.", ["cache", "result"])
+memory_cache_entries = Gauge("scene_memory_cache_entries", "Entries in the in-process prompt and embedding caches.", ["cache"])
+
 
 @app.post("/Scene", response_model=ScenePallette, tags=["Scene"], summary="Generates a light color palette for a scene based on a description; _must_ use when setting the color of lights.")
-async def generate_scene_pallette(scene_request: SceneRequest):
+async def generate_scene_pallette(scene_request: SceneRequest, request: Request):
     complete_prompt = f"{scene_request.threeWordDescription}{'; ' + scene_request.recommendedColors if scene_request.recommendedColors else ''}"
 
+    key = normalize_prompt(complete_prompt)
+    cached_scene = prompt_cache.get(key)
+    if cached_scene is not None and has_image(cached_scene.get("imageUrl")):
+        return with_public_image_url(ScenePallette(**cached_scene), request)
+
+    scene = await single_flight.run(
+        complete_prompt,
+        lambda: embed_prompt(key, complete_prompt),
+        lambda embedding: find_or_create_scene(scene_request, complete_prompt, embedding)
+    )
+    prompt_cache.set(key, scene.model_dump())
+    return with_public_image_url(scene, request)
+
+def has_image(image_url: Optional[str]) -> bool:
+    # A stored image may have been evicted since the scene was cached; its scene then counts as a miss
+    if image_url and image_url.startswith(IMAGE_PATH):
+        return thumbnail_store.get_path(image_url[len(IMAGE_PATH):]) is not None
+    return True
+
+def with_public_image_url(scene: ScenePallette, request: Request) -> ScenePallette:
+    # Stored scenes point at their image with a path, so they stay valid wherever the service is reached from
+    if scene.imageUrl and scene.imageUrl.startswith("/"):
+        base_url = config.scene_service.public_base_url or str(request.base_url)
+        return scene.model_copy(update={"imageUrl": base_url.rstrip("/") + scene.imageUrl})
+    return scene
+
+async def embed_prompt(key: str, complete_prompt: str) -> np.ndarray:
+    embedding = embedding_cache.get(key)
+    if embedding is None:
+        with embedding_seconds.time():
+            embedding = np.asarray(await app.state.embedding_service.generate_embeddings(complete_prompt), dtype=np.float32).reshape(-1)
+        embedding_cache.set(key, embedding)
+    return embedding
+
+async def find_or_create_scene(scene_request: SceneRequest, complete_prompt: str, embedding) -> ScenePallette:
+    # A scene generated moments ago may still be waiting to be written
+    pending_match = scene_writer.find_pending(embedding, config.scene_service.cache_distance_threshold)
+    if pending_match is not None and has_image(pending_match.image_url):
+        scene_cache_lookups.inc(result="hit")
+        return ScenePallette(imageUrl=pending_match.image_url, colors=pending_match.colors)
+
     try:
-        embedding = await embeddingService.generate_embeddings(complete_prompt)
-        result = weaviate_client.query.get("scene", ["sk_text", "sk_description", "sk_additional_metadata"]).with_near_vector({'vector': embedding}).with_limit(1).do()
-        if result['data']['Get']['Scene']:
-            return ScenePallette(
-                imageUrl=result['data']['Get']['Scene'][0]['sk_additional_metadata'],
-                colors=json.loads(result['data']['Get']['Scene'][0]['sk_description'])
-            )
-    except Exception as e:
-        pass
+        with search_seconds.time():
+            matches = await app.state.scene_store.search(embedding, config.scene_service.scene_search_top_k)
+        logger.debug("Nearest scenes for '%s': %s", complete_prompt, [(match.text, match.distance) for match in matches])
+
+        # Matches are nearest first; a store that doesn't report distances counts every match as close enough
+        if matches and matches[0].distance is not None:
+            scene_cache_match_distance.observe(matches[0].distance)
+        close_matches = [match for match in matches if match.distance is None or match.distance <= config.scene_service.cache_distance_threshold]
+        live_matches = [match for match in close_matches if has_image(match.image_url)]
+        if live_matches:
+            scene_cache_lookups.inc(result="hit")
+            return ScenePallette(imageUrl=live_matches[0].image_url, colors=live_matches[0].colors)
+        scene_cache_lookups.inc(result="image_evicted" if close_matches else "below_threshold" if matches else "miss")
+    except Exception:
+        scene_cache_lookups.inc(result="error")
+        logger.exception("Searching the scene cache failed; generating the scene instead")
 
     # Generate an image
-    image_url = await generate_image(f"Realistic image for desktop background: {complete_prompt}")
-    local_image_path = await download_image(image_url)
-    hex_colors = get_top_colors(local_image_path, 5)
+    with generation_seconds.time():
+        image_url = await generate_image(f"Realistic image for desktop background: {complete_prompt}")
+        image_bytes = await download_image(image_url)
+        hex_colors, thumbnail = await asyncio.gather(
+            run_blocking(app.state.palette_executor, get_top_colors, image_bytes, 5, config.scene_service.palette_engine, config.scene_service.palette_max_dimension),
+            run_blocking(app.state.palette_executor, create_thumbnail, image_bytes, config.scene_service.thumbnail_max_dimension, config.scene_service.thumbnail_quality)
+        )
 
-    # Cache the scene
-    weaviate_client.data_object.create({
-        "sk_additional_metadata": image_url,
-        "sk_description": json.dumps(hex_colors),
-        "sk_text": scene_request.threeWordDescription,
-    }, "scene", vector=embedding)
+    # Keep a copy of the image, since the generated image's URL expires
+    try:
+        image_hash = await run_blocking(app.state.io_executor, thumbnail_store.put, thumbnail)
+        image_url = f"{IMAGE_PATH}{image_hash}"
+    except Exception:
+        logger.exception("Storing the scene image failed; returning its remote URL")
+
+    # Cache the scene in the background; the palette is all the caller needs
+    await scene_writer.write(SceneRecord(scene_request.threeWordDescription, hex_colors, image_url, embedding))
 
     return ScenePallette(imageUrl=image_url, colors=hex_colors)
 
+@app.get("/Scene/image/{image_hash}", include_in_schema=False)
+async def get_scene_image(image_hash: str, request: Request):
+    path = thumbnail_store.get_path(image_hash)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Image not found.")
+
+    # The hash is the content, so the image never changes
+    headers = {"ETag": f'"{image_hash}"', "Cache-Control": "public, max-age=31536000, immutable"}
+    if request.headers.get("If-None-Match") in (f'"{image_hash}"', f'W/"{image_hash}"', "*"):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=thumbnail_store.media_type, headers=headers)
+
+@app.get("/metrics/scene-writer", include_in_schema=False)
+async def get_scene_writer_metrics():
+    return scene_writer.get_statistics()
+
+@app.get("/metrics/thumbnails", include_in_schema=False)
+async def get_thumbnail_metrics():
+    return thumbnail_store.get_statistics()
+
+@app.get("/metrics", include_in_schema=False, response_class=PlainTextResponse)
+async def get_metrics():
+    requests_coalesced.set(single_flight.exact_duplicates, kind="exact")
+    requests_coalesced.set(single_flight.near_duplicates, kind="near")
+    for name, cache in (("prompt", prompt_cache), ("embedding", embedding_cache)):
+        memory_cache_lookups.set(cache.hits, cache=name, result="hit")
+        memory_cache_lookups.set(cache.misses, cache=name, result="miss")
+        memory_cache_entries.set(len(cache), cache=name)
+
+    return render([
+        scene_cache_lookups, scene_cache_match_distance, embedding_seconds, search_seconds, generation_seconds,
+        requests_coalesced, memory_cache_lookups, memory_cache_entries
+    ])
+
+@app.get("/metrics/single-flight", include_in_schema=False)
+async def get_single_flight_metrics():
+    return single_flight.get_statistics()
+
+@app.get("/metrics/scene-cache", include_in_schema=False)
+async def get_scene_cache_metrics():
+    return {
+        "prompt": prompt_cache.get_statistics(),
+        "embedding": embedding_cache.get_statistics(),
+    }
+
 @app.get("/health")
 async def health_check():
     return {"status": "up"}
@@ -0,0 +1,53 @@
+"""Compares the NumPy palette extractor with ColorThief on 256x256 and 1024x1024 images.
+
+Run from PluginServices/SceneService-Python with:
+    python -m benchmarks.palette_benchmark
+
+The images are synthetic (smooth color fields with noise, like a generated background) and
+seeded, so runs are comparable. Besides the timings, the mean distance from each ColorThief
+color to the nearest NumPy color shows how close the two palettes are (0-441, lower is closer).
+"""
+import argparse
+import io
+import statistics
+import time
+import numpy as np
+from PIL import Image
+from palette import get_top_colors
+
+def create_image(size: int, seed: int) -> bytes:
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:size, 0:size] / size
+    channels = [np.sin(x * rng.uniform(1, 6) + y * rng.uniform(1, 6) + rng.uniform(0, 6)) for _ in range(3)]
+    pixels = (np.stack(channels, axis=-1) * 100 + 128 + rng.normal(0, 12, (size, size, 3))).clip(0, 255).astype(np.uint8)
+    output = io.BytesIO()
+    Image.fromarray(pixels).save(output, "PNG")
+    return output.getvalue()
+
+def to_rgb(hex_colors):
+    return np.array([[int(color[i:i + 2], 16) for i in (1, 3, 5)] for color in hex_colors], dtype=float)
+
+def measure(image_bytes: bytes, engine: str, repeats: int):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        colors = get_top_colors(image_bytes, 5, engine=engine)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), colors
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'image':>10}{'colorthief (ms)':>18}{'numpy (ms)':>12}{'speed-up':>10}{'distance':>10}")
+    for size in (256, 1024):
+        image_bytes = create_image(size, args.seed)
+        colorthief_ms, colorthief_colors = measure(image_bytes, "colorthief", args.repeats)
+        numpy_ms, numpy_colors = measure(image_bytes, "numpy", args.repeats)
+        distances = np.linalg.norm(to_rgb(colorthief_colors)[:, None] - to_rgb(numpy_colors)[None], axis=-1).min(axis=1)
+        print(f"{f'{size}x{size}':>10}{colorthief_ms:>18.1f}{numpy_ms:>12.1f}{colorthief_ms / numpy_ms:>9.1f}x{distances.mean():>10.1f}")
+
+if __name__ == "__main__":
+    main()
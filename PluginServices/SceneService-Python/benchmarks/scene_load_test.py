@@ -0,0 +1,65 @@
+"""Measures /Scene throughput and latency as the number of concurrent requests grows.
+
+Start the service (uvicorn app:app --port 5004) and run from PluginServices/SceneService-Python with:
+    python -m benchmarks.scene_load_test --url http://localhost:5004
+
+By default every request asks for a new scene, so each one misses the cache and exercises the
+whole pipeline (embedding, image generation, download, palette extraction and the Weaviate
+insert); pass --repeat to send the same scene every time and measure cache hits instead.
+If the service doesn't block its event loop, throughput grows with concurrency until the
+remote APIs or the pools are saturated.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+import httpx
+
+async def run_level(client: httpx.AsyncClient, url: str, concurrency: int, requests: int, repeat: bool) -> dict:
+    queue: asyncio.Queue = asyncio.Queue()
+    for index in range(requests):
+        queue.put_nowait(index)
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            queue.get_nowait()
+            description = "neon rooftop party" if repeat else f"neon rooftop party {uuid.uuid4().hex[:8]}"
+            start = time.perf_counter()
+            try:
+                response = await client.post(f"{url}/Scene", json={"threeWordDescription": description, "recommendedColors": "pink, cyan, purple"})
+                response.raise_for_status()
+                latencies.append((time.perf_counter() - start) * 1000)
+            except httpx.HTTPError:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) if latencies else 0.0,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0,
+        "errors": errors,
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="http://localhost:5004")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--requests-per-worker", type=int, default=4)
+    parser.add_argument("--repeat", action="store_true")
+    args = parser.parse_args()
+
+    async with httpx.AsyncClient(timeout=httpx.Timeout(300.0), limits=httpx.Limits(max_connections=max(args.concurrency))) as client:
+        print(f"{'concurrency':>12}{'req/s':>10}{'p50 (ms)':>12}{'p95 (ms)':>12}{'errors':>8}")
+        for concurrency in args.concurrency:
+            result = await run_level(client, args.url, concurrency, concurrency * args.requests_per_worker, args.repeat)
+            print(f"{concurrency:>12}{result['throughput']:>10.2f}{result['p50']:>12.0f}{result['p95']:>12.0f}{result['errors']:>8}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+"""Compares recall and search latency of the embedded (memory-mapped) scene store and Weaviate.
+
+Run from PluginServices/SceneService-Python with:
+    python -m benchmarks.scene_store_benchmark --scenes 5000
+    python -m benchmarks.scene_store_benchmark --scenes 5000 --weaviate-url http://localhost:8080
+
+Both stores get the same seeded random scenes, in a temporary directory and a temporary
+Weaviate class (deleted afterwards). Each query is a stored embedding with noise added, so
+recall@1 is the share of queries that find the scene they came from; the exact brute-force
+answer is the reference.
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from scene_store import MemoryMappedSceneStore, SceneStore, WeaviateSceneStore, create_weaviate_client
+
+BENCHMARK_CLASS = "SceneStoreBenchmark"
+
+async def measure(store: SceneStore, queries: np.ndarray, expected: np.ndarray) -> dict:
+    latencies = []
+    found = 0
+    for query, scene in zip(queries, expected):
+        start = time.perf_counter()
+        matches = await store.search(query, 1)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found += bool(matches) and matches[0].text == f"scene {scene}"
+    latencies.sort()
+    return {
+        "recall": found / len(queries),
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scenes", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--noise", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--weaviate-url", default=None)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    embeddings = rng.normal(size=(args.scenes, args.dimension)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    expected = rng.integers(0, args.scenes, args.queries)
+    queries = embeddings[expected] + rng.normal(scale=args.noise, size=(args.queries, args.dimension)).astype(np.float32)
+    # The exact answers, in case the noise moved a query closer to another scene
+    expected = np.argmax(embeddings @ (queries / np.linalg.norm(queries, axis=1, keepdims=True)).T, axis=0)
+
+    executor = ThreadPoolExecutor(max_workers=4)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        store = MemoryMappedSceneStore(directory, executor)
+        start = time.perf_counter()
+        for index, embedding in enumerate(embeddings):
+            store.add_sync(f"scene {index}", ["#000000"], None, embedding)
+        print(f"embedded: added {args.scenes} scenes in {time.perf_counter() - start:.1f} s")
+        results["embedded"] = await measure(store, queries, expected)
+
+    if args.weaviate_url:
+        client = create_weaviate_client([args.weaviate_url])
+        if client.schema.exists(BENCHMARK_CLASS):
+            client.schema.delete_class(BENCHMARK_CLASS)
+        client.schema.create_class({"class": BENCHMARK_CLASS, "vectorizer": "none", "vectorIndexConfig": {"distance": "cosine"}})
+        try:
+            start = time.perf_counter()
+            with client.batch as batch:
+                for index, embedding in enumerate(embeddings):
+                    batch.add_data_object({"sk_text": f"scene {index}", "sk_description": "[\"#000000\"]", "sk_additional_metadata": ""}, BENCHMARK_CLASS, vector=embedding)
+            print(f"weaviate: added {args.scenes} scenes in {time.perf_counter() - start:.1f} s")
+            results["weaviate"] = await measure(WeaviateSceneStore(client, executor, BENCHMARK_CLASS), queries, expected)
+        finally:
+            client.schema.delete_class(BENCHMARK_CLASS)
+
+    print(f"{'store':>10}{'recall@1':>10}{'p50 (ms)':>10}{'p95 (ms)':>10}")
+    for name, result in results.items():
+        print(f"{name:>10}{result['recall']:>10.3f}{result['p50']:>10.2f}{result['p95']:>10.2f}")
+    executor.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())
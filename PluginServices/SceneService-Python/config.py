@@ -10,8 +10,56 @@ class OpenAIConfig(BaseModel):
     org_id: Optional[str] = Field(None, alias="OrgId")
 
 class Weaviate(BaseModel):
-    endpoints: List[str] = Field(..., alias="Endpoints")
+    endpoints: List[str] = Field(["http://localhost:8080"], alias="Endpoints")
+
+class SceneServiceConfig(BaseModel):
+    # Threads for the scene store's blocking calls
+    io_workers: int = Field(8, alias="IoWorkers")
+    # Processes for palette extraction (defaults to one per CPU)
+    palette_workers: Optional[int] = Field(None, alias="PaletteWorkers")
+    # "numpy" for the vectorized median cut, or "colorthief"
+    palette_engine: str = Field("numpy", alias="PaletteEngine")
+    # Larger images are sampled down to about this many pixels per side before extracting the palette
+    palette_max_dimension: int = Field(256, alias="PaletteMaxDimension")
+    # Largest cosine distance between two prompts' embeddings for them to count as the same scene,
+    # both for cache hits and for coalescing concurrent requests
+    cache_distance_threshold: float = Field(0.05, alias="CacheDistanceThreshold")
+    # Nearest cached scenes retrieved per search
+    scene_search_top_k: int = Field(3, alias="SceneSearchTopK")
+    # Level one cache: normalized prompt to palette, persisted to PromptCachePath (if set) across restarts
+    prompt_cache_max_entries: int = Field(10000, alias="PromptCacheMaxEntries")
+    prompt_cache_ttl_seconds: float = Field(86400, alias="PromptCacheTtlSeconds")
+    prompt_cache_path: Optional[str] = Field(None, alias="PromptCachePath")
+    # Level two cache: normalized prompt to embedding
+    embedding_cache_max_entries: int = Field(10000, alias="EmbeddingCacheMaxEntries")
+    embedding_cache_ttl_seconds: float = Field(604800, alias="EmbeddingCacheTtlSeconds")
+    # Where generated scenes are cached: "weaviate", or "embedded" for a memory-mapped store in SceneCachePath
+    scene_cache_backend: str = Field("weaviate", alias="SceneCacheBackend")
+    scene_cache_path: str = Field("scene-cache", alias="SceneCachePath")
+    # Connection pool of the HTTP client shared by the OpenAI and image download calls
+    http_max_connections: int = Field(50, alias="HttpMaxConnections")
+    http_max_keepalive_connections: int = Field(20, alias="HttpMaxKeepaliveConnections")
+    http_keepalive_expiry_seconds: float = Field(60, alias="HttpKeepaliveExpirySeconds")
+    embedding_timeout_seconds: float = Field(30, alias="EmbeddingTimeoutSeconds")
+    image_generation_timeout_seconds: float = Field(120, alias="ImageGenerationTimeoutSeconds")
+    image_download_timeout_seconds: float = Field(30, alias="ImageDownloadTimeoutSeconds")
+    # Generated images larger than this are rejected rather than buffered
+    image_download_max_bytes: int = Field(10 * 1024 * 1024, alias="ImageDownloadMaxBytes")
+    # Downscaled copies of the generated images, served from /Scene/image/{hash} instead of the expiring remote URLs
+    thumbnail_path: str = Field("scene-images", alias="ThumbnailPath")
+    thumbnail_max_bytes: int = Field(256 * 1024 * 1024, alias="ThumbnailMaxBytes")
+    thumbnail_max_dimension: int = Field(256, alias="ThumbnailMaxDimension")
+    thumbnail_quality: int = Field(80, alias="ThumbnailQuality")
+    # Base of the image URLs handed out (e.g. behind a proxy); defaults to the URL the request came in on
+    public_base_url: Optional[str] = Field(None, alias="PublicBaseUrl")
+    # New scenes are added to the scene cache in the background, in batches
+    scene_write_queue_size: int = Field(1000, alias="SceneWriteQueueSize")
+    scene_write_batch_size: int = Field(50, alias="SceneWriteBatchSize")
+    scene_write_flush_interval_seconds: float = Field(1.0, alias="SceneWriteFlushIntervalSeconds")
+    scene_write_max_retries: int = Field(4, alias="SceneWriteMaxRetries")
+    scene_write_retry_backoff_seconds: float = Field(0.5, alias="SceneWriteRetryBackoffSeconds")
 
 class Config(BaseModel):
     openai: OpenAIConfig = Field(..., alias="OpenAI")
-    weaviate: Weaviate = Field(..., alias="Weaviate")
\ No newline at end of file
+    weaviate: Weaviate = Field(default_factory=Weaviate, alias="Weaviate")
+    scene_service: SceneServiceConfig = Field(default_factory=SceneServiceConfig, alias="SceneService")
\ No newline at end of file
@@ -0,0 +1,22 @@
+import importlib.util
+import httpx
+from config import SceneServiceConfig
+
+def create_http_client(settings: SceneServiceConfig) -> httpx.AsyncClient:
+    """Create the client shared by every outbound call, so connections to the OpenAI API and the image CDN are reused."""
+    return httpx.AsyncClient(
+        # HTTP/2 multiplexes concurrent calls over one connection, when the h2 package is installed
+        http2=importlib.util.find_spec("h2") is not None,
+        follow_redirects=True,
+        limits=httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry_seconds
+        ),
+        timeout=httpx.Timeout(
+            connect=5.0,  # seconds to wait for a connection to be established
+            read=30.0,    # seconds to wait for data to be read
+            write=10.0,   # seconds to wait for data to be written
+            pool=10.0     # seconds to wait for a connection to become available from the pool
+        )
+    )
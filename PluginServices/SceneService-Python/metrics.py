@@ -0,0 +1,82 @@
+import bisect
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+
+# A minimal Prometheus text-format registry, so the service needs no metrics client
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_number(value: float) -> str:
+    return "+Inf" if value == float("inf") else f"{value:g}"
+
+class Counter:
+    def __init__(self, name: str, description: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels[name] for name in self.label_names)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, value: float, **labels):
+        # For totals counted elsewhere (the caches and single-flight keep their own), mirrored at scrape time
+        self._values[tuple(labels[name] for name in self.label_names)] = value
+
+    def get(self, **labels) -> float:
+        return self._values.get(tuple(labels[name] for name in self.label_names), 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_number(value)}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, description: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self._counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self._counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        cumulative = 0
+        for bucket, count in zip(self.buckets, self._counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{_format_number(bucket)}"}} {cumulative}')
+        lines.append(f"{self.name}_sum {self.sum:g}")
+        lines.append(f"{self.name}_count {self.count}")
+        return lines
+
+class Gauge(Counter):
+    def render(self) -> List[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+def render(metrics) -> str:
+    return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
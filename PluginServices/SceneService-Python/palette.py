@@ -0,0 +1,119 @@
+import heapq
+import io
+from typing import List
+import numpy as np
+from PIL import Image
+
+# Runs in the palette process pool, so keep this module free of the app's clients and configuration
+
+# Bits kept per channel when bucketing colors, as in ColorThief's modified median cut
+SIGBITS = 5
+# Share of the boxes split by population before splitting by population times volume
+FRACT_BY_POPULATIONS = 0.75
+
+def get_top_colors(image_bytes: bytes, color_count: int, engine: str = "numpy", max_dimension: int = 256) -> List[str]:
+    if engine == "colorthief":
+        return get_top_colors_colorthief(image_bytes, color_count)
+    palette = extract_palette(decode_image(image_bytes, max_dimension), color_count)
+    return [f'#{r:02x}{g:02x}{b:02x}' for r, g, b in palette]
+
+def get_top_colors_colorthief(image_bytes: bytes, color_count: int) -> List[str]:
+    from colorthief import ColorThief
+    color_thief = ColorThief(io.BytesIO(image_bytes))
+    palette = color_thief.get_palette(color_count=color_count)
+    return [f'#{r:02x}{g:02x}{b:02x}' for r, g, b in palette]
+
+def decode_image(image_bytes: bytes, max_dimension: int = 256) -> np.ndarray:
+    """Decode an image into an (n, 3) uint8 array of the pixels worth counting.
+
+    Images larger than max_dimension are sampled with a stride instead of resized, so the
+    palette is built from real pixel colors. Like ColorThief, mostly transparent and
+    near-white pixels are left out.
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    if max_dimension:
+        # Lets JPEG decode at a reduced scale; a no-op for other formats
+        image.draft("RGB", (max_dimension, max_dimension))
+    pixels = np.asarray(image.convert("RGBA"))
+
+    if max_dimension:
+        stride = max(1, -(-max(pixels.shape[:2]) // max_dimension))
+        pixels = pixels[::stride, ::stride]
+    pixels = pixels.reshape(-1, 4)
+    keep = (pixels[:, 3] >= 125) & ~np.all(pixels[:, :3] > 250, axis=1)
+    return pixels[keep, :3]
+
+def extract_palette(pixels: np.ndarray, color_count: int) -> List[tuple]:
+    """Return up to color_count dominant colors of the pixels, most common first.
+
+    A vectorized version of ColorThief's modified median cut: the pixels are bucketed into a
+    32x32x32 histogram once, and the boxes of buckets are split at the weighted median of
+    their widest channel, first by population and then by population times volume. Each
+    color is the mean of the real pixels in its box. The result only depends on the pixels.
+    """
+    if len(pixels) == 0 or color_count < 1:
+        return []
+
+    shift = 8 - SIGBITS
+    quantized = (pixels >> shift).astype(np.int32)
+    index = (quantized[:, 0] << (2 * SIGBITS)) | (quantized[:, 1] << SIGBITS) | quantized[:, 2]
+    buckets = 1 << (3 * SIGBITS)
+    counts = np.bincount(index, minlength=buckets)
+    sums = np.stack([np.bincount(index, weights=pixels[:, channel], minlength=buckets) for channel in range(3)], axis=1)
+
+    # Work on the occupied buckets only: their histogram coordinates, pixel counts and channel sums
+    occupied = np.flatnonzero(counts)
+    coordinates = np.stack([occupied >> (2 * SIGBITS), (occupied >> SIGBITS) & ((1 << SIGBITS) - 1), occupied & ((1 << SIGBITS) - 1)], axis=1)
+    counts = counts[occupied]
+    sums = sums[occupied]
+
+    boxes = [np.arange(len(occupied))]
+    boxes = _split_boxes(boxes, coordinates, counts, -(-color_count * 3 // 4) if color_count > 1 else 1, by_volume=False)
+    boxes = _split_boxes(boxes, coordinates, counts, color_count, by_volume=True)
+
+    boxes.sort(key=lambda box: -counts[box].sum())
+    palette = []
+    for box in boxes:
+        mean = sums[box].sum(axis=0) / counts[box].sum()
+        palette.append(tuple(int(round(value)) for value in mean))
+    return palette
+
+def _priority(box: np.ndarray, coordinates: np.ndarray, counts: np.ndarray, by_volume: bool) -> float:
+    population = float(counts[box].sum())
+    if not by_volume:
+        return population
+    box_coordinates = coordinates[box]
+    volume = float(np.prod(box_coordinates.max(axis=0) - box_coordinates.min(axis=0) + 1))
+    return population * volume
+
+def _split_boxes(boxes: List[np.ndarray], coordinates: np.ndarray, counts: np.ndarray, target: int, by_volume: bool) -> List[np.ndarray]:
+    # Max-heap of boxes; the sequence number breaks ties so the order is deterministic
+    heap = [(-_priority(box, coordinates, counts, by_volume), sequence, box) for sequence, box in enumerate(boxes)]
+    heapq.heapify(heap)
+    sequence = len(heap)
+    done = []
+    while heap and len(heap) + len(done) < target:
+        _, _, box = heapq.heappop(heap)
+        halves = _median_cut(box, coordinates, counts)
+        if halves is None:
+            done.append(box)
+            continue
+        for half in halves:
+            heapq.heappush(heap, (-_priority(half, coordinates, counts, by_volume), sequence, half))
+            sequence += 1
+    return done + [box for _, _, box in heap]
+
+def _median_cut(box: np.ndarray, coordinates: np.ndarray, counts: np.ndarray):
+    box_coordinates = coordinates[box]
+    ranges = box_coordinates.max(axis=0) - box_coordinates.min(axis=0)
+    channel = int(np.argmax(ranges))
+    if ranges[channel] == 0:
+        return None
+
+    values = box_coordinates[:, channel]
+    order = np.argsort(values, kind="stable")
+    cumulative = np.cumsum(counts[box][order])
+    median = values[order][np.searchsorted(cumulative, cumulative[-1] / 2)]
+    # Keep the median bucket on the side that leaves both halves non-empty
+    lower = values <= median if median < values.max() else values < median
+    return box[lower], box[~lower]
@@ -0,0 +1,99 @@
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Generic, Optional, TypeVar
+import numpy as np
+
+T = TypeVar("T")
+
+class LruCache(Generic[T]):
+    """In-process LRU cache with a size limit and a time to live, counting its hits and misses."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # Keys map to (value, wall-clock expiry), so entries can be persisted and reloaded
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[T]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: T, expires_at: Optional[float] = None):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (value, expires_at if expires_at is not None else time.time() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_statistics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+class PromptCache(LruCache[dict]):
+    """Level one: normalized prompt to palette, optionally persisted to a JSON file across restarts."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float, path: Optional[str] = None):
+        super().__init__(max_entries, ttl_seconds)
+        self.path = path
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path) as file:
+            entries = json.load(file)
+        now = time.time()
+        # The file is written least recently used first, so reinserting keeps the order
+        for key, value, expires_at in entries:
+            if expires_at > now:
+                self.set(key, value, expires_at)
+
+    def save(self):
+        if not self.path:
+            return
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump([[key, value, expires_at] for key, (value, expires_at) in self._entries.items()], file)
+        os.replace(temporary_path, self.path)
+
+class EmbeddingCache(LruCache[np.ndarray]):
+    """Level two: normalized prompt to embedding, kept as compact float32 vectors."""
+
+    def set(self, key: str, value: Any, expires_at: Optional[float] = None):
+        super().set(key, np.asarray(value, dtype=np.float32).reshape(-1), expires_at)
+
+    def get_statistics(self) -> dict:
+        return {
+            **super().get_statistics(),
+            "bytes": sum(value.nbytes for value, _ in self._entries.values()),
+        }
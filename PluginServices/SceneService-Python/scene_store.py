@@ -0,0 +1,216 @@
+import asyncio
+import json
+import os
+import threading
+import uuid
+from dataclasses import dataclass, field
+from functools import partial
+from typing import List, Optional
+import numpy as np
+
+@dataclass
+class SceneMatch:
+    text: str
+    colors: List[str]
+    image_url: Optional[str]
+    # Cosine distance to the query (0 is identical)
+    distance: Optional[float]
+
+@dataclass
+class SceneRecord:
+    text: str
+    colors: List[str]
+    image_url: Optional[str]
+    embedding: np.ndarray
+    # Fixed when the scene is created, so retrying a write replaces the scene instead of duplicating it
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+
+class SceneStore:
+    """Where generated scenes are cached, searched by the embedding of their prompt."""
+
+    async def search(self, embedding: np.ndarray, limit: int = 1) -> List[SceneMatch]:
+        raise NotImplementedError
+
+    async def add_many(self, scenes: List[SceneRecord]):
+        raise NotImplementedError
+
+    async def add(self, text: str, colors: List[str], image_url: Optional[str], embedding: np.ndarray):
+        await self.add_many([SceneRecord(text, colors, image_url, embedding)])
+
+def create_weaviate_client(endpoints: List[str]):
+    from weaviate import Client as WeaviateClient
+
+    # Try to connect to Weaviate with the provided endpoints until one works
+    error = None
+    for endpoint in endpoints:
+        try:
+            return WeaviateClient(url=endpoint)
+        except Exception as e:
+            error = e
+    raise error or ValueError("No Weaviate endpoints are configured.")
+
+class WeaviateSceneStore(SceneStore):
+    """Scenes in a Weaviate class, with the properties Semantic Kernel's Weaviate memory store uses."""
+
+    def __init__(self, client, executor, class_name: str = "scene"):
+        self.client = client
+        self.executor = executor
+        self.class_name = class_name
+
+    async def search(self, embedding: np.ndarray, limit: int = 1) -> List[SceneMatch]:
+        query = (
+            self.client.query.get(self.class_name, ["sk_text", "sk_description", "sk_additional_metadata"])
+            .with_near_vector({'vector': embedding})
+            .with_additional(["distance"])
+            .with_limit(limit)
+        )
+        result = await self._run(query.do)
+        if "errors" in result:
+            raise RuntimeError(result["errors"])
+        return [
+            SceneMatch(
+                text=scene["sk_text"],
+                colors=json.loads(scene["sk_description"]),
+                image_url=scene["sk_additional_metadata"],
+                distance=(scene.get("_additional") or {}).get("distance")
+            )
+            for scene in result['data']['Get'][self.class_name[0].upper() + self.class_name[1:]] or []
+        ]
+
+    async def add_many(self, scenes: List[SceneRecord]):
+        await self._run(self._create_objects, scenes)
+
+    def _create_objects(self, scenes: List[SceneRecord]):
+        # One request through the batch API; objects left over from a failed attempt are dropped first
+        batch = self.client.batch
+        batch.empty_objects()
+        for scene in scenes:
+            batch.add_data_object({
+                "sk_additional_metadata": scene.image_url,
+                "sk_description": json.dumps(scene.colors),
+                "sk_text": scene.text,
+            }, self.class_name, uuid=scene.id, vector=scene.embedding)
+        results = batch.create_objects()
+
+        errors = [result["result"]["errors"] for result in results if (result.get("result") or {}).get("errors")]
+        if errors:
+            raise RuntimeError(f"Weaviate rejected {len(errors)} of {len(scenes)} scenes: {errors[0]}")
+
+    async def _run(self, function, *args, **kwargs):
+        # The Weaviate client is synchronous, so keep it off the event loop
+        return await asyncio.get_running_loop().run_in_executor(self.executor, partial(function, *args, **kwargs))
+
+class MemoryMappedSceneStore(SceneStore):
+    """Scenes stored next to the service, searched in-process.
+
+    The embeddings are rows of a float32 matrix in embeddings.f32, normalized when they're
+    written so a search is one matrix-vector product over the memory-mapped file; the colors,
+    text and image URL of each row are a line of scenes.jsonl. Adding a scene appends to both
+    files, so nothing is rewritten, and a row only counts once both writes are there. An exact
+    search over thousands of scenes takes a few milliseconds, so there is no ANN index.
+    """
+
+    def __init__(self, path: str, executor=None):
+        self.path = path
+        self.executor = executor
+        os.makedirs(path, exist_ok=True)
+        self._embeddings_path = os.path.join(path, "embeddings.f32")
+        self._scenes_path = os.path.join(path, "scenes.jsonl")
+        self._metadata_path = os.path.join(path, "metadata.json")
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.ndarray] = None
+        self._scenes: List[dict] = []
+        self._dimension: Optional[int] = None
+
+        if os.path.exists(self._metadata_path):
+            with open(self._metadata_path) as file:
+                self._dimension = json.load(file)["dimension"]
+            self._load()
+
+    @property
+    def count(self) -> int:
+        return len(self._scenes)
+
+    async def search(self, embedding: np.ndarray, limit: int = 1) -> List[SceneMatch]:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.search_sync, embedding, limit)
+
+    async def add_many(self, scenes: List[SceneRecord]):
+        await asyncio.get_running_loop().run_in_executor(self.executor, self.add_many_sync, scenes)
+
+    def search_sync(self, embedding: np.ndarray, limit: int = 1) -> List[SceneMatch]:
+        with self._lock:
+            if self._matrix is None and self._scenes:
+                self._matrix = np.memmap(self._embeddings_path, dtype=np.float32, mode="r", shape=(len(self._scenes), self._dimension))
+            # Scenes are only ever appended, so the rows of this matrix stay valid indexes into the list
+            matrix, scenes = self._matrix, self._scenes
+        if matrix is None:
+            return []
+        query = self._normalize(embedding)
+        if query.shape[0] != matrix.shape[1]:
+            raise ValueError(f"Expected an embedding of {matrix.shape[1]} dimensions, got {query.shape[0]}.")
+
+        distances = 1.0 - matrix @ query
+        limit = min(limit, len(distances))
+        nearest = np.argpartition(distances, limit - 1)[:limit]
+        nearest = nearest[np.argsort(distances[nearest], kind="stable")]
+        return [
+            SceneMatch(text=scenes[row]["text"], colors=scenes[row]["colors"], image_url=scenes[row]["imageUrl"], distance=float(distances[row]))
+            for row in nearest
+        ]
+
+    def add_sync(self, text: str, colors: List[str], image_url: Optional[str], embedding: np.ndarray):
+        self.add_many_sync([SceneRecord(text, colors, image_url, embedding)])
+
+    def add_many_sync(self, scenes: List[SceneRecord]):
+        if not scenes:
+            return
+        vectors = np.stack([self._normalize(scene.embedding) for scene in scenes])
+        with self._lock:
+            if self._dimension is None:
+                self._dimension = vectors.shape[1]
+                with open(self._metadata_path, "w") as file:
+                    json.dump({"dimension": self._dimension}, file)
+            elif vectors.shape[1] != self._dimension:
+                raise ValueError(f"Expected embeddings of {self._dimension} dimensions, got {vectors.shape[1]}.")
+
+            lines = [{"text": scene.text, "colors": scene.colors, "imageUrl": scene.image_url} for scene in scenes]
+            # The embeddings go first; their metadata lines are what make the rows count. If either write
+            # fails, both files are cut back so a retry appends aligned rows
+            sizes = [(path, os.path.getsize(path) if os.path.exists(path) else 0) for path in (self._embeddings_path, self._scenes_path)]
+            try:
+                with open(self._embeddings_path, "ab") as file:
+                    file.write(vectors.tobytes())
+                with open(self._scenes_path, "a") as file:
+                    file.write("".join(json.dumps(line) + "\n" for line in lines))
+            except BaseException:
+                for path, size in sizes:
+                    if os.path.exists(path) and os.path.getsize(path) != size:
+                        with open(path, "r+b") as file:
+                            file.truncate(size)
+                raise
+            self._scenes.extend(lines)
+            self._matrix = None
+
+    def _load(self):
+        row_bytes = 4 * self._dimension
+        rows = os.path.getsize(self._embeddings_path) // row_bytes if os.path.exists(self._embeddings_path) else 0
+        valid_bytes = 0
+        if os.path.exists(self._scenes_path):
+            with open(self._scenes_path, "rb") as file:
+                for line in file:
+                    if len(self._scenes) == rows or not line.endswith(b"\n"):
+                        break
+                    self._scenes.append(json.loads(line))
+                    valid_bytes += len(line)
+
+        # Cut off what a crash left half written, so appends stay aligned to rows and lines
+        for path, size in ((self._embeddings_path, len(self._scenes) * row_bytes), (self._scenes_path, valid_bytes)):
+            if os.path.exists(path) and os.path.getsize(path) != size:
+                with open(path, "r+b") as file:
+                    file.truncate(size)
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
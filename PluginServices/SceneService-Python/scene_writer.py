@@ -0,0 +1,118 @@
+import asyncio
+import logging
+from typing import List, Optional
+import numpy as np
+from scene_store import SceneMatch, SceneRecord, SceneStore
+
+logger = logging.getLogger(__name__)
+
+class SceneWriter:
+    """Adds new scenes to the scene store in the background, so /Scene doesn't wait on the write.
+
+    Scenes are put on a bounded queue that a background writer flushes in batches of up to
+    batch_size, or whatever arrived within flush_interval_seconds of the first one, through
+    the store's batch path. A failed batch is retried max_retries times with exponential
+    backoff. Scenes waiting to be written can still be found with find_pending, and stop()
+    flushes everything still queued.
+    """
+
+    def __init__(self, max_queue_size: int = 1000, batch_size: int = 50, flush_interval_seconds: float = 1.0, max_retries: int = 4, retry_backoff_seconds: float = 0.5):
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.scenes_written = 0
+        self.scenes_failed = 0
+        self.batches_written = 0
+        self.retries = 0
+        self._store: Optional[SceneStore] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._pending: List[SceneRecord] = []
+
+    def start(self, store: SceneStore):
+        self._store = store
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._writer_task = asyncio.create_task(self._write_behind_loop())
+
+    async def stop(self):
+        """Flush every queued scene and stop the background writer."""
+        if self._writer_task:
+            await self._queue.join()
+            self._writer_task.cancel()
+            try:
+                await self._writer_task
+            except asyncio.CancelledError:
+                pass
+            self._writer_task = None
+
+    async def write(self, scene: SceneRecord):
+        """Hand off a scene to be added to the store; returns once it is accepted, not written."""
+        self._pending.append(scene)
+        await self._queue.put(scene)
+
+    def find_pending(self, embedding: np.ndarray, distance_threshold: float) -> Optional[SceneMatch]:
+        """Return the nearest scene not yet written, if it is within distance_threshold (cosine distance)."""
+        if not self._pending:
+            return None
+        vectors = np.stack([np.asarray(scene.embedding, dtype=np.float32).reshape(-1) for scene in self._pending])
+        query = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        similarities = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query) + 1e-12)
+        nearest = int(np.argmax(similarities))
+        distance = float(1.0 - similarities[nearest])
+        if distance > distance_threshold:
+            return None
+        scene = self._pending[nearest]
+        return SceneMatch(text=scene.text, colors=scene.colors, image_url=scene.image_url, distance=distance)
+
+    def get_statistics(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "pending": len(self._pending),
+            "max_queue_size": self.max_queue_size,
+            "scenes_written": self.scenes_written,
+            "scenes_failed": self.scenes_failed,
+            "batches_written": self.batches_written,
+            "retries": self.retries,
+        }
+
+    async def _write_behind_loop(self):
+        while True:
+            batch = [await self._queue.get()]
+
+            # Give other requests a moment to add to the batch before flushing it
+            deadline = asyncio.get_running_loop().time() + self.flush_interval_seconds
+            while len(batch) < self.batch_size:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._insert(batch)
+            finally:
+                written_ids = {scene.id for scene in batch}
+                self._pending = [scene for scene in self._pending if scene.id not in written_ids]
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _insert(self, scenes: List[SceneRecord]):
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self._store.add_many(scenes)
+                self.scenes_written += len(scenes)
+                self.batches_written += 1
+                return
+            except Exception:
+                if attempt == self.max_retries:
+                    self.scenes_failed += len(scenes)
+                    logger.exception("Failed to add %d scenes to the scene store after %d attempts", len(scenes), attempt + 1)
+                    return
+                self.retries += 1
+                delay = self.retry_backoff_seconds * 2 ** attempt
+                logger.warning("Failed to add %d scenes to the scene store; retrying in %g seconds", len(scenes), delay)
+                await asyncio.sleep(delay)
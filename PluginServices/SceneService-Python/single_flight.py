@@ -0,0 +1,114 @@
+import asyncio
+import re
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import numpy as np
+
+def normalize_prompt(prompt: str) -> str:
+    # Case, punctuation and spacing don't change the scene
+    return " ".join(re.sub(r"[^\w\s#]", " ", prompt.lower()).split())
+
+@dataclass
+class _Flight:
+    future: asyncio.Future
+    # Requests awaiting the result; the work is only cancelled once none are left
+    waiters: int = 0
+    task: Optional[asyncio.Task] = None
+
+class SceneSingleFlight:
+    """Coalesces concurrent requests for the same scene so only the first one does the work.
+
+    A request whose normalized prompt is already in flight waits for that request's result.
+    Otherwise it embeds its prompt, and if the embedding is within distance_threshold (cosine
+    distance) of one being worked on, it waits for that one instead. Errors are shared with
+    the waiting requests too. The work runs in a task of its own, so a request that is
+    cancelled (a client disconnecting) only stops it when no other request is waiting for it.
+    """
+
+    def __init__(self, distance_threshold: float):
+        self.distance_threshold = distance_threshold
+        self._by_prompt: Dict[str, _Flight] = {}
+        self._by_embedding: List[Tuple[np.ndarray, _Flight]] = []
+        self.requests = 0
+        self.leaders = 0
+        self.exact_duplicates = 0
+        self.near_duplicates = 0
+
+    async def run(self, prompt: str, embed: Callable[[], Awaitable[Any]], work: Callable[[Any], Awaitable[Any]]) -> Any:
+        self.requests += 1
+        key = normalize_prompt(prompt)
+        flight = self._by_prompt.get(key)
+        if flight is not None:
+            self.exact_duplicates += 1
+        else:
+            flight = _Flight(future=asyncio.get_running_loop().create_future())
+            # Nobody may be waiting, so mark the error as retrieved
+            flight.future.add_done_callback(lambda done: done.cancelled() or done.exception())
+            self._by_prompt[key] = flight
+            flight.task = asyncio.create_task(self._lead(flight, embed, work))
+            flight.task.add_done_callback(lambda _: self._finish(key, flight))
+        return await self._wait(flight)
+
+    async def _wait(self, flight: _Flight) -> Any:
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.future)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.future.done():
+                flight.task.cancel()
+
+    async def _lead(self, flight: _Flight, embed: Callable[[], Awaitable[Any]], work: Callable[[Any], Awaitable[Any]]):
+        try:
+            embedding = await embed()
+            vector = self._to_unit_vector(embedding)
+            leader = self._find_near_duplicate(vector)
+            if leader is not None:
+                self.near_duplicates += 1
+                result = await self._wait(leader)
+            else:
+                self.leaders += 1
+                entry = (vector, flight)
+                if vector is not None:
+                    self._by_embedding.append(entry)
+                try:
+                    result = await work(embedding)
+                finally:
+                    # Compare by identity; comparing tuples would compare the arrays
+                    self._by_embedding = [other for other in self._by_embedding if other is not entry]
+            flight.future.set_result(result)
+        except Exception as e:
+            flight.future.set_exception(e)
+
+    def _finish(self, key: str, flight: _Flight):
+        # Also runs for work cancelled before it started, so nobody is left waiting on its future
+        if not flight.future.done():
+            flight.future.cancel()
+        if self._by_prompt.get(key) is flight:
+            del self._by_prompt[key]
+
+    def get_statistics(self) -> dict:
+        suppressed = self.exact_duplicates + self.near_duplicates
+        return {
+            "requests": self.requests,
+            "in_flight": len(self._by_prompt),
+            "leaders": self.leaders,
+            "exact_duplicates": self.exact_duplicates,
+            "near_duplicates": self.near_duplicates,
+            "suppressed": suppressed,
+            "suppressed_rate": suppressed / self.requests if self.requests else 0.0,
+        }
+
+    def _find_near_duplicate(self, vector: Optional[np.ndarray]) -> Optional[_Flight]:
+        if vector is None or not self._by_embedding:
+            return None
+        vectors = np.stack([other for other, _ in self._by_embedding])
+        distances = 1.0 - vectors @ vector
+        nearest = int(np.argmin(distances))
+        return self._by_embedding[nearest][1] if distances[nearest] <= self.distance_threshold else None
+
+    @staticmethod
+    def _to_unit_vector(embedding) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
@@ -0,0 +1,9 @@
+"""Unit tests for the Scene service's self-contained modules.
+
+Run from PluginServices/SceneService-Python with: python -m pytest tests
+"""
+import os
+import sys
+
+# The service's modules are imported as top-level modules, as app.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,72 @@
+import io
+import numpy as np
+import pytest
+from PIL import Image
+from palette import decode_image, extract_palette, get_top_colors
+
+def encode_png(pixels: np.ndarray) -> bytes:
+    output = io.BytesIO()
+    Image.fromarray(pixels).save(output, "PNG")
+    return output.getvalue()
+
+def striped_image() -> np.ndarray:
+    # Half red, 30% green and 20% blue, in horizontal stripes
+    pixels = np.zeros((100, 40, 3), dtype=np.uint8)
+    pixels[:50] = (200, 30, 30)
+    pixels[50:80] = (30, 180, 40)
+    pixels[80:] = (20, 40, 210)
+    return pixels
+
+def test_extract_palette_orders_colors_by_population():
+    pixels = striped_image().reshape(-1, 3)
+
+    assert extract_palette(pixels, 3) == [(200, 30, 30), (30, 180, 40), (20, 40, 210)]
+
+def test_extract_palette_returns_fewer_colors_than_requested_for_few_distinct_colors():
+    pixels = np.array([(10, 20, 30)] * 10, dtype=np.uint8)
+
+    assert extract_palette(pixels, 5) == [(10, 20, 30)]
+
+def test_extract_palette_of_nothing_is_empty():
+    assert extract_palette(np.zeros((0, 3), dtype=np.uint8), 5) == []
+    assert extract_palette(striped_image().reshape(-1, 3), 0) == []
+
+def test_extract_palette_is_deterministic():
+    pixels = np.random.default_rng(0).integers(0, 256, (5000, 3), dtype=np.uint8)
+
+    palette = extract_palette(pixels, 5)
+
+    assert len(palette) == 5
+    assert palette == extract_palette(pixels.copy(), 5)
+
+def test_decode_image_skips_near_white_and_transparent_pixels():
+    pixels = np.zeros((2, 2, 4), dtype=np.uint8)
+    pixels[0, 0] = (255, 255, 255, 255)
+    pixels[0, 1] = (10, 10, 10, 0)
+    pixels[1, 0] = (10, 20, 30, 255)
+    pixels[1, 1] = (40, 50, 60, 200)
+
+    decoded = decode_image(encode_png(pixels))
+
+    assert decoded.tolist() == [[10, 20, 30], [40, 50, 60]]
+
+def test_decode_image_samples_large_images_down_to_max_dimension():
+    decoded = decode_image(encode_png(np.full((1000, 500, 3), 100, dtype=np.uint8)), max_dimension=100)
+
+    assert len(decoded) == 100 * 50
+
+def test_get_top_colors_formats_hex():
+    assert get_top_colors(encode_png(striped_image()), 3) == ["#c81e1e", "#1eb428", "#1428d2"]
+
+def test_numpy_engine_finds_the_colors_colorthief_finds():
+    pytest.importorskip("colorthief")
+    image_bytes = encode_png(striped_image())
+
+    # ColorThief orders by population times volume, averages bucket centers and may return an extra
+    # color, so only check that each of ours is close to one of its colors
+    def rgb(color):
+        return np.array([int(color[i:i + 2], 16) for i in (1, 3, 5)])
+    ours = [rgb(color) for color in get_top_colors(image_bytes, 3)]
+    theirs = [rgb(color) for color in get_top_colors(image_bytes, 3, engine="colorthief")]
+
+    assert all(min(np.abs(color - other).max() for other in theirs) <= 8 for color in ours)
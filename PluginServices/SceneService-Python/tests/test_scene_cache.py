@@ -0,0 +1,85 @@
+import json
+import time
+import numpy as np
+from scene_cache import EmbeddingCache, LruCache, PromptCache
+
+def test_lru_cache_evicts_the_least_recently_used_entry():
+    cache = LruCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+def test_lru_cache_expires_entries_after_their_ttl():
+    cache = LruCache(max_entries=10, ttl_seconds=60)
+    cache.set("a", 1, expires_at=time.time() - 1)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert cache.expirations == 1
+
+def test_lru_cache_counts_hits_and_misses():
+    cache = LruCache(max_entries=10, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("b")
+
+    statistics = cache.get_statistics()
+
+    assert (statistics["hits"], statistics["misses"], statistics["hit_rate"]) == (1, 1, 0.5)
+
+def test_lru_cache_with_no_entries_stores_nothing():
+    cache = LruCache(max_entries=0, ttl_seconds=60)
+    cache.set("a", 1)
+
+    assert cache.get("a") is None
+
+def test_prompt_cache_persists_entries_in_recency_order(tmp_path):
+    path = str(tmp_path / "prompts.json")
+    cache = PromptCache(max_entries=2, ttl_seconds=60, path=path)
+    cache.set("a", {"colors": ["#000000"]})
+    cache.set("b", {"colors": ["#ffffff"]})
+    cache.get("a")
+    cache.save()
+
+    reloaded = PromptCache(max_entries=2, ttl_seconds=60, path=path)
+    reloaded.load()
+    reloaded.set("c", {"colors": []})
+
+    # "b" was the least recently used when saved, so it is the one evicted after reloading
+    assert reloaded.get("b") is None
+    assert reloaded.get("a") == {"colors": ["#000000"]}
+
+def test_prompt_cache_skips_expired_entries_when_loading(tmp_path):
+    path = tmp_path / "prompts.json"
+    path.write_text(json.dumps([["old", {}, time.time() - 1], ["new", {}, time.time() + 60]]))
+
+    cache = PromptCache(max_entries=10, ttl_seconds=60, path=str(path))
+    cache.load()
+
+    assert cache.get("old") is None
+    assert cache.get("new") == {}
+
+def test_prompt_cache_without_a_path_is_in_memory_only(tmp_path):
+    cache = PromptCache(max_entries=10, ttl_seconds=60)
+    cache.set("a", {})
+    cache.save()
+    cache.load()
+
+    assert cache.get("a") == {}
+
+def test_embedding_cache_stores_flat_float32_vectors():
+    cache = EmbeddingCache(max_entries=10, ttl_seconds=60)
+    cache.set("a", [[0.5, 0.25]])
+
+    vector = cache.get("a")
+
+    assert vector.dtype == np.float32
+    assert vector.tolist() == [0.5, 0.25]
+    assert cache.get_statistics()["bytes"] == 8
@@ -0,0 +1,108 @@
+import asyncio
+import builtins
+import errno
+import numpy as np
+import pytest
+import scene_store
+from scene_store import MemoryMappedSceneStore, SceneRecord
+
+def add(store: MemoryMappedSceneStore, text: str, embedding):
+    store.add_sync(text, [f"#{text}"], f"/Scene/image/{text}", np.asarray(embedding, dtype=np.float32))
+
+def test_search_of_an_empty_store_finds_nothing(tmp_path):
+    assert MemoryMappedSceneStore(str(tmp_path)).search_sync(np.ones(3)) == []
+
+def test_search_returns_nearest_scenes_with_cosine_distances(tmp_path):
+    store = MemoryMappedSceneStore(str(tmp_path))
+    add(store, "red", [1, 0, 0])
+    add(store, "orange", [1, 1, 0])
+    add(store, "blue", [0, 0, 1])
+
+    matches = store.search_sync(np.array([2, 0.2, 0], dtype=np.float32), limit=2)
+
+    assert [match.text for match in matches] == ["red", "orange"]
+    assert matches[0].colors == ["#red"]
+    assert matches[0].image_url == "/Scene/image/red"
+    assert matches[0].distance == pytest.approx(1 - 2 / np.linalg.norm([2, 0.2]), abs=1e-6)
+    assert matches[0].distance < matches[1].distance
+
+def test_scenes_survive_reopening_the_store(tmp_path):
+    store = MemoryMappedSceneStore(str(tmp_path))
+    store.add_many_sync([SceneRecord("red", [], None, np.array([1, 0], dtype=np.float32)), SceneRecord("green", [], None, np.array([0, 1], dtype=np.float32))])
+
+    reopened = MemoryMappedSceneStore(str(tmp_path))
+
+    assert reopened.count == 2
+    assert reopened.search_sync(np.array([0, 1]))[0].text == "green"
+
+def test_a_half_written_scene_is_dropped_on_reopen(tmp_path):
+    store = MemoryMappedSceneStore(str(tmp_path))
+    add(store, "red", [1, 0])
+    add(store, "green", [0, 1])
+    # Simulate a crash between the embedding and metadata appends of a third scene
+    with open(tmp_path / "embeddings.f32", "ab") as file:
+        file.write(np.array([1, 1], dtype=np.float32).tobytes()[:6])
+
+    reopened = MemoryMappedSceneStore(str(tmp_path))
+    add(reopened, "blue", [-1, 0])
+
+    assert reopened.count == 3
+    assert reopened.search_sync(np.array([-1, 0]))[0].text == "blue"
+    assert MemoryMappedSceneStore(str(tmp_path)).count == 3
+
+def test_a_failed_metadata_write_leaves_rows_aligned_for_the_retry(tmp_path, monkeypatch):
+    store = MemoryMappedSceneStore(str(tmp_path))
+    add(store, "red", [1, 0])
+
+    class FullDisk:
+        def __init__(self, file):
+            self.file = file
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            self.file.close()
+
+        def write(self, data):
+            self.file.write(data[:len(data) // 2])
+            raise OSError(errno.ENOSPC, "No space left on device")
+
+    def failing_open(path, mode="r", *args, **kwargs):
+        file = builtins.open(path, mode, *args, **kwargs)
+        return FullDisk(file) if path == store._scenes_path and "a" in mode else file
+
+    monkeypatch.setattr(scene_store, "open", failing_open, raising=False)
+    for _ in range(3):
+        with pytest.raises(OSError):
+            add(store, "green", [0, 1])
+    monkeypatch.undo()
+    add(store, "green", [0, 1])
+
+    assert store.count == 2
+    assert (tmp_path / "embeddings.f32").stat().st_size == 2 * 2 * 4
+    assert store.search_sync(np.array([0, 1]))[0].text == "green"
+    assert store.search_sync(np.array([1, 0]))[0].text == "red"
+    reopened = MemoryMappedSceneStore(str(tmp_path))
+    assert reopened.count == 2
+    assert reopened.search_sync(np.array([0, 1]))[0].text == "green"
+
+def test_embeddings_of_another_dimension_are_rejected(tmp_path):
+    store = MemoryMappedSceneStore(str(tmp_path))
+    add(store, "red", [1, 0])
+
+    with pytest.raises(ValueError):
+        add(store, "rgb", [1, 0, 0])
+    with pytest.raises(ValueError):
+        store.search_sync(np.array([1, 0, 0]))
+
+def test_async_methods_run_on_the_executor(tmp_path):
+    store = MemoryMappedSceneStore(str(tmp_path))
+
+    async def scenario():
+        await store.add("red", ["#ff0000"], None, np.array([1, 0], dtype=np.float32))
+        return await store.search(np.array([1, 0]), limit=5)
+
+    matches = asyncio.run(scenario())
+
+    assert [match.text for match in matches] == ["red"]
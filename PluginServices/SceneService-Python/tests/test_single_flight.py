@@ -0,0 +1,137 @@
+import asyncio
+import pytest
+from single_flight import SceneSingleFlight, normalize_prompt
+
+def test_normalize_prompt_ignores_case_punctuation_and_spacing():
+    assert normalize_prompt("  Neon   PARTY!; pink, #ff00ff ") == "neon party pink #ff00ff"
+
+def test_identical_prompts_share_one_call():
+    async def scenario():
+        single_flight = SceneSingleFlight(distance_threshold=0.05)
+        calls = []
+
+        async def work(embedding):
+            calls.append(embedding)
+            await asyncio.sleep(0.05)
+            return "scene"
+
+        async def embed():
+            return [1.0, 0.0]
+
+        results = await asyncio.gather(*[single_flight.run(prompt, embed, work) for prompt in ("Neon party", "neon  party!", "NEON PARTY")])
+        return results, calls, single_flight.get_statistics()
+
+    results, calls, statistics = asyncio.run(scenario())
+
+    assert results == ["scene"] * 3
+    assert len(calls) == 1
+    assert statistics["exact_duplicates"] == 2
+    assert statistics["in_flight"] == 0
+
+def test_near_duplicate_embeddings_share_one_call_and_distant_ones_do_not():
+    async def scenario():
+        single_flight = SceneSingleFlight(distance_threshold=0.05)
+        embeddings = {"neon party": [1.0, 0.0], "neon celebration": [0.99, 0.05], "quiet forest": [0.0, 1.0]}
+        calls = []
+
+        async def work(embedding):
+            calls.append(embedding)
+            scene = f"scene {len(calls)}"
+            await asyncio.sleep(0.05)
+            return scene
+
+        async def request(prompt):
+            async def embed():
+                return embeddings[prompt]
+            return await single_flight.run(prompt, embed, work)
+
+        first = asyncio.create_task(request("neon party"))
+        await asyncio.sleep(0.01)
+        results = await asyncio.gather(first, request("neon celebration"), request("quiet forest"))
+        return results, calls, single_flight.get_statistics()
+
+    results, calls, statistics = asyncio.run(scenario())
+
+    assert results == ["scene 1", "scene 1", "scene 2"]
+    assert len(calls) == 2
+    assert statistics["near_duplicates"] == 1
+
+def test_errors_are_shared_with_waiting_requests_and_not_cached():
+    async def scenario():
+        single_flight = SceneSingleFlight(distance_threshold=0.05)
+        attempts = 0
+
+        async def work(embedding):
+            nonlocal attempts
+            attempts += 1
+            await asyncio.sleep(0.05)
+            if attempts == 1:
+                raise RuntimeError("generation failed")
+            return "scene"
+
+        async def embed():
+            return [1.0, 0.0]
+
+        failures = await asyncio.gather(*[single_flight.run("neon", embed, work) for _ in range(3)], return_exceptions=True)
+        retry = await single_flight.run("neon", embed, work)
+        return failures, retry, attempts
+
+    failures, retry, attempts = asyncio.run(scenario())
+
+    assert all(isinstance(failure, RuntimeError) for failure in failures)
+    assert retry == "scene"
+    assert attempts == 2
+
+def test_cancelling_the_first_request_does_not_fail_the_ones_waiting_for_it():
+    async def scenario():
+        single_flight = SceneSingleFlight(distance_threshold=0.05)
+        calls = []
+
+        async def work(embedding):
+            calls.append(embedding)
+            await asyncio.sleep(0.05)
+            return "scene"
+
+        async def embed():
+            return [1.0, 0.0]
+
+        leader = asyncio.create_task(single_flight.run("neon party", embed, work))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(single_flight.run("Neon party!", embed, work))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        result = await follower
+        return leader, result, calls, single_flight.get_statistics()
+
+    leader, result, calls, statistics = asyncio.run(scenario())
+
+    assert leader.cancelled()
+    assert result == "scene"
+    assert len(calls) == 1
+    assert statistics["in_flight"] == 0
+
+def test_the_work_is_cancelled_when_no_request_is_left_waiting():
+    async def scenario():
+        single_flight = SceneSingleFlight(distance_threshold=0.05)
+        finished = []
+
+        async def work(embedding):
+            await asyncio.sleep(0.05)
+            finished.append(embedding)
+            return "scene"
+
+        async def embed():
+            return [1.0, 0.0]
+
+        request = asyncio.create_task(single_flight.run("neon party", embed, work))
+        await asyncio.sleep(0.01)
+        request.cancel()
+        await asyncio.sleep(0.1)
+        retry = await single_flight.run("neon party", embed, work)
+        return request, finished, retry
+
+    request, finished, retry = asyncio.run(scenario())
+
+    assert request.cancelled()
+    assert len(finished) == 1
+    assert retry == "scene"
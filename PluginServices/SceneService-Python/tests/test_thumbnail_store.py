@@ -0,0 +1,71 @@
+import hashlib
+import io
+import os
+import time
+import numpy as np
+from PIL import Image
+from thumbnail_store import ThumbnailStore, create_thumbnail
+
+def test_images_are_named_by_the_sha256_of_their_content(tmp_path):
+    store = ThumbnailStore(str(tmp_path), max_bytes=1000)
+
+    image_hash = store.put(b"image")
+
+    assert image_hash == hashlib.sha256(b"image").hexdigest()
+    with open(store.get_path(image_hash), "rb") as file:
+        assert file.read() == b"image"
+    assert store.put(b"image") == image_hash
+    assert store.get_statistics()["images"] == 1
+
+def test_unknown_and_malformed_hashes_have_no_path(tmp_path):
+    store = ThumbnailStore(str(tmp_path), max_bytes=1000)
+
+    assert store.get_path("0" * 64) is None
+    assert store.get_path("../../etc/passwd") is None
+
+def test_least_recently_used_images_are_evicted_over_the_size_limit(tmp_path):
+    store = ThumbnailStore(str(tmp_path), max_bytes=25)
+    first = store.put(b"a" * 10)
+    second = store.put(b"b" * 10)
+    store.get_path(first)
+
+    third = store.put(b"c" * 10)
+
+    assert store.get_path(second) is None
+    assert not os.path.exists(os.path.join(str(tmp_path), second))
+    assert store.get_path(first) is not None
+    assert store.get_path(third) is not None
+    assert store.get_statistics()["bytes"] == 20
+    assert store.evictions == 1
+
+def test_the_newest_image_is_kept_even_if_it_alone_is_over_the_limit(tmp_path):
+    store = ThumbnailStore(str(tmp_path), max_bytes=5)
+    store.put(b"a" * 10)
+
+    image_hash = store.put(b"b" * 10)
+
+    assert store.get_path(image_hash) is not None
+    assert store.get_statistics()["images"] == 1
+
+def test_recency_is_seeded_from_modification_times_on_restart(tmp_path):
+    store = ThumbnailStore(str(tmp_path), max_bytes=25)
+    older = store.put(b"a" * 10)
+    newer = store.put(b"b" * 10)
+    now = time.time()
+    os.utime(os.path.join(str(tmp_path), older), (now - 100, now - 100))
+    os.utime(os.path.join(str(tmp_path), newer), (now, now))
+
+    restarted = ThumbnailStore(str(tmp_path), max_bytes=25)
+    restarted.put(b"c" * 10)
+
+    assert restarted.get_path(older) is None
+    assert restarted.get_path(newer) is not None
+
+def test_create_thumbnail_fits_the_image_in_max_dimension_as_webp():
+    output = io.BytesIO()
+    Image.fromarray(np.zeros((300, 600, 3), dtype=np.uint8)).save(output, "PNG")
+
+    thumbnail = Image.open(io.BytesIO(create_thumbnail(output.getvalue(), max_dimension=128)))
+
+    assert thumbnail.format == "WEBP"
+    assert thumbnail.size == (128, 64)
@@ -0,0 +1,102 @@
+import hashlib
+import io
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional
+from PIL import Image
+
+HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+def create_thumbnail(image_bytes: bytes, max_dimension: int = 256, quality: int = 80) -> bytes:
+    """Downscale an image to fit max_dimension and compress it as WebP; runs in the palette process pool."""
+    image = Image.open(io.BytesIO(image_bytes))
+    image.draft("RGB", (max_dimension, max_dimension))
+    image = image.convert("RGB")
+    image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+    output = io.BytesIO()
+    image.save(output, "WEBP", quality=quality, method=4)
+    return output.getvalue()
+
+class ThumbnailStore:
+    """Scene images on local disk, named by the SHA-256 of their content.
+
+    Since a name always means the same bytes, the images can be cached forever by clients,
+    and storing an image twice is a no-op. When the store grows past max_bytes, the least
+    recently used images are deleted (recency is kept in memory, seeded from the files'
+    modification times at startup). Cached scenes can outlive their image, so callers check
+    get_path before serving a cached scene and regenerate it if the image is gone.
+    """
+
+    media_type = "image/webp"
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+        # Hash to size, least recently used first
+        self._images: "OrderedDict[str, int]" = OrderedDict()
+        self.total_bytes = 0
+        self.evictions = 0
+
+        files = []
+        for name in os.listdir(path):
+            if HASH_PATTERN.match(name):
+                stat = os.stat(os.path.join(path, name))
+                files.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._images[name] = size
+            self.total_bytes += size
+
+    def put(self, image_bytes: bytes) -> str:
+        image_hash = hashlib.sha256(image_bytes).hexdigest()
+        with self._lock:
+            if image_hash in self._images:
+                self._images.move_to_end(image_hash)
+                return image_hash
+
+        temporary_path = os.path.join(self.path, f".{image_hash}.{threading.get_ident()}.tmp")
+        with open(temporary_path, "wb") as file:
+            file.write(image_bytes)
+        os.replace(temporary_path, self._get_file_path(image_hash))
+
+        with self._lock:
+            if image_hash not in self._images:
+                self._images[image_hash] = len(image_bytes)
+                self.total_bytes += len(image_bytes)
+            self._evict()
+        return image_hash
+
+    def get_path(self, image_hash: str) -> Optional[str]:
+        """Return the file of an image (marking it as recently used), or None if it isn't stored."""
+        if not HASH_PATTERN.match(image_hash):
+            return None
+        with self._lock:
+            if image_hash not in self._images:
+                return None
+            self._images.move_to_end(image_hash)
+        return self._get_file_path(image_hash)
+
+    def get_statistics(self) -> dict:
+        return {
+            "images": len(self._images),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
+
+    def _evict(self):
+        # Keep the newest image even if it alone is over the limit
+        while self.total_bytes > self.max_bytes and len(self._images) > 1:
+            image_hash, size = self._images.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self._get_file_path(image_hash))
+            except FileNotFoundError:
+                pass
+
+    def _get_file_path(self, image_hash: str) -> str:
+        return os.path.join(self.path, image_hash)